@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+bench_sample_route.py
+
+Throughput of route sampling (and optionally the corridor lookup) with the
+offline file provider, so neither API quotas nor network latency end up in
+the numbers.  A synthetic cross-country track is generated unless --track
+points at a real GPX/GeoJSON/polyline file.
+
+Usage:
+    python benchmarks/bench_sample_route.py [--track FILE] [--points N]
+        [--interval MI ...] [--repeat N] [--via-stub] [--lookup RADIUS]
+"""
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import synth   # puts src/ on sys.path
+
+# the route store would turn every iteration after the first into a cache hit
+os.environ['ROUTE_CACHE_PATH'] = ''
+
+from repeater_tools.directions import (
+    FileDirections, HTTPDirections, StubDirectionsServer, set_provider,
+)
+from repeater_tools.route_sampler import sample_route, get_route
+
+
+def timed(fn, repeat):
+    times = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return result, times
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--track', help='Track file to sample (default: synthetic)')
+    p.add_argument('--points', type=int, default=20000,
+                   help='Vertices in the synthetic track (default: %(default)s)')
+    p.add_argument('--interval', type=float, nargs='+', default=[1.0, 5.0, 20.0],
+                   help='Sampling intervals in miles (default: %(default)s)')
+    p.add_argument('--repeat', type=int, default=20,
+                   help='Timed iterations per case (default: %(default)s)')
+    p.add_argument('--via-stub', action='store_true',
+                   help='Serve the track from a local stub Directions server, '
+                        'to include the HTTP + polyline decode path')
+    p.add_argument('--lookup', type=float, metavar='RADIUS',
+                   help='Also time the corridor lookup at this buffer (needs the DB)')
+    p.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = p.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        track = args.track or synth.write_track(os.path.join(tmp, 'track.geojson'),
+                                                synth.cross_country_route(args.points))
+        provider = FileDirections(track)
+        stub = None
+        if args.via_stub:
+            stub = StubDirectionsServer(provider).start()
+            provider = HTTPDirections(stub.url)
+        set_provider(provider)
+
+        try:
+            pts, cum = get_route('A', 'B')
+            results = {'track': args.track or 'synthetic', 'provider': repr(provider),
+                       'vertices': len(pts), 'route_miles': round(float(cum[-1]), 1),
+                       'cases': []}
+            for interval in args.interval:
+                samples, times = timed(lambda: sample_route('A', 'B', interval), args.repeat)
+                med = statistics.median(times)
+                results['cases'].append({
+                    'case': f'sample_route@{interval:g}mi',
+                    'samples': len(samples),
+                    'median_ms': round(med * 1000, 3),
+                    'routes_per_s': round(1 / med, 1),
+                    'samples_per_s': round(len(samples) / med),
+                })
+
+            if args.lookup is not None:
+                from repeater_tools.db import get_repeaters_along_route
+                hits, times = timed(lambda: get_repeaters_along_route(pts, args.lookup),
+                                    max(1, args.repeat // 4))
+                med = statistics.median(times)
+                results['cases'].append({
+                    'case': f'corridor_lookup@{args.lookup:g}mi',
+                    'repeaters': len(hits),
+                    'median_ms': round(med * 1000, 3),
+                    'routes_per_s': round(1 / med, 1),
+                })
+        finally:
+            if stub is not None:
+                stub.stop()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    print(f"{results['provider']}: {results['vertices']} vertices, "
+          f"{results['route_miles']} mi")
+    for case in results['cases']:
+        extra = ', '.join(f'{k}={v}' for k, v in case.items() if k not in ('case', 'median_ms'))
+        print(f"  {case['case']:<26} {case['median_ms']:>10.3f} ms   {extra}")
+
+
+if __name__ == '__main__':
+    main()
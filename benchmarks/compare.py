@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+compare.py
+
+Compare two benchmark result files written by run.py, case by case.
+
+Usage:
+    python benchmarks/compare.py OLD.json NEW.json [--threshold 0.10] [--fail]
+
+Ratios are NEW / OLD median time (below 1.0 is faster).  Cases that slowed
+down by more than the threshold are flagged; with --fail the exit status is
+1 if any were.
+"""
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        data = json.load(f)
+    return data['meta'], {(r['scenario'], r['case'], r['size']): r for r in data['results']}
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('old')
+    p.add_argument('new')
+    p.add_argument('--threshold', type=float, default=0.10,
+                   help='Relative slowdown that counts as a regression (default: %(default)s)')
+    p.add_argument('--fail', action='store_true',
+                   help='Exit with status 1 when any case regressed')
+    args = p.parse_args()
+
+    old_meta, old = load(args.old)
+    new_meta, new = load(args.new)
+    print(f"old: {old_meta.get('revision')}  ({old_meta.get('timestamp')})")
+    print(f"new: {new_meta.get('revision')}  ({new_meta.get('timestamp')})\n")
+    print(f"{'scenario':<14} {'case':<28} {'size':>8} {'old ms':>11} {'new ms':>11} {'ratio':>7}")
+
+    regressions = 0
+    for key in sorted(set(old) | set(new), key=lambda k: (k[0], k[1], k[2] or 0)):
+        scenario, case, size = key
+        o, n = old.get(key), new.get(key)
+        o_ms = f"{o['median_s'] * 1000:.3f}" if o else '-'
+        n_ms = f"{n['median_s'] * 1000:.3f}" if n else '-'
+        ratio, flag = '', ''
+        if o and n and o['median_s']:
+            r = n['median_s'] / o['median_s']
+            ratio = f"{r:.2f}x"
+            if r > 1 + args.threshold:
+                flag = '  << slower'
+                regressions += 1
+            elif r < 1 / (1 + args.threshold):
+                flag = '  faster'
+        print(f"{scenario:<14} {case:<28} {size or '':>8} {o_ms:>11} {n_ms:>11} {ratio:>7}{flag}")
+
+    print(f"\n{regressions} case(s) slower than {args.threshold:.0%}")
+    if args.fail and regressions:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
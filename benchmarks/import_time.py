@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+import_time.py
+
+Cold-start regression check: import each entry point in a fresh interpreter
+under `python -X importtime` and compare its cumulative import time with a
+budget, and make sure heavy dependencies that must only load on first use
+(googlemaps, requests, requests_cache, multiprocessing, ...) are not
+imported at all.
+
+Usage:
+    python benchmarks/import_time.py [--repeat N] [--scale F] [--json]
+
+The best of --repeat runs is compared with the budget (times --scale, for
+slow machines).  Exit status is 1 if any budget is exceeded or a deferred
+module is imported eagerly.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (module, budget in ms); generous against typical laptops, tight enough to
+# catch an eager requests_cache / googlemaps import (~150 ms on its own)
+BUDGETS = [
+    ('repeater_lookup', 180),
+    ('repeater_route', 180),
+    ('repeater_service', 180),
+    ('repeater_tools.db', 150),
+    ('repeater_tools.route_sampler', 150),
+]
+
+# must never be imported just by importing an entry point
+DEFERRED = (
+    'googlemaps', 'requests', 'requests_cache', 'multiprocessing',
+    'http.server', 'urllib.request', 'xml.etree.ElementTree',
+)
+
+
+def _env():
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(
+        [os.path.join(ROOT, 'src'), ROOT] + [p for p in [env.get('PYTHONPATH')] if p])
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    return env
+
+
+def import_ms(module):
+    """Cumulative import time of `module` in a fresh interpreter, in ms."""
+    out = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                         cwd=ROOT, env=_env(), capture_output=True, text=True)
+    if out.returncode:
+        raise RuntimeError(f"import {module} failed:\n{out.stderr[-2000:]}")
+    for line in reversed(out.stderr.splitlines()):
+        # "import time: self [us] | cumulative | imported package"
+        parts = line.split('|')
+        if len(parts) == 3 and parts[2].strip() == module:
+            return int(parts[1]) / 1000
+    raise RuntimeError(f"no importtime line for {module}")
+
+
+def eager_imports(module):
+    """Modules from DEFERRED that importing `module` pulls in."""
+    code = (f'import sys, {module}; '
+            f'print("\\n".join(m for m in {DEFERRED!r} if m in sys.modules))')
+    out = subprocess.run([sys.executable, '-c', code], cwd=ROOT, env=_env(),
+                         capture_output=True, text=True, check=True)
+    return out.stdout.split()
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--repeat', type=int, default=5,
+                   help='Fresh interpreters per module; the best is kept (default: %(default)s)')
+    p.add_argument('--scale', type=float, default=1.0,
+                   help='Multiply every budget by this factor (default: %(default)s)')
+    p.add_argument('--json', action='store_true', help='Print results as JSON')
+    args = p.parse_args()
+
+    # compile once so the first timed run does not pay for .pyc writes
+    import_ms(BUDGETS[0][0])
+
+    results, failed = [], False
+    for module, budget in BUDGETS:
+        best = min(import_ms(module) for _ in range(args.repeat))
+        eager = eager_imports(module)
+        ok = best <= budget * args.scale and not eager
+        failed |= not ok
+        results.append({'module': module, 'ms': round(best, 1),
+                        'budget_ms': budget * args.scale, 'eager': eager, 'ok': ok})
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for r in results:
+            flag = 'ok  ' if r['ok'] else 'FAIL'
+            eager = f"  eager: {', '.join(r['eager'])}" if r['eager'] else ''
+            print(f"{flag} {r['module']:<30} {r['ms']:>8.1f} ms  "
+                  f"(budget {r['budget_ms']:.0f} ms){eager}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
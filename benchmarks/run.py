@@ -0,0 +1,345 @@
+#!/usr/bin/env python3
+"""
+run.py
+
+Benchmark suite for the sampling, lookup, ingest and output hot paths, run
+against synthetic national-scale data (see synth.py) so numbers are
+comparable between commits and machines.
+
+Scenarios:
+    sample_route   fixed-interval and adaptive sampling of short / cross-country
+                   routes (offline provider)
+    within_range   radius lookups around random points (ids only, and full rows):
+                   SQLite, memory index, tiles (cold and warm)
+    corridor       whole-route corridor lookup: SQLite, memory index, tiles,
+                   plus mode/band/status/access-filtered SQLite lookups
+    pipeline       repeater_lookup.py end to end (route -> lookup -> CSV)
+    ingest         insert_repeaters bulk load, --sync and snapshot write
+    csv_writer     CSVWriter output for each radio profile
+
+Usage:
+    python benchmarks/run.py [--sizes 10000 100000 1000000] [--only SCENARIO ...]
+        [--repeat N] [--output FILE]
+    python benchmarks/compare.py OLD.json NEW.json
+
+Results are written as JSON (default benchmarks/results/<commit>.json).
+Synthetic data is cached in benchmarks/.data/ (override with BENCH_DATA_DIR).
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+import synth   # also puts the repo root and src/ on sys.path
+
+# the route store would make every repeat after the first a cache hit
+os.environ['ROUTE_CACHE_PATH'] = ''
+
+from repeater_tools import db
+from repeater_tools.directions import FileDirections, set_provider
+from repeater_tools.filters import parse_filter
+from repeater_tools.route_sampler import sample_route, sample_route_adaptive, get_route
+
+SCENARIOS = {}
+
+
+def scenario(fn):
+    SCENARIOS[fn.__name__.replace('bench_', '')] = fn
+    return fn
+
+
+def measure(fn, repeat, warmup=1):
+    """Run `fn` `warmup` + `repeat` times; return (last result, timings)."""
+    result = None
+    for _ in range(warmup):
+        result = fn()
+    times = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - started)
+    return result, times
+
+
+def record(scenario, case, size, times, ops=None, **extra):
+    med = statistics.median(times)
+    row = {
+        'scenario': scenario,
+        'case': case,
+        'size': size,
+        'repeat': len(times),
+        'median_s': med,
+        'min_s': min(times),
+        'max_s': max(times),
+    }
+    if ops is not None:
+        row['ops'] = ops
+        row['ops_per_s'] = ops / med if med else None
+    row.update(extra)
+    return row
+
+
+BACKENDS = ('sqlite', 'memory', 'tiles')
+
+# filtered corridor lookups (SQLite only; the other backends index FM rows)
+FILTERS = {
+    'fm_vhf_uhf_open': parse_filter('fm', '2m,70cm', 'on-air', 'open'),
+    'dmr': parse_filter('dmr'),
+}
+
+
+@contextlib.contextmanager
+def backend(path, kind='sqlite'):
+    saved = db.DB_PATH, db.USE_MEMORY_INDEX, db.USE_TILE_CACHE
+    db.DB_PATH = path
+    db.USE_MEMORY_INDEX, db.USE_TILE_CACHE = kind == 'memory', kind == 'tiles'
+    try:
+        yield
+    finally:
+        db.DB_PATH, db.USE_MEMORY_INDEX, db.USE_TILE_CACHE = saved
+
+
+def random_centres(n, seed=1):
+    """Query points drawn like the data: mostly near metros, some rural."""
+    recs = synth.iter_records(n, seed)
+    return [(float(r['Lat']), float(r['Long'])) for r in recs]
+
+
+# ─── scenarios ─────────────────────────────────────────────────────────────────
+@scenario
+def bench_sample_route(args, sizes):
+    for name in synth.ROUTES:
+        set_provider(FileDirections(synth.track_path(name)))
+        pts, cum = get_route('A', 'B')
+        for interval in (1.0, 5.0):
+            samples, times = measure(lambda: sample_route('A', 'B', interval), args.repeat * 5)
+            yield record('sample_route', f'{name}@{interval:g}mi', None, times,
+                         ops=len(samples), vertices=len(pts),
+                         route_miles=round(float(cum[-1]), 1))
+        for radius in (5.0, 10.0):
+            (samples, _), times = measure(
+                lambda: sample_route_adaptive('A', 'B', radius), args.repeat * 5)
+            yield record('sample_route', f'{name}@adaptive_r{radius:g}mi', None, times,
+                         ops=len(samples), vertices=len(pts),
+                         route_miles=round(float(cum[-1]), 1))
+
+
+@scenario
+def bench_within_range(args, sizes):
+    centres = random_centres(200)
+    for size in sizes:
+        path = synth.db_path(size)
+        for kind in BACKENDS:
+            with backend(path, kind):
+                if kind == 'memory':
+                    from repeater_tools.spatial_index import RepeaterIndex
+                    _, times = measure(lambda: RepeaterIndex(path, use_snapshot=False),
+                                       1, warmup=0)
+                    yield record('within_range', 'memory_index_build', size, times, ops=size)
+                    _, times = measure(lambda: RepeaterIndex(path), args.repeat)
+                    yield record('within_range', 'memory_index_build_snapshot', size, times,
+                                 ops=size)
+                for radius in (10.0, 50.0):
+                    def run(lookup=db.get_repeaters_within_range):
+                        return sum(len(lookup(c, radius)) for c in centres)
+
+                    def run_ids():
+                        return sum(len(db.get_repeater_ids_within_range(c, radius)[0])
+                                   for c in centres)
+                    if kind == 'tiles':
+                        # cold: every tile loaded (and every row materialized)
+                        # from SQLite on first touch; same work as the warm run
+                        from repeater_tools.tiles import TileCache
+                        cold = TileCache(path)
+                        found, times = measure(lambda: run(cold.within_range), 1, warmup=0)
+                        yield record('within_range', f'tiles_cold@{radius:g}mi',
+                                     size, times, ops=len(centres), found=found)
+                    found, times = measure(run_ids, args.repeat)
+                    yield record('within_range', f'{kind}_ids@{radius:g}mi',
+                                 size, times, ops=len(centres), found=found)
+                    found, times = measure(run, args.repeat)
+                    yield record('within_range', f'{kind}@{radius:g}mi',
+                                 size, times, ops=len(centres), found=found)
+
+
+@scenario
+def bench_corridor(args, sizes):
+    for size in sizes:
+        path = synth.db_path(size)
+        for name in synth.ROUTES:
+            pts = synth.ROUTES[name]()
+            for kind in BACKENDS:
+                with backend(path, kind):
+                    hits, times = measure(
+                        lambda: db.get_repeaters_along_route(pts, 10.0), args.repeat)
+                yield record('corridor', f"{kind}:{name}@10mi",
+                             size, times, ops=1, found=len(hits), vertices=len(pts))
+            for label, filt in FILTERS.items():
+                with backend(path):
+                    hits, times = measure(
+                        lambda: db.get_repeaters_along_route(pts, 10.0, filt), args.repeat)
+                yield record('corridor', f"sqlite[{label}]:{name}@10mi",
+                             size, times, ops=1, found=len(hits), vertices=len(pts))
+
+
+@scenario
+def bench_pipeline(args, sizes):
+    import repeater_lookup
+    url = 'https://www.google.com/maps/dir/A/B'
+    cases = [
+        ('corridor:short',         'short',         []),
+        ('corridor:cross_country', 'cross_country', []),
+        ('sampled:cross_country',  'cross_country', ['--sampled', '-i', '5']),
+        ('budget128:cross_country', 'cross_country', ['-n', '128']),
+    ]
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'out.csv')
+        for size in sizes:
+            path = synth.db_path(size)
+            for case, route, extra in cases:
+                argv = ['repeater_lookup.py', '-u', url, '-r', '10', '-o', out,
+                        '--directions', synth.track_path(route)] + extra
+
+                def run():
+                    sys.argv = argv
+                    with contextlib.redirect_stdout(io.StringIO()):
+                        repeater_lookup.main()
+
+                with backend(path):
+                    _, times = measure(run, args.repeat)
+                with open(out) as f:
+                    rows = sum(1 for _ in f) - 1
+                yield record('pipeline', case, size, times, ops=1, rows=rows)
+
+
+@scenario
+def bench_ingest(args, sizes):
+    import insert_repeaters as ir
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in sizes:
+            export = synth.export_path(size)
+            times = []
+            repeat = args.repeat if size <= 100_000 else 1
+            for i in range(repeat):
+                target = os.path.join(tmp, f'ingest_{i}.sqlite')
+                started = time.perf_counter()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    synth.load_db(target, export)
+                times.append(time.perf_counter() - started)
+                os.remove(target)
+            yield record('ingest', 'bulk_load', size, times, ops=size)
+
+            # re-applying an unchanged export: the --sync fast path
+            target = synth.db_path(size)
+            work = os.path.join(tmp, 'sync.sqlite')
+            with open(target, 'rb') as src, open(work, 'wb') as dst:
+                dst.write(src.read())
+            conn = sqlite3.connect(work, isolation_level=None)
+            _, times = measure(lambda: ir.sync(conn, ir.iter_records(export)),
+                               1 if size > 100_000 else args.repeat, warmup=0)
+            conn.close()
+            yield record('ingest', 'sync_unchanged', size, times, ops=size)
+
+            from repeater_tools.snapshot import write_snapshot
+            snap = os.path.join(tmp, 'snapshot.bin')
+            _, times = measure(lambda: write_snapshot(target, snap),
+                               1 if size > 100_000 else args.repeat, warmup=0)
+            yield record('ingest', 'snapshot_write', size, times, ops=size,
+                         bytes=os.path.getsize(snap))
+
+
+@scenario
+def bench_csv_writer(args, sizes):
+    from repeater_tools.csv_writer import CSVWriter
+    from repeater_tools.writers import PROFILES
+    path = synth.db_path(min(sizes))
+    conn = sqlite3.connect(path)
+    rowids = [r[0] for r in conn.execute(
+        "SELECT rowid FROM repeaters WHERE fm_analog = 'Yes' LIMIT 5000")]
+    conn.close()
+    with backend(path):
+        reps = db.load_repeaters(rowids)
+    reps = (reps * (args.write_rows // max(len(reps), 1) + 1))[:args.write_rows]
+    with tempfile.TemporaryDirectory() as tmp:
+        out = os.path.join(tmp, 'out')
+        for profile in PROFILES:
+            _, times = measure(lambda: CSVWriter(out, profile).write(reps), args.repeat)
+            yield record('csv_writer', profile, None, times, ops=len(reps))
+
+
+# ─── driver ────────────────────────────────────────────────────────────────────
+def git_revision():
+    try:
+        rev = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=synth.ROOT,
+                             capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'],
+                               cwd=synth.ROOT, capture_output=True, text=True).stdout.strip()
+        return rev + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def metadata(args):
+    return {
+        'revision': git_revision(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'sizes': args.sizes,
+        'repeat': args.repeat,
+    }
+
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000],
+                   help='Synthetic DB sizes in rows (default: %(default)s)')
+    p.add_argument('--only', nargs='+', choices=sorted(SCENARIOS), metavar='SCENARIO',
+                   help=f"Scenarios to run (default: all of {', '.join(SCENARIOS)})")
+    p.add_argument('--repeat', type=int, default=5,
+                   help='Timed repetitions per case (default: %(default)s)')
+    p.add_argument('--write-rows', type=int, default=50_000,
+                   help='Rows per csv_writer case (default: %(default)s)')
+    p.add_argument('-o', '--output',
+                   help='Results file (default: benchmarks/results/<revision>.json)')
+    args = p.parse_args()
+
+    meta = metadata(args)
+    output = args.output or os.path.join(synth.HERE, 'results', f"{meta['revision']}.json")
+    # the lookup CLI installs its HTTP cache relative to the cwd; keep it out of the tree
+    workdir = tempfile.mkdtemp(prefix='repeater-bench-')
+    os.chdir(workdir)
+
+    results = []
+    for name in args.only or SCENARIOS:
+        print(f"── {name}", flush=True)
+        for row in SCENARIOS[name](args, args.sizes):
+            size = '' if row['size'] is None else f"n={row['size']:<8}"
+            rate = f"{row['ops_per_s']:>14,.1f}/s" if row.get('ops_per_s') else ''
+            print(f"   {row['case']:<40} {size:<10} {row['median_s'] * 1000:>11.3f} ms {rate}",
+                  flush=True)
+            results.append(row)
+
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump({'meta': meta, 'results': results}, f, indent=1)
+    print(f"Wrote {len(results)} results to {output}")
+
+
+if __name__ == '__main__':
+    main()
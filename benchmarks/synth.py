@@ -0,0 +1,280 @@
+"""
+synth.py
+
+Synthetic, reproducible inputs for the benchmarks:
+
+  * RepeaterBook-shaped export records (same keys and string formats as
+    US_Repeaters.json), clustered around US metro areas the way real
+    repeaters are, at any size from a few thousand to millions of rows;
+  * SQLite DBs built from them with the real loader (insert_repeaters.py);
+  * short (~30 mi) and cross-country (~2,900 mi) route polylines.
+
+Everything is a pure function of (size, seed), and generated files are cached
+under benchmarks/.data/ so large datasets are only built once.
+"""
+import json
+import os
+import sqlite3
+import sys
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+DATA_DIR = os.getenv("BENCH_DATA_DIR", os.path.join(HERE, ".data"))
+
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+# (city, state, state FIPS, lat, lon, weight)
+METROS = [
+    ("New York",       "New York",       "36", 40.71, -74.01, 9),
+    ("Los Angeles",    "California",     "06", 34.05, -118.24, 8),
+    ("Chicago",        "Illinois",       "17", 41.88, -87.63, 6),
+    ("Dallas",         "Texas",          "48", 32.78, -96.80, 5),
+    ("Houston",        "Texas",          "48", 29.76, -95.37, 5),
+    ("Washington",     "Virginia",       "51", 38.90, -77.04, 5),
+    ("Philadelphia",   "Pennsylvania",   "42", 39.95, -75.17, 4),
+    ("Miami",          "Florida",        "12", 25.76, -80.19, 4),
+    ("Atlanta",        "Georgia",        "13", 33.75, -84.39, 4),
+    ("Boston",         "Massachusetts",  "25", 42.36, -71.06, 4),
+    ("Phoenix",        "Arizona",        "04", 33.45, -112.07, 4),
+    ("San Francisco",  "California",     "06", 37.77, -122.42, 4),
+    ("Detroit",        "Michigan",       "26", 42.33, -83.05, 3),
+    ("Seattle",        "Washington",     "53", 47.61, -122.33, 4),
+    ("Minneapolis",    "Minnesota",      "27", 44.98, -93.27, 3),
+    ("San Diego",      "California",     "06", 32.72, -117.16, 3),
+    ("Tampa",          "Florida",        "12", 27.95, -82.46, 3),
+    ("Denver",         "Colorado",       "08", 39.74, -104.99, 3),
+    ("St. Louis",      "Missouri",       "29", 38.63, -90.20, 2),
+    ("Baltimore",      "Maryland",       "24", 39.29, -76.61, 2),
+    ("Charlotte",      "North Carolina", "37", 35.23, -80.84, 2),
+    ("Portland",       "Oregon",         "41", 45.52, -122.68, 3),
+    ("San Antonio",    "Texas",          "48", 29.42, -98.49, 2),
+    ("Orlando",        "Florida",        "12", 28.54, -81.38, 2),
+    ("Sacramento",     "California",     "06", 38.58, -121.49, 2),
+    ("Pittsburgh",     "Pennsylvania",   "42", 40.44, -79.99, 2),
+    ("Las Vegas",      "Nevada",         "32", 36.17, -115.14, 2),
+    ("Cincinnati",     "Ohio",           "39", 39.10, -84.51, 2),
+    ("Kansas City",    "Missouri",       "29", 39.10, -94.58, 2),
+    ("Columbus",       "Ohio",           "39", 39.96, -83.00, 2),
+    ("Indianapolis",   "Indiana",        "18", 39.77, -86.16, 2),
+    ("Nashville",      "Tennessee",      "47", 36.16, -86.78, 2),
+    ("Salt Lake City", "Utah",           "49", 40.76, -111.89, 2),
+    ("Albuquerque",    "New Mexico",     "35", 35.08, -106.65, 1),
+    ("Oklahoma City",  "Oklahoma",       "40", 35.47, -97.52, 1),
+    ("Omaha",          "Nebraska",       "31", 41.26, -95.93, 1),
+    ("Boise",          "Idaho",          "16", 43.62, -116.20, 1),
+    ("Billings",       "Montana",        "30", 45.78, -108.50, 1),
+    ("Rochester",      "Minnesota",      "27", 44.02, -92.47, 1),
+    ("Madison",        "Wisconsin",      "55", 43.07, -89.40, 1),
+]
+
+CTCSS = [67.0, 71.9, 74.4, 77.0, 79.7, 82.5, 85.4, 88.5, 91.5, 94.8, 97.4, 100.0,
+         103.5, 107.2, 110.9, 114.8, 118.8, 123.0, 127.3, 131.8, 136.5, 141.3,
+         146.2, 151.4, 156.7, 162.2, 167.9, 173.8, 179.9, 186.2, 192.8, 203.5]
+DCS = [23, 25, 26, 31, 32, 43, 47, 51, 54, 65, 71, 72, 73, 74, 114, 115, 116,
+       125, 131, 132, 134, 143, 152, 155, 156, 162, 165, 172, 174, 205, 223]
+# (low MHz, high MHz, step MHz, offset MHz, weight)
+BANDS = [
+    (145.11, 147.39, 0.015, 0.6, 50),
+    (442.0,  449.975, 0.025, 5.0, 35),
+    (223.85, 224.98, 0.02,  1.6, 6),
+    (927.0,  927.9875, 0.0125, 25.0, 3),
+    (51.62,  53.98,  0.02,  1.0, 4),
+    (29.62,  29.68,  0.02,  0.1, 2),
+]
+STATUSES = (["On-air"] * 17) + ["Off-air", "Off-air", "Testing"]
+
+# CONUS bounding box for the scattered (rural) share of repeaters
+CONUS = (25.0, 49.0, -124.5, -67.0)
+RURAL_SHARE = 0.25
+
+
+def _yes_no(flag):
+    return "Yes" if flag else "No"
+
+
+def iter_records(n, seed=0):
+    """Yield `n` synthetic export records (dicts keyed like US_Repeaters.json)."""
+    rng = np.random.default_rng(seed)
+    weights = np.array([m[5] for m in METROS], dtype=float)
+    metro = rng.choice(len(METROS), size=n, p=weights / weights.sum())
+    rural = rng.random(n) < RURAL_SHARE
+    lat = np.array([METROS[m][3] for m in metro]) + rng.normal(0, 0.6, n)
+    lon = np.array([METROS[m][4] for m in metro]) + rng.normal(0, 0.8, n)
+    lat[rural] = rng.uniform(CONUS[0], CONUS[1], rural.sum())
+    lon[rural] = rng.uniform(CONUS[2], CONUS[3], rural.sum())
+
+    bw = np.array([b[4] for b in BANDS], dtype=float)
+    band = rng.choice(len(BANDS), size=n, p=bw / bw.sum())
+    tone_kind = rng.random(n)          # < .7 CTCSS, < .8 DCS, else none
+    flags = rng.random((n, 6))         # fm, dmr, dstar, fusion, ares, skywarn
+    pick = rng.integers(0, 1 << 30, size=(n, 4))
+    days = rng.integers(0, 3650, n)
+
+    per_state = {}
+    for i in range(n):
+        city, state, fips, _, _, _ = METROS[metro[i]]
+        low, high, step, offset, _ = BANDS[band[i]]
+        freq = low + step * (pick[i, 0] % int((high - low) / step + 1))
+        plus = freq >= 440 or pick[i, 1] % 2 == 0
+        inp = freq + offset if plus else freq - offset
+        fm = flags[i, 0] < 0.8
+        pl = tsq = ""
+        if tone_kind[i] < 0.7:
+            pl = tsq = f"{CTCSS[pick[i, 2] % len(CTCSS)]:.1f}"
+        elif tone_kind[i] < 0.8:
+            tsq = str(DCS[pick[i, 2] % len(DCS)])
+        rptr_id = per_state[fips] = per_state.get(fips, 0) + 1
+        year, doy = divmod(int(days[i]), 365)
+        yield {
+            "State ID": fips,
+            "Rptr ID": rptr_id,
+            "Frequency": f"{freq:.5f}",
+            "Input Freq": f"{inp:.5f}",
+            "PL": pl,
+            "TSQ": tsq,
+            "Nearest City": city if not rural[i] else f"Town {pick[i, 3] % 5000}",
+            "Landmark": "",
+            "County": "",
+            "State": state,
+            "Country": "United States",
+            "Lat": f"{lat[i]:.8f}",
+            "Long": f"{lon[i]:.8f}",
+            "Precise": int(pick[i, 3] % 2),
+            "Callsign": f"W{pick[i, 1] % 10}{chr(65 + pick[i, 2] % 26)}{chr(65 + pick[i, 3] % 26)}{chr(65 + pick[i, 0] % 26)}",
+            "Use": "OPEN",
+            "Operational Status": STATUSES[pick[i, 3] % len(STATUSES)],
+            "ARES": _yes_no(flags[i, 4] < 0.2),
+            "RACES": "No",
+            "SKYWARN": _yes_no(flags[i, 5] < 0.2),
+            "CANWARN": "No",
+            "AllStar Node": "0",
+            "EchoLink Node": "0",
+            "IRLP Node": "0",
+            "Wires Node": "",
+            "FM Analog": _yes_no(fm),
+            "FM Bandwidth": "25.0 kHz" if fm else "",
+            "DMR": _yes_no(flags[i, 1] < 0.15),
+            "DMR Color Code": "",
+            "DMR ID": "",
+            "D-Star": _yes_no(flags[i, 2] < 0.08),
+            "NXDN": "No",
+            "APCO P-25": "No",
+            "P-25 NAC": "",
+            "M17": "No",
+            "M17 CAN": "",
+            "Tetra": "No",
+            "Tetra MCC": "",
+            "Tetra MNC": "",
+            "System Fusion": _yes_no(flags[i, 3] < 0.1),
+            "Notes": "",
+            "Last Update": f"{2015 + year}-{1 + doy // 31 % 12:02d}-{1 + doy % 28:02d}",
+        }
+
+
+def _cached(name):
+    os.makedirs(DATA_DIR, exist_ok=True)
+    return os.path.join(DATA_DIR, name)
+
+
+def export_path(n, seed=0):
+    """Path of a cached synthetic export JSON with `n` records (built on demand)."""
+    path = _cached(f"repeaters_{n}_{seed}.json")
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        with open(tmp, "w") as f:
+            f.write(f'{{"count": {n}, "results": [\n')
+            for i, rec in enumerate(iter_records(n, seed)):
+                if i:
+                    f.write(",\n")
+                f.write(json.dumps(rec))
+            f.write("\n]}\n")
+        os.replace(tmp, path)
+    return path
+
+
+def load_db(path, export):
+    """Create the schema + spatial index in `path` and load `export` into it."""
+    import insert_repeaters as ir
+    from repeater_tools.db import ensure_spatial_index
+    from repeater_tools.tiles import ensure_tile_cache
+
+    conn = sqlite3.connect(path, isolation_level=None)
+    try:
+        conn.execute(ir.DDL)
+        ensure_spatial_index(conn)
+        ensure_tile_cache(conn)
+        loaded = ir.bulk_load(conn, ir.iter_records(export))
+    finally:
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.close()
+    return loaded
+
+
+def db_path(n, seed=0):
+    """Path of a cached synthetic repeater DB with `n` rows (built on demand)."""
+    path = _cached(f"repeaters_{n}_{seed}.sqlite")
+    if not os.path.exists(path):
+        tmp = path + ".tmp"
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        load_db(tmp, export_path(n, seed))
+        os.replace(tmp, path)
+    conn = sqlite3.connect(path)
+    if "caps" not in {row[1] for row in conn.execute("PRAGMA table_info(repeaters)")}:
+        # cached from before the capability bitmask
+        from repeater_tools.db import ensure_spatial_index
+        ensure_spatial_index(conn)
+    conn.close()
+    from repeater_tools.snapshot import get_snapshot, write_snapshot
+    if get_snapshot(path) is None:
+        write_snapshot(path)
+    return path
+
+
+# ─── routes ────────────────────────────────────────────────────────────────────
+def _wiggle(start, end, n_points, amplitude, seed):
+    rng = np.random.default_rng(seed)
+    t = np.linspace(0.0, 1.0, n_points)
+    lats = start[0] + (end[0] - start[0]) * t
+    lons = start[1] + (end[1] - start[1]) * t
+    # smooth bends, like a road following terrain, plus a little jitter
+    for k, phase in zip((3, 7, 17), rng.uniform(0, 2 * np.pi, 3)):
+        lats += amplitude / k * np.sin(2 * np.pi * k * t + phase)
+        lons += amplitude / k * np.cos(2 * np.pi * k * t + phase)
+    lats += rng.normal(0, amplitude * 2e-4, n_points)
+    lons += rng.normal(0, amplitude * 2e-4, n_points)
+    return np.column_stack([lats, lons])
+
+
+def short_route(n_points=400, seed=0):
+    """~30 mile route (Rochester, MN toward Winona) with `n_points` vertices."""
+    return _wiggle((44.02, -92.47), (44.05, -91.90), n_points, 0.05, seed)
+
+
+def cross_country_route(n_points=20000, seed=0):
+    """Seattle → Miami style route, roughly 2,900 miles, `n_points` vertices."""
+    return _wiggle((47.61, -122.33), (25.76, -80.19), n_points, 1.5, seed)
+
+
+ROUTES = {"short": short_route, "cross_country": cross_country_route}
+
+
+def write_track(path, pts):
+    """Write a polyline as a GeoJSON LineString feature (lon, lat order)."""
+    feature = {"type": "Feature", "properties": {},
+               "geometry": {"type": "LineString",
+                            "coordinates": np.asarray(pts)[:, ::-1].round(6).tolist()}}
+    with open(path, "w") as f:
+        json.dump(feature, f)
+    return path
+
+
+def track_path(name, seed=0):
+    """Cached GeoJSON track file for one of ROUTES."""
+    path = _cached(f"route_{name}_{seed}.geojson")
+    if not os.path.exists(path):
+        write_track(path, ROUTES[name](seed=seed))
+    return path
@@ -1,15 +1,40 @@
 #!/usr/bin/env python3
 """
-setup_repeaters_db.py
+insert_repeaters.py
 
-Creates (or verifies) a `repeaters` table in your existing SQLite DB
-(defaults to gmaps_cache.sqlite) and loads all entries from US_Repeaters.json
-into it, using (state_id, rptr_id) as the primary key.
+Creates (or verifies) a `repeaters` table in the SQLite DB at DB_PATH
+(defaults to repeater_route.sqlite) and loads all entries from the JSON export
+at JSON_PATH (defaults to US_Repeaters.json) into it, using
+(state_id, rptr_id) as the primary key.  Records are streamed from the JSON
+and written in batched transactions, so memory stays flat no matter how large
+the export is.  --sync writes only new or changed records (by `Last Update`)
+and --prune additionally removes repeaters missing from a complete export.
+
+Every row gets a `caps` capability bitmask (mode, band, status, access; see
+repeater_tools.filters) for filtered lookups.  Also builds and maintains the
+`repeaters_rtree` spatial index (and the fm_analog partial index) used by
+repeater_tools.db and the `repeater_tiles` buckets used by
+repeater_tools.tiles.  Run with --migrate to add them to an existing DB
+without reloading the JSON.  After every run a columnar snapshot of the table
+(repeater_tools.snapshot) is written next to the DB unless --no-snapshot; a
+--sync that changed nothing keeps the current one.
 """
 
 import os
+import sys
+import re
 import json
+import time
 import sqlite3
+import argparse
+
+# ─── ensure we can import our src/ packages if not installed ────────────────────
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from repeater_tools.db import ensure_capabilities, ensure_spatial_index
+from repeater_tools.filters import CAPS_COLUMNS, capabilities
+from repeater_tools.snapshot import get_snapshot, snapshot_path, write_snapshot
+from repeater_tools.tiles import ensure_tile_cache
 
 # ─── Configuration ─────────────────────────────────────────────────────────────
 DB_PATH    = os.getenv("DB_PATH", "repeater_route.sqlite")
@@ -60,6 +85,7 @@ CREATE TABLE IF NOT EXISTS repeaters (
     system_fusion       TEXT,
     notes               TEXT,
     last_update         TEXT,
+    caps                INTEGER,    -- repeater_tools.filters.capabilities()
     PRIMARY KEY (state_id, rptr_id)
 );
 """
@@ -111,52 +137,323 @@ FIELDS = [
 ]
 
 
-def coerce(value, to_type):
-    """Convert empty strings to None, else cast."""
-    if value is None or (isinstance(value, str) and value.strip() == ""):
-        return None
-    try:
-        return to_type(value)
-    except Exception:
+# ─── Precompiled per-column converters ─────────────────────────────────────────
+# Empty strings become None; numeric values that fail to parse become None.
+# `str` columns (the common case) take a fast path with no try/except.
+def _to_str(value):
+    if value is None:
         return None
+    if isinstance(value, str):
+        return value if value.strip() else None
+    return str(value)
+
+def _make_numeric(to_type):
+    def convert(value):
+        if value is None or value == "":
+            return None
+        try:
+            return to_type(value)
+        except (TypeError, ValueError):
+            return None
+    return convert
+
+_CONVERTERS = {str: _to_str, int: _make_numeric(int), float: _make_numeric(float)}
+CONVERTERS = [(json_key, _CONVERTERS[to_type]) for json_key, _, to_type in FIELDS]
+
+DB_COLS    = [db_col for _, db_col, _ in FIELDS]
+
+# every row written also carries its capability bitmask, computed here
+ROW_COLS   = DB_COLS + ["caps"]
+CAPS_INDEX = [DB_COLS.index(col) for col in CAPS_COLUMNS]
+
+
+def to_row(entry):
+    """Convert one RepeaterBook JSON record into a tuple in ROW_COLS order."""
+    get = entry.get
+    row = [convert(get(json_key)) for json_key, convert in CONVERTERS]
+    row.append(capabilities(*[row[i] for i in CAPS_INDEX]))
+    return tuple(row)
+
+
+# ─── Streaming JSON reader ─────────────────────────────────────────────────────
+READ_CHUNK = 1 << 20   # characters per read
+
+# what may follow a bare number / literal in the stream
+_SCALAR_END = re.compile(r"[\s,:\]}]")
+
+class _Stream:
+    """Rolling text buffer over a file for incremental `raw_decode` calls."""
+
+    def __init__(self, f):
+        self.f   = f
+        self.buf = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.f.read(READ_CHUNK)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buf = self.buf[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character ('' at EOF)."""
+        while True:
+            while self.pos < len(self.buf) and self.buf[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buf) or not self.fill():
+                return self.buf[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} at offset {self.pos} of JSON stream")
+        self.pos += 1
+
+    def value(self, decoder: json.JSONDecoder):
+        """Decode the next complete JSON value."""
+        if self.peek() not in '{["':
+            # a number cut at the buffer edge ("1.", "2e", "-") would still
+            # decode as a shorter one: buffer up to its delimiter first
+            while not _SCALAR_END.search(self.buf, self.pos) and self.fill():
+                pass
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buf, self.pos)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            self.pos = end
+            return value
+
+
+def iter_records(path):
+    """
+    Yield repeater records one at a time from a RepeaterBook export, either a
+    bare JSON list or an object with a "results" list, without loading the
+    whole file.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r") as f:
+        stream = _Stream(f)
+        if stream.peek() == "{":
+            # walk the top-level object until we reach "results"
+            stream.expect("{")
+            while stream.peek() != "[":
+                if stream.peek() == "}":
+                    return
+                key = stream.value(decoder)
+                stream.expect(":")
+                if key == "results":
+                    break
+                stream.value(decoder)
+                if stream.peek() == ",":
+                    stream.expect(",")
+
+        stream.expect("[")
+        if stream.peek() == "]":
+            return
+        while True:
+            yield stream.value(decoder)
+            if stream.peek() == "]":
+                return
+            stream.expect(",")
+
+
+# ─── Bulk load ─────────────────────────────────────────────────────────────────
+BATCH_SIZE = 5000
+
+# relaxed durability while loading; the DB can simply be rebuilt from the JSON
+LOAD_PRAGMAS = (
+    "PRAGMA journal_mode = WAL",
+    "PRAGMA synchronous = OFF",
+    "PRAGMA temp_store = MEMORY",
+    "PRAGMA cache_size = -65536",
+)
+
+UPSERT = f"""
+    INSERT INTO repeaters ({','.join(ROW_COLS)})
+    VALUES ({', '.join('?' for _ in ROW_COLS)})
+    ON CONFLICT (state_id, rptr_id) DO UPDATE SET {', '.join(
+        f"{col} = excluded.{col}" for col in ROW_COLS
+        if col not in ("state_id", "rptr_id")
+    )};
+"""
+
+
+def batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+DELETE = "DELETE FROM repeaters WHERE state_id = ? AND rptr_id = ?"
+
+LAST_UPDATE = DB_COLS.index("last_update")
+
+
+def write_rows(conn, stmt, rows) -> int:
+    """
+    Run `stmt` over `rows` in BATCH_SIZE `executemany` batches, one explicit
+    transaction per batch.  The load pragmas are only applied once the first
+    batch arrives, so a run with nothing to write leaves the DB file (and its
+    mtime) untouched.  Returns the number of rows written.
+    """
+    written = 0
+    started = time.perf_counter()
+    for batch in batched(rows, BATCH_SIZE):
+        if not written:
+            for pragma in LOAD_PRAGMAS:
+                conn.execute(pragma)
+        conn.execute("BEGIN")
+        conn.executemany(stmt, batch)
+        conn.execute("COMMIT")
+        written += len(batch)
+        if written % (BATCH_SIZE * 10) == 0:
+            rate = written / (time.perf_counter() - started)
+            print(f"  … {written} rows so far ({rate:,.0f} rows/s)")
+    return written
+
+
+def bulk_load(conn, records) -> int:
+    """UPSERT every record into `repeaters`.  Returns the number of rows written."""
+    return write_rows(conn, UPSERT, map(to_row, records))
+
+
+def sync(conn, records, prune: bool = False) -> dict:
+    """
+    Incrementally apply an export: only records that are new, or whose
+    `Last Update` differs from the stored `last_update`, are written.  With
+    `prune`, stored repeaters missing from the (complete) export are deleted.
+
+    Returns counts of inserted / updated / deleted / unchanged repeaters.
+    """
+    stored = {
+        (state_id, rptr_id): last_update
+        for state_id, rptr_id, last_update in conn.execute(
+            "SELECT state_id, rptr_id, last_update FROM repeaters")
+    }
+    counts = dict(inserted=0, updated=0, deleted=0, unchanged=0)
+    seen = set()
+
+    def changed_rows():
+        for row in map(to_row, records):
+            key = (row[0], row[1])
+            seen.add(key)
+            if key not in stored:
+                counts["inserted"] += 1
+            elif stored[key] == row[LAST_UPDATE]:
+                counts["unchanged"] += 1
+                continue
+            else:
+                counts["updated"] += 1
+            stored[key] = row[LAST_UPDATE]
+            yield row
+
+    write_rows(conn, UPSERT, changed_rows())
+
+    if prune:
+        if not seen:
+            raise ValueError("Refusing to prune against an empty export")
+        counts["deleted"] = write_rows(
+            conn, DELETE, (key for key in stored if key not in seen))
+    return counts
+
+
+def refresh_snapshot():
+    """Rewrite the columnar snapshot so it matches the DB as just written."""
+    started = time.perf_counter()
+    rows = write_snapshot(DB_PATH)
+    print(f"✓ Snapshot {snapshot_path(DB_PATH)!r} written "
+          f"({rows} rows, {time.perf_counter() - started:.2f}s)")
 
 
 def main():
-    # 1) ensure the table exists
-    conn = sqlite3.connect(DB_PATH)
-    cur  = conn.cursor()
-    cur.execute(DDL)
+    p = argparse.ArgumentParser(description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument(
+        '--migrate',
+        action='store_true',
+        help='only create/backfill the spatial index and capability masks '
+             'on an existing DB')
+    p.add_argument(
+        '--sync',
+        action='store_true',
+        help='only write repeaters that are new or have a newer Last Update')
+    p.add_argument(
+        '--prune',
+        action='store_true',
+        help='with --sync, delete repeaters missing from the export '
+             '(use only with a complete export)')
+    p.add_argument(
+        '--no-snapshot',
+        action='store_true',
+        help='do not (re)write the columnar snapshot next to the DB')
+    args = p.parse_args()
+    if args.prune and not args.sync:
+        p.error("--prune requires --sync")
+
+    # 1) ensure the table and its spatial index exist
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
+    conn.execute(DDL)
+    if args.migrate:
+        # also recompute capability bits left stale by other writers
+        recomputed = ensure_capabilities(conn)
+    added = ensure_spatial_index(conn)
+    tiled = ensure_tile_cache(conn)
+    if args.migrate:
+        conn.close()
+        print(f"✓ Spatial index ready in {DB_PATH!r} ({added} rows indexed, "
+              f"{tiled} rows tiled, {recomputed} capability masks updated)")
+        if not args.no_snapshot:
+            refresh_snapshot()
+        return
 
-    # 2) load JSON
+    # 2) stream JSON records straight into batched UPSERTs
     print(f"Loading JSON from {JSON_PATH!r}…")
-    with open(JSON_PATH, "r") as f:
-        data = json.load(f)
-    repeaters = data.get("results", data if isinstance(data, list) else [])
-    print(f"Found {len(repeaters)} records in JSON.")
-
-    # 3) prepare our INSERT statement
-    db_cols = [db_col for _, db_col, _ in FIELDS]
-    placeholders = ", ".join("?" for _ in db_cols)
-    stmt = f"""
-        INSERT OR REPLACE INTO repeaters ({','.join(db_cols)})
-        VALUES ({placeholders});
-    """
+    started = time.perf_counter()
+    try:
+        if args.sync:
+            counts = sync(conn, iter_records(JSON_PATH), prune=args.prune)
+        else:
+            loaded = bulk_load(conn, iter_records(JSON_PATH))
+    finally:
+        # back to a single self-contained DB file with normal durability
+        conn.execute("PRAGMA journal_mode = DELETE")
+        conn.execute("PRAGMA synchronous = FULL")
+        conn.close()
+    elapsed = time.perf_counter() - started
+
+    if args.sync:
+        seen = counts["inserted"] + counts["updated"] + counts["unchanged"]
+        rate = seen / elapsed if elapsed else 0.0
+        print(f"✓ Synced {DB_PATH!r} in {elapsed:.2f}s ({rate:,.0f} rows/s): "
+              f"{counts['inserted']} inserted, {counts['updated']} updated, "
+              f"{counts['deleted']} deleted, {counts['unchanged']} unchanged")
+    else:
+        rate = loaded / elapsed if elapsed else 0.0
+        print(f"✓ Done. Inserted or updated {loaded} repeaters into {DB_PATH!r} "
+              f"in {elapsed:.2f}s ({rate:,.0f} rows/s)")
 
-    # 4) upsert all records
-    inserted = 0
-    for entry in repeaters:
-        values = [
-            coerce(entry.get(json_key), to_type)
-            for json_key, _, to_type in FIELDS
-        ]
-        cur.execute(stmt, values)
-        inserted += 1
-        if inserted % 10000 == 0:
-            print(f"  … inserted {inserted} rows so far")
-
-    conn.commit()
-    conn.close()
-    print(f"✓ Done. Inserted or updated {inserted} repeaters into {DB_PATH!r}")
+    # 3) columnar snapshot for fast, shared startup of in-memory lookups;
+    #    a sync that changed nothing keeps a snapshot that is still current
+    changed = not args.sync or any(counts[k] for k in ("inserted", "updated", "deleted"))
+    if args.no_snapshot:
+        pass
+    elif not changed and get_snapshot(DB_PATH) is not None:
+        print(f"✓ Snapshot {snapshot_path(DB_PATH)!r} is current")
+    else:
+        refresh_snapshot()
 
 if __name__ == "__main__":
     main()
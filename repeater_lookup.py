@@ -3,25 +3,30 @@
 repeater_lookup.py
 
 Sample a Google Maps route and lookup nearby HAM repeaters along the way,
-then output a CHIRP‐compatible CSV.
+then output a CHIRP‐compatible CSV (or another radio profile, see --format).
 """
 import os
 import sys
 import argparse
 
-from dotenv import load_dotenv
-import requests_cache
-
-# ─── ensure env + HTTP caching before anything that calls Google ───────────────
-load_dotenv()
-requests_cache.install_cache('repeater_route', backend='sqlite', expire_after=None)
-
 # ─── ensure we can import our src/ packages if not installed ────────────────────
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from repeater_tools.route_sampler import parse_maps_url, sample_route
-from repeater_tools.db          import get_repeaters_within_range
+# ─── .env before the modules that read their settings at import ────────────────
+# (the Google client and its HTTP cache are only set up on first use)
+from repeater_tools import config
+config.load_env()
+
+from repeater_tools.route_sampler import (
+    SAMPLE_OVERLAP, get_route, parse_maps_url, sample_route, sample_route_adaptive,
+)
+from repeater_tools.directions    import DirectionsError, set_provider
+from repeater_tools               import instrument
+from repeater_tools.db          import get_repeaters_along_route, get_repeaters_near_samples
+from repeater_tools.filters     import BANDS, FM_ONLY, MODES, describe, parse_filter
+from repeater_tools.selection   import select_channels
 from repeater_tools.csv_writer  import CSVWriter
+from repeater_tools.writers     import PROFILES
 
 def main():
     p = argparse.ArgumentParser(description=__doc__)
@@ -31,56 +36,218 @@ def main():
     p.add_argument(
         '-i', '--interval',
         type=float,
-        help='Miles between route samples (default: MAP_INTERVAL_MILES env or 5)')
+        help='Miles between route samples with --sampled (default: MAP_INTERVAL_MILES env or 5)')
     p.add_argument(
         '-r', '--radius',
         type=float,
         help='Search radius in miles (default: QUERY_RANGE env or 5)')
+    p.add_argument(
+        '--sampled',
+        action='store_true',
+        help='Query a radius around each route sample instead of the whole route corridor')
+    p.add_argument(
+        '--adaptive',
+        action='store_true',
+        help='Sampled mode with samples placed by route geometry so consecutive '
+             'radius circles overlap by --overlap, instead of every --interval '
+             'miles (implies --sampled)')
+    p.add_argument(
+        '--overlap',
+        type=float,
+        default=SAMPLE_OVERLAP,
+        help='With --adaptive, overlap between consecutive query circles as a '
+             'fraction of --radius (default: SAMPLE_OVERLAP env or %(default)s)')
+    p.add_argument(
+        '--simplify',
+        type=float,
+        metavar='MILES',
+        help='With --adaptive, Douglas-Peucker tolerance for the route '
+             '(default: a quarter of the overlap margin)')
+    p.add_argument(
+        '--mode',
+        help="Comma-separated modes to include, any of: "
+             f"{', '.join(MODES)}, or 'any' (default: fm)")
+    p.add_argument(
+        '--band',
+        help=f"Comma-separated bands to include, any of: {', '.join(BANDS)} "
+             "(default: all)")
+    p.add_argument(
+        '--freq',
+        metavar='LOW-HIGH',
+        help="Output frequency range in MHz, e.g. 144-148 or 420- (default: any)")
+    p.add_argument(
+        '--status',
+        help="Operational status to include: on-air, off-air (default: both)")
+    p.add_argument(
+        '--access',
+        help="Comma-separated access types to include, any of: open, closed, "
+             "private (default: all)")
     p.add_argument(
         '-o', '--output',
         default='repeaters.csv',
-        help='Output CSV filename (default: %(default)s)')
+        help="Output filename, or '-' for stdout (default: %(default)s)")
+    p.add_argument(
+        '-f', '--format',
+        choices=sorted(PROFILES),
+        default='chirp',
+        help='Output profile: chirp (generic CHIRP CSV), uvk5 (Quansheng UV-K5 '
+             'CHIRP layout) or ndjson (default: %(default)s)')
+    p.add_argument(
+        '-n', '--channels',
+        type=int,
+        help='Channel budget: keep only the best N repeaters for a radio with N '
+             'memories, spread along the route (default: keep all)')
+    p.add_argument(
+        '--dup-window',
+        type=float,
+        default=25.0,
+        help='With --channels, collapse same-frequency/same-tone repeaters '
+             'within this many route miles (default: %(default)s)')
+    p.add_argument(
+        '--directions',
+        metavar='PROVIDER',
+        help="Where routes come from: 'google' (default), a GPX/GeoJSON/polyline "
+             "track file or directory, or a stub server URL "
+             "(default: DIRECTIONS_PROVIDER env)")
+    p.add_argument(
+        '-b', '--batch',
+        metavar='FILE',
+        help="Batch mode: read routes (URLs or 'origin | destination' lines) "
+             "from FILE, or '-' for stdin")
+    p.add_argument(
+        '--output-dir',
+        default='batch_output',
+        help='Batch mode: directory for per-route CSVs and summary.csv (default: %(default)s)')
+    p.add_argument(
+        '-j', '--jobs',
+        type=int,
+        help='Batch mode: lookup worker processes (default: CPU count)')
+    p.add_argument(
+        '--directions-concurrency',
+        type=int,
+        default=4,
+        help='Batch mode: max concurrent Directions requests (default: %(default)s)')
+    p.add_argument(
+        '--profile',
+        choices=['text', 'json'],
+        help='Print per-stage timings and counters (route fetch/decode, SQL, '
+             'distance filtering, selection, output) to stderr')
+    p.add_argument(
+        '--pstats',
+        metavar='FILE',
+        help='Also run under cProfile and dump pstats data to FILE')
     args = p.parse_args()
+    if args.interval is not None and not args.interval > 0:
+        p.error("--interval must be > 0")
+    if args.adaptive and not 0 <= args.overlap < 1:
+        p.error("--overlap must be in [0, 1)")
+    try:
+        args.filter = parse_filter(args.mode, args.band, args.status, args.access,
+                                   args.freq)
+    except ValueError as e:
+        p.error(str(e))
+
+    profiler = None
+    if args.pstats:
+        import cProfile
+        profiler = cProfile.Profile()
+    if args.profile:
+        instrument.enable()
+    try:
+        if profiler:
+            profiler.enable()
+        if args.directions:
+            set_provider(args.directions)
+        run(p, args)
+    except DirectionsError as e:
+        sys.exit(str(e))
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.pstats)
+        if args.profile:
+            report = (instrument.report_json() if args.profile == 'json'
+                      else instrument.report_text())
+            print(report, file=sys.stderr)
+
+def run(p, args):
+    if args.batch:
+        from repeater_tools.batch import LookupOptions, read_routes, run_batch
+        radius = args.radius or float(os.getenv('QUERY_RANGE', '5'))
+        sampling = ('adaptive' if args.adaptive else
+                    'interval' if args.sampled else None)
+        options = LookupOptions(
+            sampling=sampling,
+            interval=args.interval or float(os.getenv('MAP_INTERVAL_MILES', '5')),
+            overlap=args.overlap,
+            tolerance=args.simplify,
+            channels=args.channels,
+            dup_window=args.dup_window,
+        )
+        if args.batch == '-':
+            specs = read_routes(sys.stdin)
+        else:
+            with open(args.batch) as f:
+                specs = read_routes(f)
+        rows = run_batch(specs, radius, args.output_dir,
+                         jobs=args.jobs,
+                         profile=args.format,
+                         directions_concurrency=args.directions_concurrency,
+                         instrumented=bool(args.profile),
+                         filt=args.filter,
+                         options=options)
+        failed = [row for row in rows if row.get('error')]
+        print(f"Wrote {len(rows) - len(failed)} route files to {args.output_dir}/ "
+              f"({len(failed)} failed); see {args.output_dir}/summary.csv")
+        return
 
     url = args.url or os.getenv('ROUTE_URI')
     if not url:
         p.error("Provide --url or set ROUTE_URI in your .env")
 
-    origin, dest = parse_maps_url(url)
+    try:
+        origin, dest = parse_maps_url(url)
+    except ValueError as e:
+        p.error(f"URL parse error: {e}")
     interval = args.interval or float(os.getenv('MAP_INTERVAL_MILES', '5'))
     radius   = args.radius   or float(os.getenv('QUERY_RANGE',        '5'))
 
-    # 1) sample the driving route
-    coords = sample_route(origin, dest, interval)
-
-    # 2) collect all nearby repeaters
-    all_reps = []
-    for lat, lon in coords:
-        reps = get_repeaters_within_range((lat, lon), radius)
-        all_reps.extend(reps)
-
-    # 3) dedupe by key fields
-    seen = set()
-    unique = []
-    for rpt in all_reps:
-        key = (
-            rpt.callsign,
-            rpt.notes,
-            rpt.frequency,
-            rpt.offset,
-            rpt.offset_dir,
-            rpt.tone_mode,
-            rpt.tone
-        )
-        if key not in seen:
-            seen.add(key)
-            unique.append(rpt)
+    if not (args.sampled or args.adaptive):
+        # 1) one corridor query over the whole route; already unique & ordered
+        pts, cum = get_route(origin, dest)
+        route_miles = float(cum[-1])
+        hits = get_repeaters_along_route(pts, radius, args.filter)
+    else:
+        # 1) sample the driving route: adaptively from its geometry, or every
+        #    `interval` miles (sample i sits at mile i * interval)
+        if args.adaptive:
+            try:
+                coords, miles = sample_route_adaptive(origin, dest, radius, args.overlap,
+                                                      args.simplify)
+            except ValueError as e:
+                p.error(str(e))
+        else:
+            coords = sample_route(origin, dest, interval)
+            miles = [i * interval for i in range(len(coords))]
+        route_miles = None
+
+        # 2) one radius query per sample, each repeater kept at its nearest
+        #    sample, materialized in route order
+        hits = get_repeaters_near_samples(coords, miles, radius, args.filter)
+
+    # 3) optionally fit the radio's channel budget
+    if args.channels:
+        hits = select_channels(hits, args.channels, radius,
+                               dup_window=args.dup_window,
+                               route_miles=route_miles)
 
-    # 4) write CHIRP CSV
-    writer = CSVWriter(args.output)
-    writer.write_chirp_csv(unique)
+    # 4) stream into the output file in the chosen radio profile
+    writer = CSVWriter(args.output, args.format)
+    count = writer.write(hit.repeater for hit in hits)
 
-    print(f"Wrote {len(unique)} unique repeaters to {args.output}")
+    if args.output != '-':
+        only = f" ({describe(args.filter)})" if args.filter != FM_ONLY else ""
+        print(f"Wrote {count} unique repeaters{only} to {args.output}")
 
 if __name__ == '__main__':
     main()
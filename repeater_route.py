@@ -12,27 +12,34 @@ Configuration via .env:
     MAPS_API_KEY        Google Maps API key (Directions & Geocoding enabled)
     MAP_INTERVAL_MILES  Default sampling interval in miles (float, default 5)
     ROUTE_URI           Optional default Google Maps URL
+    ROUTE_CACHE_PATH    Decoded-route store (default route_cache.sqlite, empty disables)
+    ROUTE_CACHE_TTL     Route store entry lifetime in seconds (default 0 = never expire)
+    ROUTE_CACHE_MAX     Routes kept before least-recently-used eviction (default 500)
+    DIRECTIONS_PROVIDER 'google' (default), a track file/directory, or a stub server URL
+    HTTP_CACHE          requests_cache name for Google calls (default repeater_route, empty disables)
 """
 import os
 import sys
+import json
 import argparse
 
-from dotenv import load_dotenv
-import requests_cache
-
 # -----------------------------------------------------------------------------
-# Bootstrap & caching
+# Bootstrap
 # -----------------------------------------------------------------------------
-#  - load environment variables
-#  - install a requests_cache so that all googlemaps calls (including reverse-
-#    geocode later on) get cached to 'gmaps_cache.sqlite'
-load_dotenv()
-requests_cache.install_cache("repeater_route", backend="sqlite", expire_after=None)
+#  - make src/ importable when the package is not installed
+#  - load environment variables before the modules that read them at import
+#  - the googlemaps client and its requests_cache (HTTP_CACHE) are created on
+#    the first Google call, not here
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "src"))
+
+from repeater_tools import config
+config.load_env()
 
 # -----------------------------------------------------------------------------
-# Third‐party / local imports that depend on the env & cache being in place
+# Local imports that depend on the env being in place
 # -----------------------------------------------------------------------------
-from repeater_tools.route_sampler import parse_maps_url, sample_route
+from repeater_tools.route_sampler import parse_maps_url, sample_route, get_route_store
+from repeater_tools.directions import DirectionsError, set_provider
 
 # -----------------------------------------------------------------------------
 # Config defaults & parsing
@@ -54,8 +61,34 @@ def main():
         type=float,
         help="sampling interval in miles (default MAP_INTERVAL_MILES)"
     )
+    parser.add_argument(
+        "--directions",
+        metavar="PROVIDER",
+        help="'google', a GPX/GeoJSON/polyline track file or directory, or a "
+             "stub server URL (default DIRECTIONS_PROVIDER)"
+    )
+    parser.add_argument(
+        "--cache-stats",
+        action="store_true",
+        help="print route store statistics as JSON and exit"
+    )
+    parser.add_argument(
+        "--cache-clear",
+        action="store_true",
+        help="empty the route store and exit"
+    )
     args = parser.parse_args()
 
+    if args.cache_stats or args.cache_clear:
+        store = get_route_store()
+        if store is None:
+            sys.exit("Route store disabled (ROUTE_CACHE_PATH is empty)")
+        if args.cache_clear:
+            store.clear()
+        if args.cache_stats:
+            print(json.dumps(store.stats(), indent=2))
+        return
+
     url = args.url or ROUTE_URI
     if not url:
         sys.exit("Provide a Google Maps URL with -u or set ROUTE_URI in .env")
@@ -69,7 +102,12 @@ def main():
     print(f"Destination: {destination}\n")
 
     interval = args.interval or MAP_INTERVAL
-    coords = sample_route(origin, destination, interval)
+    try:
+        if args.directions:
+            set_provider(args.directions)
+        coords = sample_route(origin, destination, interval)
+    except DirectionsError as e:
+        sys.exit(str(e))
 
     for lat, lon in coords:
         print(f"{lat:.6f}, {lon:.6f}")
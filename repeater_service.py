@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+repeater_service.py
+
+Run the repeater lookups as a long-lived local HTTP service, so callers pay
+startup (imports, DB and index warm-up) once instead of per request.
+
+Usage:
+    python repeater_service.py [--host 127.0.0.1] [--port 8765]
+
+Then e.g.:
+    curl 'http://127.0.0.1:8765/corridor?url=<GOOGLE_MAPS_DIRECTIONS_URL>&radius=10'
+    curl 'http://127.0.0.1:8765/export?url=<URL>&format=uvk5' -o channels.csv
+
+See repeater_tools/service.py for the full endpoint list.
+"""
+import os
+import sys
+import asyncio
+import argparse
+
+# ─── ensure we can import our src/ packages if not installed ────────────────────
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+# ─── .env before the modules that read their settings at import ────────────────
+from repeater_tools import config
+config.load_env()
+
+from repeater_tools import db
+from repeater_tools.directions import DirectionsError, set_provider
+from repeater_tools.service import serve
+
+def main():
+    p = argparse.ArgumentParser(description=__doc__,
+                                formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument(
+        '--host',
+        default=os.getenv('SERVICE_HOST', '127.0.0.1'),
+        help='Address to bind (default: %(default)s)')
+    p.add_argument(
+        '--port',
+        type=int,
+        default=int(os.getenv('SERVICE_PORT', '8765')),
+        help='Port to listen on (default: %(default)s)')
+    p.add_argument(
+        '-j', '--jobs',
+        type=int,
+        default=4,
+        help='Worker threads for DB lookups and Directions calls (default: %(default)s)')
+    p.add_argument(
+        '--directions-concurrency',
+        type=int,
+        default=4,
+        help='Max concurrent Directions requests (default: %(default)s)')
+    p.add_argument(
+        '--directions',
+        metavar='PROVIDER',
+        help="'google', a GPX/GeoJSON/polyline track file or directory, or a "
+             "stub server URL (default: DIRECTIONS_PROVIDER env or google)")
+    p.add_argument(
+        '--index',
+        choices=['memory', 'tiles', 'sqlite'],
+        default=os.getenv('REPEATER_INDEX', 'memory').lower(),
+        help='Answer lookups from the in-memory grid index (kept warm), the '
+             'LRU tile cache, or SQLite (default: %(default)s)')
+    args = p.parse_args()
+
+    db.USE_MEMORY_INDEX = args.index == 'memory'
+    db.USE_TILE_CACHE = args.index == 'tiles'
+    if args.directions:
+        try:
+            set_provider(args.directions)
+        except DirectionsError as e:
+            sys.exit(str(e))
+    try:
+        asyncio.run(serve(args.host, args.port, args.jobs, args.directions_concurrency))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
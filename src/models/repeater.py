@@ -2,8 +2,16 @@
 from dataclasses import dataclass
 from typing import Optional
 
+
 @dataclass
 class Repeater:
+    # no per-instance __dict__: national-scale lookups build a lot of these
+    __slots__ = (
+        "callsign", "notes", "frequency", "offset", "offset_dir", "tone_mode",
+        "tone", "latitude", "longitude", "city", "county", "state", "fm_analog",
+        "status", "state_id", "rptr_id",
+    )
+
     callsign:     Optional[str]
     notes:        Optional[str]    # the repeater’s human‐readable notes?
     frequency:    float            # output freq (MHz)
@@ -17,6 +25,9 @@ class Repeater:
     county:       Optional[str]
     state:        Optional[str]
     fm_analog:    Optional[str]
+    status:       Optional[str]    # 'On-air', 'Off-air', ...
+    state_id:     Optional[str]    # RepeaterBook primary key, part 1
+    rptr_id:      Optional[int]    # RepeaterBook primary key, part 2
 
     @staticmethod
     def from_row(row) -> "Repeater":
@@ -57,6 +68,9 @@ class Repeater:
             city         = row["nearest_city"],
             county       = row["county"],
             state        = row["state"],
-            fm_analog    = fm_analog
+            fm_analog    = fm_analog,
+            status       = row["operational_status"],
+            state_id     = row["state_id"],
+            rptr_id      = row["rptr_id"],
         )
 
@@ -0,0 +1,204 @@
+# repeater_tools/batch.py
+"""
+Batch mode: many routes per invocation.
+
+Directions are resolved on a bounded thread pool (network-bound), then the
+corridor lookups and CSV writes run on a process pool whose workers all open
+the repeater DB read-only.  One channel file (CHIRP CSV by default, see
+repeater_tools.writers) is written per route, plus a summary.csv with a line
+per route.
+"""
+import csv
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Iterable, List, NamedTuple, Optional
+
+from . import db, instrument
+from .csv_writer import CSVWriter
+from .filters import RepeaterFilter
+from .selection import select_channels
+from .writers import get_profile
+from .route_sampler import (
+    SAMPLE_OVERLAP, adaptive_samples, get_route, parse_maps_url,
+    resample_polyline_array,
+)
+
+
+class RouteSpec(NamedTuple):
+    name:        str
+    origin:      str
+    destination: str
+    error:       Optional[str] = None   # set for a line that didn't parse
+
+
+class LookupOptions(NamedTuple):
+    """Per-route lookup settings; the single-route CLI flags of the same names."""
+    sampling:   Optional[str] = None      # None (corridor), 'interval' or 'adaptive'
+    interval:   float = 5.0               # miles between samples ('interval')
+    overlap:    float = SAMPLE_OVERLAP    # circle overlap ('adaptive')
+    tolerance:  Optional[float] = None    # simplification tolerance ('adaptive')
+    channels:   Optional[int] = None      # channel budget (None: keep all)
+    dup_window: float = 25.0              # with `channels`
+
+
+def parse_route_line(line: str) -> Optional[tuple]:
+    """
+    Parse one batch line: a Google Maps URL, or an origin/destination pair
+    separated by a tab or ' | '.  Blank lines and '#' comments give None.
+    """
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+    if line.startswith(('http://', 'https://')):
+        return parse_maps_url(line)
+    for sep in ('\t', ' | '):
+        if sep in line:
+            origin, dest = (part.strip() for part in line.split(sep, 1))
+            if origin and dest:
+                return origin, dest
+    raise ValueError(f"Cannot parse route line: {line!r}")
+
+
+def _slug(text: str) -> str:
+    return re.sub(r'[^A-Za-z0-9]+', '_', text).strip('_')[:40] or 'route'
+
+
+def read_routes(lines: Iterable[str]) -> List[RouteSpec]:
+    """
+    RouteSpecs for the routes in `lines`.  A line that can't be parsed is kept
+    as a spec carrying its error (and line number), so it shows up as a failed
+    row in summary.csv instead of aborting the batch.
+    """
+    specs = []
+    for lineno, line in enumerate(lines, 1):
+        try:
+            parsed = parse_route_line(line)
+        except ValueError as e:
+            name = f"{len(specs) + 1:03d}_line{lineno}"
+            specs.append(RouteSpec(name, line.strip(), '', f"line {lineno}: {e}"))
+            continue
+        if parsed is None:
+            continue
+        origin, dest = parsed
+        name = f"{len(specs) + 1:03d}_{_slug(origin)}__{_slug(dest)}"
+        specs.append(RouteSpec(name, origin, dest))
+    return specs
+
+
+# ─── worker side ───────────────────────────────────────────────────────────────
+def _init_worker(db_path: str, instrumented: bool = False) -> None:
+    db.DB_PATH = db_path
+    if instrumented:
+        instrument.enable()
+
+
+def _lookup_route(name, path, cum, radius, out_path, profile='chirp', filt=None,
+                  options=LookupOptions()):
+    started = time.perf_counter()
+    instrument.reset()
+    if options.sampling is None:
+        hits = db.get_repeaters_along_route(path, radius, filt)
+        route_miles = float(cum[-1])
+    else:
+        if options.sampling == 'adaptive':
+            samples, miles = adaptive_samples(path, radius, options.overlap,
+                                              options.tolerance, cum)
+            miles = miles.tolist()
+        else:
+            samples = resample_polyline_array(path, options.interval, cum)
+            miles = [i * options.interval for i in range(len(samples))]
+        hits = db.get_repeaters_near_samples(samples.tolist(), miles, radius, filt)
+        route_miles = None
+    if options.channels:
+        hits = select_channels(hits, options.channels, radius,
+                               dup_window=options.dup_window,
+                               route_miles=route_miles)
+    written = CSVWriter(out_path, profile).write(hit.repeater for hit in hits)
+    result = {
+        'route': name,
+        'repeaters': written,
+        'output': out_path,
+        'lookup_seconds': round(time.perf_counter() - started, 3),
+    }
+    if instrument.ENABLED:
+        result['instrument'] = instrument.snapshot()
+    return result
+
+
+# ─── driver ────────────────────────────────────────────────────────────────────
+SUMMARY_FIELDS = ['route', 'origin', 'destination', 'route_miles',
+                  'repeaters', 'output', 'lookup_seconds', 'error']
+
+
+def run_batch(
+    specs: List[RouteSpec],
+    radius: float,
+    output_dir: str,
+    jobs: Optional[int] = None,
+    directions_concurrency: int = 4,
+    profile: str = 'chirp',
+    instrumented: bool = False,
+    filt: Optional[RepeaterFilter] = None,
+    options: LookupOptions = LookupOptions(),
+) -> List[dict]:
+    """
+    Resolve and look up every route in `specs`, writing one `<name>` channel
+    file per route in `profile`'s format and summary.csv into `output_dir`.
+    Only repeaters passing `filt` (default: FM analog) are included, and
+    `options` selects corridor or sampled lookups and an optional channel
+    budget.  Returns the summary rows.  With `instrumented`, the lookup
+    workers' stage timings and counters are merged into this process's
+    instrument.
+    """
+    ext = get_profile(profile).extension
+    os.makedirs(output_dir, exist_ok=True)
+    summary = {
+        spec.name: {'route': spec.name, 'origin': spec.origin,
+                    'destination': spec.destination, 'error': spec.error}
+        for spec in specs
+    }
+
+    # 1) directions, bounded concurrency
+    routes = {}
+    with ThreadPoolExecutor(max_workers=directions_concurrency) as pool:
+        futures = {
+            spec.name: pool.submit(get_route, spec.origin, spec.destination)
+            for spec in specs if not spec.error
+        }
+        for name, fut in futures.items():
+            try:
+                pts, cum = fut.result()
+            except Exception as e:   # NoRouteError, upstream failures
+                summary[name]['error'] = str(e) or type(e).__name__
+                continue
+            routes[name] = (pts, cum)
+            summary[name]['route_miles'] = round(float(cum[-1]), 1)
+
+    # 2) lookups + channel files across processes sharing the read-only DB
+    db_path = os.path.abspath(db.DB_PATH)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(db_path, instrumented)) as pool:
+        futures = {
+            name: pool.submit(_lookup_route, name, pts, cum, radius,
+                              os.path.join(output_dir, f"{name}{ext}"), profile,
+                              filt, options)
+            for name, (pts, cum) in routes.items()
+        }
+        for name, fut in futures.items():
+            try:
+                result = fut.result()
+            except Exception as e:
+                summary[name]['error'] = str(e) or type(e).__name__
+                continue
+            if 'instrument' in result:
+                instrument.merge(result.pop('instrument'))
+            summary[name].update(result)
+
+    rows = [summary[spec.name] for spec in specs]
+    with open(os.path.join(output_dir, 'summary.csv'), 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    return rows
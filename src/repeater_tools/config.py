@@ -0,0 +1,77 @@
+# repeater_tools/config.py
+"""
+Shared configuration and lazily created API clients.
+
+Importing this module (or any of repeater_tools) does no work: no .env
+parsing, no HTTP cache, no googlemaps import.  Entry scripts call
+`load_env()` first thing; everything else happens on first use:
+
+    load_env()            read .env into os.environ (python-dotenv imported here)
+    maps_api_key()        MAPS_API_KEY, or None
+    install_http_cache()  route `requests` through requests_cache (HTTP_CACHE,
+                          default 'repeater_route'; empty disables)
+    googlemaps_client()   one shared googlemaps.Client; installs the HTTP
+                          cache first so every Google call is cached
+
+so a command that never talks to Google never imports requests at all.
+"""
+import os
+import threading
+from typing import Dict, Optional
+
+
+class MissingAPIKey(RuntimeError):
+    """A Google client was requested without MAPS_API_KEY."""
+
+
+_lock = threading.Lock()
+_env_loaded = False
+_http_cache_installed = False
+_clients: Dict[str, object] = {}
+
+
+def load_env() -> None:
+    """Load .env into the environment (existing variables win).  Idempotent."""
+    global _env_loaded
+    if _env_loaded:
+        return
+    from dotenv import load_dotenv
+    load_dotenv()
+    _env_loaded = True
+
+
+def maps_api_key() -> Optional[str]:
+    return os.getenv("MAPS_API_KEY") or None
+
+
+def install_http_cache() -> None:
+    """Install the global requests_cache once, if HTTP_CACHE is not empty."""
+    global _http_cache_installed
+    with _lock:
+        if _http_cache_installed:
+            return
+        _http_cache_installed = True
+        name = os.getenv("HTTP_CACHE", "repeater_route")
+        if not name:
+            return
+        import requests_cache
+        requests_cache.install_cache(name, backend="sqlite", expire_after=None)
+
+
+def googlemaps_client(api_key: Optional[str] = None):
+    """
+    Shared `googlemaps.Client` for `api_key` (default: MAPS_API_KEY).
+    Raises MissingAPIKey when there is no key.
+    """
+    api_key = api_key or maps_api_key()
+    if not api_key:
+        raise MissingAPIKey("Set MAPS_API_KEY")
+    client = _clients.get(api_key)
+    if client is None:
+        install_http_cache()
+        with _lock:
+            client = _clients.get(api_key)
+            if client is None:
+                import googlemaps
+                client = _clients[api_key] = googlemaps.Client(key=api_key)
+    return client
@@ -2,53 +2,617 @@
 
 import math
 import os
+import pathlib
 import sqlite3
-from typing import List, Tuple
+import threading
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
 
 from models.repeater import Repeater
-from .utils import haversine
+from .filters import CAPS_COLUMNS, FM_ONLY, RepeaterFilter, capabilities
+from .instrument import count, stage, timed
+from .utils import EARTH_RADIUS_MI, haversine, haversine_many, haversine_path, nearest_on_path
 
 DB_PATH = os.getenv("DB_PATH", "repeater_route.sqlite")
 
-def get_conn() -> sqlite3.Connection:
-    conn = sqlite3.connect(DB_PATH)
+# REPEATER_INDEX=memory answers range/corridor queries from the in-process
+# grid index (repeater_tools.spatial_index) instead of querying SQLite;
+# REPEATER_INDEX=tiles answers them from the LRU-cached tile buckets
+# (repeater_tools.tiles).
+USE_MEMORY_INDEX = os.getenv("REPEATER_INDEX", "sqlite").lower() == "memory"
+USE_TILE_CACHE = os.getenv("REPEATER_INDEX", "sqlite").lower() == "tiles"
+
+# ─── R*Tree spatial index over repeaters.rowid ─────────────────────────────────
+# Each repeater is a degenerate box (min == max).  Triggers keep the index in
+# step with the base table, so anything that writes `repeaters` through plain
+# INSERT / UPDATE / DELETE maintains it for free.  Writers must keep rowids
+# stable (UPSERT, not INSERT OR REPLACE) or stale ids are left behind.
+#
+# The capability bitmask and output frequency ride along as auxiliary
+# columns, so a mode / band / status / access filter (repeater_tools.filters)
+# is decided on the index entry without reading the (wide) table row.  The
+# default FM-only filter has its own, cheaper partial index.
+SPATIAL_INDEX_DDL = """
+CREATE VIRTUAL TABLE IF NOT EXISTS repeaters_rtree USING rtree(
+    id,
+    min_lat, max_lat,
+    min_lon, max_lon,
+    +caps, +frequency
+);
+
+CREATE TRIGGER IF NOT EXISTS repeaters_rtree_ai
+AFTER INSERT ON repeaters
+WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL
+BEGIN
+    INSERT OR REPLACE INTO repeaters_rtree
+    VALUES (new.rowid, new.latitude, new.latitude, new.longitude, new.longitude,
+            new.caps, new.frequency);
+END;
+
+CREATE TRIGGER IF NOT EXISTS repeaters_rtree_au
+AFTER UPDATE OF latitude, longitude, caps, frequency ON repeaters
+BEGIN
+    DELETE FROM repeaters_rtree WHERE id = old.rowid;
+    INSERT INTO repeaters_rtree
+    SELECT new.rowid, new.latitude, new.latitude, new.longitude, new.longitude,
+           new.caps, new.frequency
+     WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+END;
+
+CREATE TRIGGER IF NOT EXISTS repeaters_rtree_ad
+AFTER DELETE ON repeaters
+BEGIN
+    DELETE FROM repeaters_rtree WHERE id = old.rowid;
+END;
+
+-- Covering partial index over the FM-analog rows only: lookups check an
+-- R*Tree hit's service type and read its exact coordinates (the R*Tree only
+-- holds float32 bounds rounded outwards) from this index, not the table.
+CREATE INDEX IF NOT EXISTS repeaters_fm_analog
+    ON repeaters(latitude, longitude) WHERE fm_analog = 'Yes';
+"""
+
+
+def _add_caps_column(conn: sqlite3.Connection) -> bool:
+    """Add `repeaters.caps` if missing; True if it was just added."""
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(repeaters)")}
+    if "caps" in columns:
+        return False
+    conn.execute("ALTER TABLE repeaters ADD COLUMN caps INTEGER")
+    return True
+
+
+def ensure_capabilities(conn: sqlite3.Connection) -> int:
+    """
+    Add the `caps` column if missing and (re)compute it wherever it differs
+    from `filters.capabilities`, e.g. for rows loaded before it existed.
+    Returns the number of rows updated.
+    """
+    _add_caps_column(conn)
+    conn.create_function("repeater_caps", len(CAPS_COLUMNS), capabilities,
+                         deterministic=True)
+    computed = f"repeater_caps({', '.join(CAPS_COLUMNS)})"
+    cur = conn.execute(f"UPDATE repeaters SET caps = {computed} WHERE caps IS NOT {computed}")
+    conn.commit()
+    return cur.rowcount
+
+
+def ensure_spatial_index(conn: sqlite3.Connection) -> int:
+    """
+    Create the R*Tree index, its triggers and the fm_analog partial index if
+    missing (rebuilding an R*Tree from before the auxiliary columns, and
+    computing `caps` if the column is new), then backfill any repeaters that
+    have no index entry yet (i.e. migrate a DB built before the index
+    existed).  Returns the number of rows added to the index.
+    """
+    if _add_caps_column(conn):
+        ensure_capabilities(conn)
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(repeaters_rtree)")}
+    if columns and "caps" not in columns:
+        conn.executescript("""
+            DROP TRIGGER IF EXISTS repeaters_rtree_ai;
+            DROP TRIGGER IF EXISTS repeaters_rtree_au;
+            DROP TRIGGER IF EXISTS repeaters_rtree_ad;
+            DROP TABLE repeaters_rtree;
+        """)
+    conn.executescript(SPATIAL_INDEX_DDL)
+    cur = conn.execute("""
+        INSERT INTO repeaters_rtree
+        SELECT r.rowid, r.latitude, r.latitude, r.longitude, r.longitude,
+               r.caps, r.frequency
+          FROM repeaters AS r
+         WHERE r.latitude IS NOT NULL AND r.longitude IS NOT NULL
+           AND r.rowid NOT IN (SELECT id FROM repeaters_rtree)
+    """)
+    # drop entries whose base row disappeared (e.g. old INSERT OR REPLACE loads)
+    conn.execute("""
+        DELETE FROM repeaters_rtree
+         WHERE id NOT IN (SELECT rowid FROM repeaters)
+    """)
+    conn.commit()
+    return cur.rowcount
+
+
+def db_mtime(db_path: str) -> int:
+    """Last modification (ns) of the DB at `db_path`, counting its WAL file."""
+    mtime = os.stat(db_path).st_mtime_ns
+    wal = db_path + "-wal"
+    if os.path.exists(wal):
+        mtime = max(mtime, os.stat(wal).st_mtime_ns)
+    return mtime
+
+
+# ─── Pooled read-only connections for lookups ──────────────────────────────────
+# Lookups run on one long-lived `mode=ro` connection per thread and DB path
+# (sqlite3 connections must not be shared across threads), so the statement
+# cache stays warm between calls.  A connection is reopened when the file is
+# replaced or after a fork; the optional schema features it probes are re-read
+# whenever PRAGMA schema_version moves.  Callers must not close it.
+class ReadConn(NamedTuple):
+    conn:     sqlite3.Connection
+    rtree:    bool   # repeaters_rtree exists
+    caps:     bool   # ... and carries the caps / frequency auxiliary columns
+    fm_index: bool   # partial index repeaters_fm_analog exists
+    math:     bool   # SQLite built with the math functions (sin, cos, ...)
+
+
+_local = threading.local()
+
+
+def haversine_mi(lat1, lon1, lat2, lon2):
+    """`utils.haversine` for SQL (registered on pooled connections); NULL-safe."""
+    if lat1 is None or lon1 is None or lat2 is None or lon2 is None:
+        return None
+    return haversine((lat1, lon1), (lat2, lon2))
+
+
+def _open_read_conn(path: str) -> sqlite3.Connection:
+    uri = pathlib.Path(path).resolve().as_uri() + "?mode=ro"
+    conn = sqlite3.connect(uri, uri=True, cached_statements=256)
     conn.row_factory = sqlite3.Row
+    conn.create_function("haversine_mi", 4, haversine_mi, deterministic=True)
     return conn
 
-def get_repeaters_within_range(
-    center: Tuple[float, float],
-    radius_miles: float
-) -> List[Repeater]:
+
+def _probe(conn: sqlite3.Connection) -> ReadConn:
+    rtree = {row[1] for row in conn.execute("PRAGMA table_info(repeaters_rtree)")}
+    fm_index = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = 'repeaters_fm_analog'"
+    ).fetchone() is not None
+    try:
+        conn.execute("SELECT sin(0)")
+        has_math = True
+    except sqlite3.OperationalError:
+        has_math = False
+    return ReadConn(conn, bool(rtree), "caps" in rtree, fm_index, has_math)
+
+
+def read_conn(path: Optional[str] = None) -> ReadConn:
     """
-    Return all repeaters within `radius_miles` of `center=(lat, lon)`.
-    First applies a bounding‐box in SQL, then precise Haversine in Python.
+    This thread's pooled read-only connection to `path` (default: DB_PATH),
+    with its features.
     """
-    lat, lon = center
+    path = DB_PATH if path is None else path
+    key = (os.getpid(), os.stat(path).st_ino)
+    entries = getattr(_local, "entries", None)
+    if entries is None:
+        entries = _local.entries = {}
+    name = os.path.abspath(path)
+    entry = entries.get(name)
+    if entry is None or entry[0] != key:
+        if entry is not None and entry[0][0] == key[0]:
+            entry[2].conn.close()
+        conn = _open_read_conn(path)
+        version = conn.execute("PRAGMA schema_version").fetchone()[0]
+        entry = entries[name] = [key, version, _probe(conn)]
+        count("lookup.connections")
+        return entry[2]
+    version = entry[2].conn.execute("PRAGMA schema_version").fetchone()[0]
+    if version != entry[1]:
+        entry[1:] = [version, _probe(entry[2].conn)]
+    return entry[2]
+
+
+# SQLite's default host-parameter limit is 999 on older builds
+MATERIALIZE_BATCH = 900
+
+# just what `Repeater.from_row` reads (plus the rowid), not `SELECT *`
+REPEATER_COLUMNS = (
+    "state_id", "rptr_id", "frequency", "input_freq", "pl", "tsq",
+    "nearest_city", "county", "state", "latitude", "longitude",
+    "callsign", "operational_status", "fm_analog", "notes",
+)
+_SELECT_REPEATERS = ", ".join(f"r.{c}" for c in REPEATER_COLUMNS)
+
+
+@timed("lookup.materialize")
+def fetch_repeaters(conn: sqlite3.Connection, rowids: Sequence[int]) -> Dict[int, Repeater]:
+    """Build `Repeater` objects for `rowids`, keyed by rowid."""
+    out: Dict[int, Repeater] = {}
+    rowids = list(rowids)
+    count("lookup.rows_materialized", len(rowids))
+    for i in range(0, len(rowids), MATERIALIZE_BATCH):
+        batch = rowids[i:i + MATERIALIZE_BATCH]
+        marks = ", ".join("?" for _ in batch)
+        cur = conn.execute(
+            f"SELECT r.rowid AS rid, {_SELECT_REPEATERS} FROM repeaters AS r"
+            f" WHERE r.rowid IN ({marks})", batch)
+        cur.row_factory = sqlite3.Row
+        for row in cur:
+            out[row["rid"]] = Repeater.from_row(row)
+    return out
+
 
-    # approximate degree deltas
+def iter_repeaters(rowids: Iterable[int]) -> Iterator[Repeater]:
+    """
+    Yield `Repeater` objects for `rowids` in the given order, materializing
+    one MATERIALIZE_BATCH at a time so callers can stream them to a writer.
+    """
+    batch = []
+    for rid in rowids:
+        batch.append(rid)
+        if len(batch) == MATERIALIZE_BATCH:
+            by_id = fetch_repeaters(read_conn().conn, batch)
+            yield from (by_id[r] for r in batch)
+            batch = []
+    if batch:
+        by_id = fetch_repeaters(read_conn().conn, batch)
+        yield from (by_id[r] for r in batch)
+
+
+def load_repeaters(rowids: Sequence[int]) -> List[Repeater]:
+    """Materialize `Repeater` objects for `rowids`, in the given order."""
+    rowids = list(rowids)
+    if not rowids:
+        return []
+    by_id = fetch_repeaters(read_conn().conn, rowids)
+    return [by_id[r] for r in rowids]
+
+
+def _candidates(conn: sqlite3.Connection, sql: str, params=()) -> np.ndarray:
+    """Run a query yielding (..., rowid, latitude, longitude) tuples into an array."""
+    cur = conn.cursor()
+    cur.row_factory = None
+    return np.array(cur.execute(sql, params).fetchall(), dtype=float)
+
+
+def _bbox(center: Tuple[float, float], radius_miles: float) -> Tuple[float, ...]:
+    """(min_lat, max_lat, min_lon, max_lon) around `center`, from approximate degree deltas."""
+    lat, lon = center
     lat_delta = radius_miles / 69.0
     lon_delta = radius_miles / (abs(math.cos(math.radians(lat))) * 69.0)
+    return (lat - lat_delta, lat + lat_delta,
+            lon - lon_delta, lon + lon_delta)
+
 
+def _distance_sql(rc: ReadConn, center: Tuple[float, float]) -> Tuple[str, tuple]:
+    """
+    SQL expression (and its parameters) for the great-circle miles from
+    `center` to row `r`.  With the built-in math functions this is
+    `haversine_many` term for term, so both agree to the last bit; otherwise
+    it calls the registered `haversine_mi`.
+    """
+    lat, lon = center
+    if not rc.math:
+        return "haversine_mi(?, ?, r.latitude, r.longitude)", (lat, lon)
+    lat1, lon1 = math.radians(lat), math.radians(lon)
     sql = """
-    SELECT *
-      FROM repeaters
-     WHERE 
-       fm_analog = 'Yes' 
-       AND latitude  BETWEEN ? AND ?
-       AND longitude BETWEEN ? AND ?
+        ? * 2 * asin(sqrt(min(
+            pow(sin((radians(r.latitude) - ?) / 2), 2)
+          + ? * cos(radians(r.latitude)) * pow(sin((radians(r.longitude) - ?) / 2), 2),
+            1.0)))"""
+    return sql, (EARTH_RADIUS_MI, lat1, math.cos(lat1), lon1)
+
+
+def _custom(filt: Optional[RepeaterFilter]) -> Optional[RepeaterFilter]:
+    """`filt`, or None for the default FM_ONLY filter every backend serves."""
+    return None if filt is None or filt == FM_ONLY else filt
+
+
+def _index_filter(rc: ReadConn, filt: Optional[RepeaterFilter]) -> Optional[Tuple[str, tuple]]:
+    """
+    WHERE fragment (and parameters) deciding a custom `filt` on the R*Tree
+    entry `t`, so rejected candidates cost no row lookup; None where the row
+    has to decide (the default filter, or an R*Tree without `+caps`).
+    """
+    if filt is None or not rc.caps:
+        return None
+    return filt.sql("t")
+
+
+def _row_filter(filt: Optional[RepeaterFilter]) -> Tuple[str, tuple]:
+    """WHERE fragment (and parameters) applying `filt` to the table row `r`."""
+    if filt is None:
+        return "r.fm_analog = 'Yes'", ()
+    # on the source columns, so DBs without `caps` can be filtered too
+    return filt.columns_sql("r")
+
+
+def _rtree_rows(rc: ReadConn, filt: Optional[RepeaterFilter]) -> str:
+    """
+    JOIN from R*Tree entries `t` to their rows `r`, for candidates filtered by
+    `filt`.  For the default FM filter the partial index, when present, serves
+    rowid, coordinates and service type alone (its latitude range is the
+    entry's own tiny box), so no table row is read.  CROSS JOIN keeps the
+    R*Tree search driving the loop.
+    """
+    if filt is None and rc.fm_index:
+        return """
+         CROSS JOIN repeaters AS r INDEXED BY repeaters_fm_analog
+            ON r.rowid = t.id
+           AND r.latitude  BETWEEN t.min_lat AND t.max_lat
+           AND r.longitude BETWEEN t.min_lon AND t.max_lon"""
+    return """
+         CROSS JOIN repeaters AS r ON r.rowid = t.id"""
+
+
+def get_repeater_ids_within_range(
+    center: Tuple[float, float],
+    radius_miles: float,
+    filt: Optional[RepeaterFilter] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return (rowids, distances) of all repeaters within `radius_miles` of
+    `center=(lat, lon)` that pass `filt` (default: FM analog), without
+    materializing any rows.
+    First applies a bounding‐box and the filter in SQL (through the R*Tree
+    index when the DB has one), then a vectorized precise Haversine over all
+    candidates.
+    """
+    filt = _custom(filt)
+    if filt is None and USE_MEMORY_INDEX:
+        from .spatial_index import get_index
+        return get_index(DB_PATH).ids_within_range(center, radius_miles)
+    if filt is None and USE_TILE_CACHE:
+        from .tiles import get_tile_cache
+        return get_tile_cache(DB_PATH).ids_within_range(center, radius_miles)
+
+    lat, lon = center
+    count("lookup.queries")
+    rc = read_conn()
+    where, fparams = _index_filter(rc, filt) or _row_filter(filt)
+    if rc.rtree:
+        # the R*Tree (and, where it can, the filter on its entry) picks the
+        # candidates; their coordinates come from the row (or the partial
+        # index), as the R*Tree only holds float32 bounds rounded outwards
+        sql = f"""
+        SELECT r.rowid, r.latitude, r.longitude
+          FROM repeaters_rtree AS t {_rtree_rows(rc, filt)}
+         WHERE
+           t.max_lat >= ? AND t.min_lat <= ?
+           AND t.max_lon >= ? AND t.min_lon <= ?
+           AND {where}
+        """
+    else:
+        # un-migrated DB: run `insert_repeaters.py --migrate` to build the index
+        sql = f"""
+        SELECT r.rowid, r.latitude, r.longitude
+          FROM repeaters AS r
+         WHERE
+           r.latitude  BETWEEN ? AND ?
+           AND r.longitude BETWEEN ? AND ?
+           AND {where}
+        """
+    with stage("lookup.bbox"):
+        cand = _candidates(rc.conn, sql, _bbox(center, radius_miles) + fparams)
+    count("lookup.candidates", len(cand))
+    if not len(cand):
+        return np.empty(0, dtype=np.int64), np.empty(0)
+
+    with stage("lookup.distance"):
+        dist = haversine_many((lat, lon), cand[:, 1], cand[:, 2])
+        keep = dist <= radius_miles
+    count("lookup.survivors", int(keep.sum()))
+    return cand[keep, 0].astype(np.int64), dist[keep]
+
+
+def get_repeaters_within_range(
+    center: Tuple[float, float],
+    radius_miles: float,
+    filt: Optional[RepeaterFilter] = None,
+) -> List[Repeater]:
+    """
+    Return all repeaters within `radius_miles` of `center=(lat, lon)` that
+    pass `filt` (default: FM analog).
+
+    One statement does the whole lookup: R*Tree bbox, filter and the precise
+    distance cut all run inside SQLite, and only the surviving rows (just the
+    columns `Repeater.from_row` reads) come back to Python.
+    """
+    filt = _custom(filt)
+    if filt is None and USE_MEMORY_INDEX:
+        from .spatial_index import get_index
+        return get_index(DB_PATH).within_range(center, radius_miles)
+    if filt is None and USE_TILE_CACHE:
+        from .tiles import get_tile_cache
+        return get_tile_cache(DB_PATH).within_range(center, radius_miles)
+
+    rc = read_conn()
+    where, fparams = _row_filter(filt)   # the row is read anyway
+    distance, dparams = _distance_sql(rc, center)
+    if rc.rtree:
+        # CROSS JOIN: R*Tree search first, then a rowid lookup per candidate
+        source = """
+          FROM repeaters_rtree AS t
+         CROSS JOIN repeaters  AS r ON r.rowid = t.id
+         WHERE t.max_lat >= ? AND t.min_lat <= ?
+           AND t.max_lon >= ? AND t.min_lon <= ?
+        """
+    else:
+        source = """
+          FROM repeaters AS r
+         WHERE r.latitude  BETWEEN ? AND ?
+           AND r.longitude BETWEEN ? AND ?
+        """
+    sql = f"SELECT {_SELECT_REPEATERS} {source} AND {where} AND {distance} <= ?"
+
+    count("lookup.queries")
+    with stage("lookup.materialize"):
+        params = _bbox(center, radius_miles) + fparams + dparams + (radius_miles,)
+        out = [Repeater.from_row(row) for row in rc.conn.execute(sql, params)]
+    count("lookup.survivors", len(out))
+    count("lookup.rows_materialized", len(out))
+    return out
+
+
+# ─── Corridor lookup along a whole route ───────────────────────────────────────
+# Segments per corridor box.  Each box is the bbox of CORRIDOR_CHUNK polyline
+# segments grown by the buffer; small enough that a cross-country route does
+# not degenerate into one continent-sized box, large enough to keep the number
+# of boxes (and duplicate candidates between neighbours) low.
+CORRIDOR_CHUNK = 32
+
+
+class CorridorHit(NamedTuple):
+    repeater:   Repeater
+    distance:   float   # miles from the repeater to the nearest route segment
+    route_mile: float   # miles along the route to that nearest point
+
+
+def route_arrays(path):
+    """Return (lats, lons, cum) arrays for a polyline of at least one point."""
+    pts = np.asarray(path, dtype=float).reshape(-1, 2)
+    if len(pts) == 1:
+        pts = np.vstack([pts, pts])
+    lats, lons = pts[:, 0], pts[:, 1]
+    cum = np.concatenate([[0.0], np.cumsum(haversine_path(lats, lons))])
+    return lats, lons, cum
+
+
+def chunk_span(chunk, lats):
+    """Return the vertex slice [start, stop) covered by corridor `chunk`."""
+    start = chunk * CORRIDOR_CHUNK
+    return start, min(start + CORRIDOR_CHUNK, len(lats) - 1) + 1
+
+
+def corridor_boxes(lats, lons, buffer_miles):
+    """Yield (chunk, min_lat, max_lat, min_lon, max_lon) for each segment chunk."""
+    for chunk in range((len(lats) - 2) // CORRIDOR_CHUNK + 1):
+        start, stop = chunk_span(chunk, lats)
+        la, lo = lats[start:stop], lons[start:stop]
+        lat_delta = buffer_miles / 69.0
+        max_abs_lat = min(float(np.abs(la).max()) + lat_delta, 89.0)
+        lon_delta = buffer_miles / (math.cos(math.radians(max_abs_lat)) * 69.0)
+        yield (chunk,
+               float(la.min()) - lat_delta, float(la.max()) + lat_delta,
+               float(lo.min()) - lon_delta, float(lo.max()) + lon_delta)
+
+
+def get_repeaters_along_route(
+    path: Sequence[Tuple[float, float]],
+    buffer_miles: float,
+    filt: Optional[RepeaterFilter] = None,
+) -> List[CorridorHit]:
     """
-    params = (lat - lat_delta, lat + lat_delta,
-              lon - lon_delta, lon + lon_delta)
+    Return every repeater within `buffer_miles` of the polyline `path` that
+    passes `filt` (default: FM analog), once each, ordered by mileage along
+    the route.
+
+    The polyline is cut into chunks whose buffered bboxes are fetched in a
+    single SQL query; each candidate is then measured against the segments of
+    its chunk(s) with a vectorized point-to-segment pass.
+    """
+    filt = _custom(filt)
+    if filt is None and USE_MEMORY_INDEX:
+        from .spatial_index import get_index
+        return get_index(DB_PATH).along_route(path, buffer_miles)
+    if filt is None and USE_TILE_CACHE:
+        from .tiles import get_tile_cache
+        return get_tile_cache(DB_PATH).along_route(path, buffer_miles)
+
+    lats, lons, cum = route_arrays(path)
+
+    count("lookup.queries")
+    rc = read_conn()
+    conn = rc.conn
+    conn.execute("""
+        CREATE TEMP TABLE IF NOT EXISTS corridor_boxes (
+            chunk INTEGER, min_lat REAL, max_lat REAL, min_lon REAL, max_lon REAL
+        )
+    """)
+    conn.execute("DELETE FROM corridor_boxes")
+    conn.executemany(
+        "INSERT INTO corridor_boxes VALUES (?, ?, ?, ?, ?)",
+        corridor_boxes(lats, lons, buffer_miles))
 
-    conn = get_conn()
-    cur  = conn.cursor()
-    cur.execute(sql, params)
+    # CROSS JOIN pins the loop order (box -> R*Tree search -> rowid lookup);
+    # left to itself the planner may drive from `repeaters` and probe the
+    # R*Tree by id for every row of every box.
+    # The filter is decided on the R*Tree entry where it can be, so only
+    # passing candidates cost a row lookup.
+    where, fparams = _index_filter(rc, filt) or _row_filter(filt)
+    if rc.rtree:
+        sql = f"""
+        SELECT b.chunk, r.rowid, r.latitude, r.longitude
+          FROM corridor_boxes  AS b
+         CROSS JOIN repeaters_rtree AS t
+            ON t.max_lat >= b.min_lat AND t.min_lat <= b.max_lat
+           AND t.max_lon >= b.min_lon AND t.min_lon <= b.max_lon {_rtree_rows(rc, filt)}
+         WHERE {where}
+         ORDER BY b.chunk
+        """
+    else:
+        sql = f"""
+        SELECT b.chunk, r.rowid, r.latitude, r.longitude
+          FROM corridor_boxes AS b
+          JOIN repeaters      AS r
+            ON r.latitude  BETWEEN b.min_lat AND b.max_lat
+           AND r.longitude BETWEEN b.min_lon AND b.max_lon
+         WHERE {where}
+         ORDER BY b.chunk
+        """
+    with stage("lookup.bbox"):
+        cand = _candidates(conn, sql, fparams).reshape(-1, 4)
+    count("lookup.candidates", len(cand))
 
-    results: List[Repeater] = []
-    for row in cur.fetchall():
-        if haversine((lat, lon), (row["latitude"], row["longitude"])) <= radius_miles:
-            results.append(Repeater.from_row(row))
+    # measure each chunk's candidates against that chunk's segments
+    best = {}   # rowid -> (distance, route_mile)
+    with stage("lookup.distance"):
+        chunks, starts = np.unique(cand[:, 0].astype(np.int64), return_index=True)
+        bounds = np.append(starts, len(cand))
+        for chunk, lo, hi in zip(chunks.tolist(), bounds[:-1], bounds[1:]):
+            start, stop = chunk_span(chunk, lats)
+            dmin, mile = nearest_on_path(
+                cand[lo:hi, 2], cand[lo:hi, 3],
+                lats[start:stop], lons[start:stop], cum[start:stop])
 
-    conn.close()
-    return results
+            rids = cand[lo:hi, 1].astype(np.int64).tolist()
+            for rid, d, m in zip(rids, dmin.tolist(), mile.tolist()):
+                if d <= buffer_miles and (rid not in best or d < best[rid][0]):
+                    best[rid] = (d, m)
+    count("lookup.survivors", len(best))
+
+    # only now build full Repeater objects, for the survivors
+    by_id = fetch_repeaters(conn, list(best))
+
+    # route order; nearer first, then rowid, where several share a mile
+    order = sorted(best, key=lambda rid: (best[rid][1], best[rid][0], rid))
+    return [CorridorHit(by_id[rid], *best[rid]) for rid in order]
+
+
+def get_repeaters_near_samples(
+    samples: Sequence[Tuple[float, float]],
+    miles: Sequence[float],
+    radius_miles: float,
+    filt: Optional[RepeaterFilter] = None,
+) -> Iterator[CorridorHit]:
+    """
+    Sampled alternative to `get_repeaters_along_route`: one radius query per
+    route sample (`miles` holds each sample's mileage along the route) for
+    repeaters passing `filt` (default: FM analog).  Each repeater is kept
+    once, at its nearest sample, and the hits are yielded in route order,
+    materialized batch by batch.
+    """
+    # dedupe on integer rowid (1:1 with the (state_id, rptr_id) key)
+    best = {}   # rowid -> (distance, route_mile)
+    for (lat, lon), mile in zip(samples, miles):
+        rowids, dists = get_repeater_ids_within_range((lat, lon), radius_miles, filt)
+        for rid, d in zip(rowids.tolist(), dists.tolist()):
+            prev = best.get(rid)
+            if prev is None or d < prev[0]:
+                best[rid] = (d, mile)
 
+    order = sorted(best, key=lambda rid: (best[rid][1], best[rid][0], rid))
+    for rid, rpt in zip(order, iter_repeaters(order)):
+        yield CorridorHit(rpt, *best[rid])
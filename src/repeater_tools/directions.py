@@ -0,0 +1,354 @@
+# repeater_tools/directions.py
+"""
+Directions providers: where route polylines come from.
+
+Every provider turns (origin, destination, mode) into an (n, 2) float array
+of (lat, lon) vertices, or raises `NoRouteError` / `DirectionsError`.  API
+providers return the step-level geometry when the response carries it (see
+`route_points`), not just the simplified overview polyline.
+
+    GoogleDirections   Google Directions API; the client (and the googlemaps
+                       import) is created on first use, not at import time
+    FileDirections     a track on disk: GPX, GeoJSON, an encoded polyline, or
+                       "lat, lon" lines as printed by repeater_route.py.  A
+                       directory holds one file per route, named
+                       `<origin>__<destination>.<ext>` (slugged)
+    HTTPDirections     any server speaking the Directions JSON shape, e.g.
+                       `StubDirectionsServer` for tests and benchmarks
+
+The active provider comes from DIRECTIONS_PROVIDER (see `provider_from_spec`)
+unless set explicitly with `set_provider`.
+"""
+import json
+import os
+import re
+import threading
+import urllib.parse
+from typing import Optional
+
+import numpy as np
+import polyline
+
+from .config import MissingAPIKey, googlemaps_client
+from .instrument import count, stage
+
+
+class DirectionsError(Exception):
+    """The provider could not answer (bad config, upstream failure, bad file)."""
+
+
+class NoRouteError(DirectionsError):
+    """The provider answered, but knows no route between the two places."""
+
+
+class DirectionsProvider:
+    name = "base"
+    # whether routes are worth keeping in the persistent route store
+    cacheable = False
+
+    def route(self, origin: str, destination: str, mode: str = "driving") -> np.ndarray:
+        raise NotImplementedError
+
+    def __repr__(self):
+        return f"<{type(self).__name__}>"
+
+
+def route_points(route: dict) -> np.ndarray:
+    """
+    Decode one Directions API route.  The step-level polylines (full road
+    geometry) are used when present, joined leg by leg; the coarse
+    `overview_polyline` is the fallback.
+    """
+    steps = [step["polyline"]["points"]
+             for leg in route.get("legs", ())
+             for step in leg.get("steps", ())
+             if step.get("polyline", {}).get("points")]
+    if not steps:
+        return np.asarray(polyline.decode(route["overview_polyline"]["points"]),
+                          dtype=float)
+    pts = []
+    for encoded in steps:
+        decoded = polyline.decode(encoded)
+        # each step starts where the previous one ended
+        pts.extend(decoded[1:] if pts and decoded and decoded[0] == pts[-1] else decoded)
+    return np.asarray(pts, dtype=float)
+
+
+# ─── Google ────────────────────────────────────────────────────────────────────
+class GoogleDirections(DirectionsProvider):
+    name = "google"
+    cacheable = True
+
+    def __init__(self, api_key: Optional[str] = None):
+        self._api_key = api_key
+
+    def client(self):
+        try:
+            return googlemaps_client(self._api_key)
+        except MissingAPIKey as e:
+            raise DirectionsError(str(e)) from None
+
+    def route(self, origin, destination, mode="driving"):
+        count("api.directions")
+        routes = self.client().directions(origin, destination, mode=mode)
+        if not routes:
+            raise NoRouteError("No route found between origin and destination.")
+        with stage("route.decode"):
+            return route_points(routes[0])
+
+
+# ─── files ─────────────────────────────────────────────────────────────────────
+TRACK_EXTENSIONS = (".gpx", ".geojson", ".json", ".polyline", ".txt", ".csv")
+
+_LATLON_LINE = re.compile(r"^\s*(-?\d+(?:\.\d*)?)\s*[,\s]\s*(-?\d+(?:\.\d*)?)\s*$")
+_POLYLINE = re.compile(r"^[?-~]*[?-^]$")
+
+
+def _slug(text: str) -> str:
+    return re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_").lower()
+
+
+def _gpx_points(text: str):
+    import xml.etree.ElementTree as ET
+    root = ET.fromstring(text)
+    pts = []
+    for tag in ("trkpt", "rtept"):
+        for el in root.iter():
+            if el.tag.rsplit("}", 1)[-1] == tag:
+                pts.append((float(el.attrib["lat"]), float(el.attrib["lon"])))
+        if pts:
+            break
+    return pts
+
+
+def _geojson_points(text: str):
+    obj = json.loads(text)
+    if obj.get("type") == "FeatureCollection":
+        geoms = [f["geometry"] for f in obj["features"]]
+    elif obj.get("type") == "Feature":
+        geoms = [obj["geometry"]]
+    else:
+        geoms = [obj]
+    pts = []
+    for geom in geoms:
+        if geom["type"] == "LineString":
+            lines = [geom["coordinates"]]
+        elif geom["type"] == "MultiLineString":
+            lines = geom["coordinates"]
+        else:
+            continue
+        for line in lines:
+            pts.extend((c[1], c[0]) for c in line)   # GeoJSON is lon, lat
+    return pts
+
+
+def _text_points(text: str):
+    lines = [ln for ln in text.splitlines()
+             if ln.strip() and not ln.lstrip().startswith("#")]
+    if not lines:
+        return []
+    matches = [_LATLON_LINE.match(ln) for ln in lines]
+    if all(matches):
+        return [(float(m.group(1)), float(m.group(2))) for m in matches]
+    return _polyline_points("".join(ln.strip() for ln in lines))
+
+
+def _polyline_points(encoded: str):
+    # every character of an encoded polyline is in '?'..'~' (63..126), and
+    # each value ends on one below '_' (95)
+    if not _POLYLINE.match(encoded):
+        raise ValueError("neither 'lat, lon' lines nor an encoded polyline")
+    pts = polyline.decode(encoded)
+    if not all(-90 <= lat <= 90 and -180 <= lon <= 180 for lat, lon in pts):
+        raise ValueError("encoded polyline decodes to coordinates out of range")
+    return pts
+
+
+def read_track(path: str) -> np.ndarray:
+    """Load a track file as an (n, 2) array of (lat, lon)."""
+    with open(path, "r") as f:
+        text = f.read()
+    ext = os.path.splitext(path)[1].lower()
+    from xml.etree.ElementTree import ParseError
+    try:
+        if ext == ".gpx":
+            pts = _gpx_points(text)
+        elif ext in (".geojson", ".json"):
+            pts = _geojson_points(text)
+        else:
+            pts = _text_points(text)
+    except (ValueError, KeyError, TypeError, IndexError, ParseError) as e:
+        raise DirectionsError(f"Cannot read track {path}: {e}") from None
+    if not pts:
+        raise NoRouteError(f"No track points in {path}")
+    return np.asarray(pts, dtype=float).reshape(-1, 2)
+
+
+class FileDirections(DirectionsProvider):
+    """
+    Routes from track files.  `path` is a single track (returned for any
+    origin/destination) or a directory of per-route tracks.
+    """
+    name = "file"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._tracks = {}
+
+    def track_path(self, origin: str, destination: str) -> str:
+        if not os.path.isdir(self.path):
+            return self.path
+        stem = f"{_slug(origin)}__{_slug(destination)}"
+        for ext in TRACK_EXTENSIONS:
+            candidate = os.path.join(self.path, stem + ext)
+            if os.path.exists(candidate):
+                return candidate
+        raise NoRouteError(f"No track for {origin!r} -> {destination!r} in {self.path}")
+
+    def route(self, origin, destination, mode="driving"):
+        path = self.track_path(origin, destination)
+        pts = self._tracks.get(path)
+        if pts is None:
+            count("route.track_reads")
+            with stage("route.decode"):
+                pts = self._tracks[path] = read_track(path)
+        return pts.copy()
+
+    def __repr__(self):
+        return f"<FileDirections {self.path}>"
+
+
+# ─── HTTP (stub servers) ───────────────────────────────────────────────────────
+class HTTPDirections(DirectionsProvider):
+    """
+    Directions from `base_url` + `/directions/json?origin=..&destination=..`,
+    answering in the Google Directions JSON shape.
+    """
+    name = "http"
+
+    def __init__(self, base_url: str, timeout: float = 30.0):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+
+    def route(self, origin, destination, mode="driving"):
+        query = urllib.parse.urlencode(
+            {"origin": origin, "destination": destination, "mode": mode})
+        count("api.directions")
+        from urllib.request import urlopen
+        try:
+            with urlopen(f"{self.base_url}/directions/json?{query}",
+                         timeout=self.timeout) as resp:
+                body = json.load(resp)
+        except (OSError, ValueError) as e:
+            raise DirectionsError(f"Directions request failed: {e}") from None
+        if body.get("status") == "ZERO_RESULTS" or not body.get("routes"):
+            raise NoRouteError("No route found between origin and destination.")
+        with stage("route.decode"):
+            return route_points(body["routes"][0])
+
+    def __repr__(self):
+        return f"<HTTPDirections {self.base_url}>"
+
+
+class StubDirectionsServer:
+    """
+    Minimal local Directions endpoint backed by another provider (typically
+    `FileDirections`), run on a background thread:
+
+        with StubDirectionsServer(FileDirections("tracks/")) as stub:
+            set_provider(HTTPDirections(stub.url))
+
+    `port=0` picks a free port.  `requests` counts the calls served.
+    """
+
+    def __init__(self, provider: DirectionsProvider, host: str = "127.0.0.1", port: int = 0):
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        self.provider = provider
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urllib.parse.urlsplit(self.path)
+                qs = dict(urllib.parse.parse_qsl(url.query))
+                stub.requests += 1
+                try:
+                    pts = stub.provider.route(qs.get("origin", ""), qs.get("destination", ""),
+                                              qs.get("mode", "driving"))
+                    body = {"status": "OK", "routes": [{"overview_polyline": {
+                        "points": polyline.encode([tuple(p) for p in pts.tolist()])}}]}
+                except NoRouteError:
+                    body = {"status": "ZERO_RESULTS", "routes": []}
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubDirectionsServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# ─── active provider ───────────────────────────────────────────────────────────
+def provider_from_spec(spec: Optional[str]) -> DirectionsProvider:
+    """
+    'google' (default), 'http(s)://host:port' for an HTTP provider, or a path
+    (optionally prefixed 'file:') to a track file or directory.
+    """
+    spec = (spec or "google").strip()
+    if spec.lower() == "google":
+        return GoogleDirections()
+    if spec.startswith(("http://", "https://")):
+        return HTTPDirections(spec)
+    if spec.startswith("file:"):
+        spec = spec[len("file:"):]
+    if not os.path.exists(spec):
+        raise DirectionsError(f"Unknown directions provider or missing path: {spec!r}")
+    return FileDirections(spec)
+
+
+_provider: Optional[DirectionsProvider] = None
+_provider_lock = threading.Lock()
+
+
+def get_provider() -> DirectionsProvider:
+    global _provider
+    with _provider_lock:
+        if _provider is None:
+            _provider = provider_from_spec(os.getenv("DIRECTIONS_PROVIDER"))
+        return _provider
+
+
+def set_provider(provider) -> DirectionsProvider:
+    """Install `provider` (a DirectionsProvider or a spec string) as the active one."""
+    global _provider
+    if not isinstance(provider, DirectionsProvider):
+        provider = provider_from_spec(provider)
+    with _provider_lock:
+        _provider = provider
+    return provider
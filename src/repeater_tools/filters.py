@@ -0,0 +1,199 @@
+# repeater_tools/filters.py
+"""
+Lookup filters on mode, band, operational status and access.
+
+insert_repeaters.py stores a capability bitmask per repeater in
+`repeaters.caps` (see `capabilities`), and the R*Tree carries it, together
+with `frequency`, as auxiliary columns: a filtered lookup is decided on the
+index entry without reading the (wide) table row.
+
+A `RepeaterFilter` is a handful of "any of" bit groups plus an optional
+output-frequency range (DBs not yet migrated to `caps` are filtered on the
+source columns instead, see `RepeaterFilter.columns_sql`):
+
+    modes    fm, dmr, dstar, fusion, nxdn, m17, p25, tetra   (default: fm)
+    bands    10m, 6m, 2m, 1.25m, 70cm, 33cm, 23cm            (by output freq)
+    status   on-air, off-air
+    access   open, closed, private
+
+An empty group matches everything, so the default `FM_ONLY` filter is the
+plain `fm_analog = 'Yes'` the lookups have always applied.
+"""
+from typing import Dict, NamedTuple, Optional, Sequence, Tuple
+
+# ─── capability bits ───────────────────────────────────────────────────────────
+# name -> (source column, bit); a mode bit is set when the column is 'Yes'
+MODES: Dict[str, Tuple[str, int]] = {
+    "fm":     ("fm_analog",     1 << 0),
+    "dmr":    ("dmr",           1 << 1),
+    "dstar":  ("d_star",        1 << 2),
+    "fusion": ("system_fusion", 1 << 3),
+    "nxdn":   ("nxdn",          1 << 4),
+    "m17":    ("m17",           1 << 5),
+    "p25":    ("apco_p_25",     1 << 6),
+    "tetra":  ("tetra",         1 << 7),
+}
+
+# name -> (low MHz, high MHz, bit), US amateur allocations
+BANDS: Dict[str, Tuple[float, float, int]] = {
+    "10m":   (28.0,   29.7,   1 << 8),
+    "6m":    (50.0,   54.0,   1 << 9),
+    "2m":    (144.0,  148.0,  1 << 10),
+    "1.25m": (219.0,  225.0,  1 << 11),
+    "70cm":  (420.0,  450.0,  1 << 12),
+    "33cm":  (902.0,  928.0,  1 << 13),
+    "23cm":  (1240.0, 1300.0, 1 << 14),
+}
+
+# name -> bit; matched case-insensitively against operational_status / use
+STATUSES: Dict[str, int] = {"on-air": 1 << 16, "off-air": 1 << 17}
+ACCESS:   Dict[str, int] = {"open": 1 << 20, "closed": 1 << 21, "private": 1 << 22}
+
+CAP_FM = MODES["fm"][1]
+
+# argument order of `capabilities` (and of the SQL function backfilling caps)
+CAPS_COLUMNS = ("frequency", "operational_status", "use") + tuple(
+    column for column, _ in MODES.values())
+
+
+def capabilities(frequency, operational_status, use, *modes) -> int:
+    """Capability bitmask of one repeater, from its CAPS_COLUMNS values."""
+    caps = 0
+    for value, (_, bit) in zip(modes, MODES.values()):
+        if value == "Yes":
+            caps |= bit
+    if frequency is not None:
+        for low, high, bit in BANDS.values():
+            if low <= frequency <= high:
+                caps |= bit
+                break
+    if operational_status:
+        caps |= STATUSES.get(operational_status.lower(), 0)
+    if use:
+        caps |= ACCESS.get(use.lower(), 0)
+    return caps
+
+
+# ─── filters ───────────────────────────────────────────────────────────────────
+class RepeaterFilter(NamedTuple):
+    modes:   int = CAP_FM           # any of these mode bits (0: any)
+    bands:   int = 0                # any of these band bits (0: any)
+    status:  int = 0                # any of these status bits (0: any)
+    access:  int = 0                # any of these access bits (0: any)
+    min_mhz: Optional[float] = None
+    max_mhz: Optional[float] = None
+
+    def sql(self, alias: str) -> Tuple[str, tuple]:
+        """WHERE fragment (and parameters) over `alias`.caps / `alias`.frequency."""
+        terms, params = [], []
+        for mask in (self.modes, self.bands, self.status, self.access):
+            if mask:
+                terms.append(f"{alias}.caps & ? != 0")
+                params.append(mask)
+        return self._freq_sql(alias, terms, params)
+
+    def columns_sql(self, alias: str) -> Tuple[str, tuple]:
+        """
+        The same test as `sql`, on the table row's own columns: what
+        `capabilities` computes, for rows (or DBs) without `caps`.
+        """
+        terms, params = [], []
+        modes = [f"{alias}.{column} = 'Yes'"
+                 for column, bit in MODES.values() if self.modes & bit]
+        if modes:
+            terms.append(f"({' OR '.join(modes)})")
+        bands = [(low, high) for low, high, bit in BANDS.values() if self.bands & bit]
+        if bands:
+            terms.append("(" + " OR ".join(
+                f"{alias}.frequency BETWEEN ? AND ?" for _ in bands) + ")")
+            params.extend(bound for band in bands for bound in band)
+        for column, mask, table in (("operational_status", self.status, STATUSES),
+                                    ("use", self.access, ACCESS)):
+            names = [name for name, bit in table.items() if mask & bit]
+            if names:
+                terms.append(f"lower({alias}.{column}) IN ({', '.join('?' for _ in names)})")
+                params.extend(names)
+        return self._freq_sql(alias, terms, params)
+
+    def _freq_sql(self, alias: str, terms: list, params: list) -> Tuple[str, tuple]:
+        if self.min_mhz is not None:
+            terms.append(f"{alias}.frequency >= ?")
+            params.append(self.min_mhz)
+        if self.max_mhz is not None:
+            terms.append(f"{alias}.frequency <= ?")
+            params.append(self.max_mhz)
+        return " AND ".join(terms) or "1", tuple(params)
+
+
+FM_ONLY = RepeaterFilter()
+
+
+def _bit(entry) -> int:
+    """The bit of a MODES / BANDS / STATUSES / ACCESS entry."""
+    return entry[-1] if isinstance(entry, tuple) else entry
+
+
+def _mask(names: Optional[str], table: Dict[str, object], what: str) -> int:
+    mask = 0
+    for name in (names or "").lower().split(","):
+        name = name.strip()
+        if not name:
+            continue
+        if name not in table:
+            raise ValueError(f"unknown {what} {name!r} (choose from {', '.join(table)})")
+        mask |= _bit(table[name])
+    return mask
+
+
+def parse_freq_range(text: str) -> Tuple[Optional[float], Optional[float]]:
+    """'LOW-HIGH' in MHz, either side may be empty: '144-148', '420-', '-54'."""
+    low, sep, high = text.partition("-")
+    if not sep:
+        raise ValueError(f"frequency range {text!r} is not LOW-HIGH")
+    try:
+        bounds = tuple(float(v) if v.strip() else None for v in (low, high))
+    except ValueError:
+        raise ValueError(f"frequency range {text!r} is not LOW-HIGH") from None
+    if None not in bounds and bounds[0] > bounds[1]:
+        raise ValueError(f"frequency range {text!r} is empty")
+    return bounds
+
+
+def parse_filter(
+    modes: Optional[str] = None,
+    bands: Optional[str] = None,
+    status: Optional[str] = None,
+    access: Optional[str] = None,
+    freq: Optional[str] = None,
+) -> RepeaterFilter:
+    """
+    Build a filter from comma-separated names (as given on the command line),
+    e.g. parse_filter('fm', '2m,70cm', 'on-air', 'open').  `modes` defaults to
+    fm; 'any' accepts every mode.  Raises ValueError on unknown names.
+    """
+    if modes is None:
+        mode_mask = CAP_FM
+    elif modes.strip().lower() == "any":
+        mode_mask = 0
+    else:
+        mode_mask = _mask(modes, MODES, "mode")
+    low, high = parse_freq_range(freq) if freq else (None, None)
+    return RepeaterFilter(mode_mask, _mask(bands, BANDS, "band"),
+                          _mask(status, STATUSES, "status"),
+                          _mask(access, ACCESS, "access"), low, high)
+
+
+def describe(filt: RepeaterFilter) -> str:
+    """Short human-readable form, e.g. 'fm; 2m,70cm; on-air; open'."""
+    def names(mask: int, table: Dict[str, object]) -> Sequence[str]:
+        return [name for name, entry in table.items() if mask & _bit(entry)]
+
+    parts = [",".join(names(filt.modes, MODES)) or "any mode"]
+    for mask, table in ((filt.bands, BANDS), (filt.status, STATUSES), (filt.access, ACCESS)):
+        if mask:
+            parts.append(",".join(names(mask, table)))
+    if filt.min_mhz is not None or filt.max_mhz is not None:
+        low = "" if filt.min_mhz is None else f"{filt.min_mhz:g}"
+        high = "" if filt.max_mhz is None else f"{filt.max_mhz:g}"
+        parts.append(f"{low}-{high} MHz")
+    return "; ".join(parts)
@@ -0,0 +1,155 @@
+# repeater_tools/instrument.py
+"""
+Lightweight per-stage timings and counters for the lookup pipeline.
+
+Instrumented code calls
+
+    with stage("lookup.bbox"):
+        ...
+    count("lookup.candidates", len(cand))
+
+and nothing else.  While instrumentation is disabled (the default) `stage`
+returns a shared no-op context manager and `count` returns after one global
+check, so the cost is a function call per stage, not per row.
+
+Stages may nest (e.g. `route.decode` inside `route.fetch`); each reports its
+own inclusive time, so nested stages are not additive with their parents.
+Lazily streamed work (rows materialized while the writer pulls them) is
+charged to whichever stage is consuming the stream.
+"""
+import json
+import threading
+import time
+from collections import defaultdict
+from functools import wraps
+from typing import Dict, Optional
+
+ENABLED = False
+
+_lock = threading.Lock()
+_stages: Dict[str, list] = defaultdict(lambda: [0, 0.0])   # name -> [calls, seconds]
+_counters: Dict[str, int] = defaultdict(int)
+_started: Optional[float] = None
+
+
+class _Stage:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        with _lock:
+            entry = _stages[self.name]
+            entry[0] += 1
+            entry[1] += elapsed
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name: str):
+    """Context manager timing one pass through stage `name`."""
+    return _Stage(name) if ENABLED else _NULL_STAGE
+
+
+def timed(name: str):
+    """Decorator form of `stage`."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not ENABLED:
+                return fn(*args, **kwargs)
+            with _Stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add `n` to counter `name`."""
+    if ENABLED:
+        with _lock:
+            _counters[name] += n
+
+
+# ─── control ───────────────────────────────────────────────────────────────────
+def enable() -> None:
+    """Reset and start recording."""
+    global ENABLED, _started
+    reset()
+    _started = time.perf_counter()
+    ENABLED = True
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    global _started
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+    _started = time.perf_counter() if ENABLED else None
+
+
+def snapshot() -> dict:
+    """Everything recorded so far, as plain JSON-able data."""
+    with _lock:
+        stages = {name: {"calls": c, "seconds": s} for name, (c, s) in _stages.items()}
+        counters = dict(_counters)
+    wall = time.perf_counter() - _started if _started is not None else None
+    return {"wall_seconds": wall, "stages": stages, "counters": counters}
+
+
+def merge(snap: dict) -> None:
+    """Fold a `snapshot()` from another process (e.g. a batch worker) in."""
+    with _lock:
+        for name, s in snap.get("stages", {}).items():
+            entry = _stages[name]
+            entry[0] += s["calls"]
+            entry[1] += s["seconds"]
+        for name, n in snap.get("counters", {}).items():
+            _counters[name] += n
+
+
+# ─── reports ───────────────────────────────────────────────────────────────────
+def report_json(snap: Optional[dict] = None) -> str:
+    return json.dumps(snap or snapshot(), indent=2, sort_keys=True)
+
+
+def report_text(snap: Optional[dict] = None) -> str:
+    snap = snap or snapshot()
+    wall = snap["wall_seconds"]
+    lines = []
+    if wall is not None:
+        lines.append(f"wall time {wall * 1000:,.1f} ms")
+    lines.append(f"{'stage':<24} {'calls':>7} {'total ms':>11} {'mean ms':>10} {'% wall':>7}")
+    for name in sorted(snap["stages"]):
+        s = snap["stages"][name]
+        share = f"{s['seconds'] / wall:>7.1%}" if wall else ""
+        lines.append(f"{name:<24} {s['calls']:>7} {s['seconds'] * 1000:>11.2f} "
+                     f"{s['seconds'] * 1000 / max(s['calls'], 1):>10.3f} {share}")
+    if snap["counters"]:
+        lines.append("")
+        lines.append(f"{'counter':<24} {'value':>12}")
+        for name in sorted(snap["counters"]):
+            lines.append(f"{name:<24} {snap['counters'][name]:>12,}")
+    return "\n".join(lines)
@@ -1,12 +1,11 @@
 # repeater_tools/route_sampler.py
-import googlemaps, polyline, os, sys
-from .utils import haversine, interpolate
+import os, sqlite3, time
+from contextlib import contextmanager
+import numpy as np
+from .directions import get_provider
+from .instrument import count, stage
+from .utils import haversine_many, haversine_path, simplify_polyline
 from urllib.parse import urlparse, parse_qs, unquote
-from dotenv import load_dotenv
-
-load_dotenv()
-API_KEY = os.getenv('MAPS_API_KEY') or sys.exit("Set MAPS_API_KEY")
-gmaps = googlemaps.Client(key=API_KEY)
 
 # -----------------------------------------------------------------------------
 # Parse Google Maps directions URL
@@ -28,34 +27,333 @@ def parse_maps_url(url):
     raise ValueError("Cannot parse origin/destination from URL")
 
 # -----------------------------------------------------------------------------
-# Google Maps client & sampling
+# Polyline geometry & sampling
 # -----------------------------------------------------------------------------
-gmaps = googlemaps.Client(key=API_KEY)
+def cumulative_distances(pts):
+    """
+    Return an array of cumulative miles at each vertex of `pts`, an (n, 2)
+    array-like of (lat, lon), starting at 0.0.
+    """
+    arr = np.asarray(pts, dtype=float).reshape(-1, 2)
+    cum = np.zeros(len(arr))
+    if len(arr) > 1:
+        np.cumsum(haversine_path(arr[:, 0], arr[:, 1]), out=cum[1:])
+    return cum
 
-def sample_route(origin, destination, interval):
+def resample_polyline_array(pts, interval, cum=None):
     """
-    Fetch driving directions and sample points every `interval` miles.
-    Returns a list of (lat, lon) tuples.
+    Resample the polyline `pts` at every `interval` miles (0, interval,
+    2*interval, ... up to the route length).  Returns a (k, 2) array of
+    (lat, lon).  Pass `cum` to reuse precomputed cumulative distances.
+
+    Each sample distance is located with a binary search into the cumulative
+    distance array, so the cost is O(k log n) rather than O(k * n).
     """
-    routes = gmaps.directions(origin, destination, mode='driving')
-    if not routes:
-        sys.exit("No route found between origin and destination.")
-    pts = polyline.decode(routes[0]['overview_polyline']['points'])
-    # build cumulative distances
-    cum = [0.0]
-    for a, b in zip(pts, pts[1:]):
-        cum.append(cum[-1] + haversine(a, b))
+    if not interval > 0:
+        raise ValueError(f"interval must be > 0, got {interval!r}")
+    arr = np.asarray(pts, dtype=float).reshape(-1, 2)
+    if len(arr) == 0:
+        return arr
+    if len(arr) == 1:
+        return arr.copy()
+    if cum is None:
+        cum = cumulative_distances(arr)
+
     total = cum[-1]
-    samples = []
-    d = 0.0
-    while d <= total:
-        # find segment containing distance d
-        for i in range(len(cum) - 1):
-            if cum[i] <= d <= cum[i+1]:
-                frac = (d - cum[i]) / (cum[i+1] - cum[i])
-                samples.append(interpolate(pts[i], pts[i+1], frac))
+    d = np.arange(int(np.floor(total / interval)) + 1) * interval
+    return points_at(arr, cum, d)
+
+def points_at(arr, cum, d):
+    """
+    Points at route miles `d` along the polyline `arr` (n >= 2 vertices, with
+    cumulative miles `cum`), found by binary search into `cum`.
+    """
+    # segment i satisfies cum[i] <= d <= cum[i+1]
+    i = np.clip(np.searchsorted(cum, d, side='right') - 1, 0, len(cum) - 2)
+    seg = cum[i + 1] - cum[i]
+    with np.errstate(invalid='ignore', divide='ignore'):
+        frac = np.where(seg > 0, (d - cum[i]) / seg, 0.0)
+    frac = np.clip(frac, 0.0, 1.0)[:, None]
+    return arr[i] + (arr[i + 1] - arr[i]) * frac
+
+# -----------------------------------------------------------------------------
+# Adaptive sampling for radius queries
+# -----------------------------------------------------------------------------
+SAMPLE_OVERLAP = float(os.getenv('SAMPLE_OVERLAP', '0.25'))
+
+# candidate points per query spacing when placing adaptive samples
+_CANDIDATES_PER_SPACING = 16
+
+def adaptive_samples(pts, radius, overlap=SAMPLE_OVERLAP, tolerance=None, cum=None):
+    """
+    Place radius-query centres along the polyline `pts` so that consecutive
+    query circles of `radius` miles overlap by `overlap * radius` and every
+    point of the route lies inside at least one circle.
+
+    The route is first simplified with Douglas–Peucker within `tolerance`
+    miles (default: a quarter of the overlap margin) and coverage is checked
+    at candidate points along it, against `radius` less the tolerance and half
+    the candidate step, so the guarantee holds for every point of the original
+    route.  Raises ValueError if `tolerance` leaves no such margin.
+
+    Samples are placed greedily: each next centre is the farthest point along
+    the route that is at most (2 - overlap) * radius in a straight line from
+    the previous one, with everything in between still covered.  Straight
+    highways get the full spacing; winding roads get centres spaced by how
+    far apart they really are, not by road miles.
+
+    Returns (samples, miles): a (k, 2) array of (lat, lon) and each sample's
+    mileage along the original route.
+    """
+    arr = np.asarray(pts, dtype=float).reshape(-1, 2)
+    if cum is None:
+        cum = cumulative_distances(arr)
+    if len(arr) < 2 or cum[-1] == 0:
+        return arr[:1].copy(), np.zeros(min(len(arr), 1))
+    if tolerance is None:
+        tolerance = overlap * radius / 4
+    spacing = (2.0 - overlap) * radius
+    step = spacing / _CANDIDATES_PER_SPACING
+    # Coverage is checked at candidates `step` apart along the simplified
+    # route, which is itself up to `tolerance` off the original: any route
+    # point is within step/2 + tolerance of a checked candidate.
+    reach = radius - tolerance - step / 2
+    if reach <= 0:
+        raise ValueError(f"simplify tolerance {tolerance:g} leaves no coverage "
+                         f"margin for radius {radius:g}")
+
+    # simplified route, with its vertices' mileage on the original
+    keep = simplify_polyline(arr[:, 0], arr[:, 1], tolerance)
+    count('route.simplified_vertices', len(keep))
+    simple = arr[keep]
+    simple_cum = cumulative_distances(simple)
+
+    # candidate centres: every simplified vertex plus a fine even spacing
+    d = np.union1d(simple_cum, np.arange(0.0, simple_cum[-1], step))
+    cand = points_at(simple, simple_cum, d)
+    clat, clon = cand[:, 0], cand[:, 1]
+    # along-route look-ahead bound; beyond it two circles cannot plausibly
+    # cover the road in between, so the search stops there
+    horizon = 4 * spacing
+
+    chosen = [0]
+    i, last = 0, len(cand) - 1
+    while i < last:
+        hi = max(int(np.searchsorted(d, d[i] + horizon, side='right')), i + 2)
+        wlat, wlon = clat[i + 1:hi], clon[i + 1:hi]
+        from_i = haversine_many((clat[i], clon[i]), wlat, wlon)
+        too_far = np.flatnonzero(from_i > spacing)
+        j = (too_far[0] if len(too_far) else len(from_i)) - 1
+        # back off until the stretch between the two centres is covered
+        while j > 0:
+            gap = from_i[:j] > reach
+            if not gap.any() or (haversine_many(
+                    (wlat[j], wlon[j]), wlat[:j][gap], wlon[:j][gap]) <= reach).all():
                 break
-        d += interval
-    return samples
+            j -= 1
+        i += 1 + max(j, 0)
+        chosen.append(i)
+
+    chosen = np.asarray(chosen)
+    miles = np.interp(d[chosen], simple_cum, cum[keep])
+    return cand[chosen], miles
+
+def resample_polyline(pts, interval):
+    """
+    List-of-tuples wrapper around `resample_polyline_array`.
+    """
+    return [tuple(p) for p in resample_polyline_array(pts, interval).tolist()]
+
+# -----------------------------------------------------------------------------
+# Persistent route store
+# -----------------------------------------------------------------------------
+ROUTE_CACHE_PATH = os.getenv('ROUTE_CACHE_PATH', 'route_cache.sqlite')
+ROUTE_CACHE_TTL  = float(os.getenv('ROUTE_CACHE_TTL', '0'))      # seconds, 0 = never
+ROUTE_CACHE_MAX  = int(os.getenv('ROUTE_CACHE_MAX', '500'))      # routes kept (LRU)
+
+def normalize_place(place):
+    """Canonical form of an origin/destination string for cache keys."""
+    return ' '.join(place.replace('+', ' ').split()).casefold()
 
+def route_key(origin, destination, mode='driving'):
+    return f"{mode}|{normalize_place(origin)}|{normalize_place(destination)}"
 
+@contextmanager
+def closing_conn(conn):
+    """Commit on success and always close, unlike sqlite3's own context manager."""
+    try:
+        with conn:
+            yield conn
+    finally:
+        conn.close()
+
+class RouteStore:
+    """
+    SQLite-backed cache of decoded routes keyed on normalized
+    origin/destination plus travel mode.  Polylines and their cumulative
+    distances are stored as little-endian float64 blobs, so a hit costs one
+    row read and two `np.frombuffer` calls.  Entries expire after `ttl`
+    seconds (0 = never) and the least recently used are evicted beyond
+    `max_entries`.
+    """
+
+    DDL = """
+    CREATE TABLE IF NOT EXISTS routes (
+        key         TEXT PRIMARY KEY,
+        origin      TEXT,
+        destination TEXT,
+        mode        TEXT,
+        n_points    INTEGER,
+        points      BLOB,
+        cum         BLOB,
+        created     REAL,
+        accessed    REAL,
+        hits        INTEGER DEFAULT 0
+    );
+    """
+
+    def __init__(self, path=ROUTE_CACHE_PATH, ttl=ROUTE_CACHE_TTL,
+                 max_entries=ROUTE_CACHE_MAX):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        with self._connect() as conn:
+            conn.execute(self.DDL)
+
+    def _connect(self):
+        return closing_conn(sqlite3.connect(self.path))
+
+    def get(self, origin, destination, mode='driving'):
+        """Return (pts, cum) arrays for a cached route, or None."""
+        key = route_key(origin, destination, mode)
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT points, cum, created FROM routes WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or (self.ttl and now - row[2] > self.ttl):
+                if row is not None:
+                    conn.execute("DELETE FROM routes WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            conn.execute(
+                "UPDATE routes SET accessed = ?, hits = hits + 1 WHERE key = ?",
+                (now, key))
+        self.hits += 1
+        pts = np.frombuffer(row[0], dtype='<f8').reshape(-1, 2)
+        cum = np.frombuffer(row[1], dtype='<f8')
+        return pts, cum
+
+    def put(self, origin, destination, mode, pts, cum):
+        key = route_key(origin, destination, mode)
+        now = time.time()
+        pts = np.ascontiguousarray(pts, dtype='<f8').reshape(-1, 2)
+        cum = np.ascontiguousarray(cum, dtype='<f8')
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO routes VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, 0)",
+                (key, origin, destination, mode, len(pts),
+                 pts.tobytes(), cum.tobytes(), now, now))
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        if self.ttl:
+            conn.execute("DELETE FROM routes WHERE created < ?", (now - self.ttl,))
+        if self.max_entries:
+            conn.execute("""
+                DELETE FROM routes WHERE key NOT IN (
+                    SELECT key FROM routes ORDER BY accessed DESC LIMIT ?
+                )
+            """, (self.max_entries,))
+
+    def clear(self):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM routes")
+
+    def stats(self):
+        """Summary of the store contents plus this process's hit/miss counts."""
+        with self._connect() as conn:
+            entries, points, size, hits, oldest, newest = conn.execute("""
+                SELECT count(*), coalesce(sum(n_points), 0),
+                       coalesce(sum(length(points) + length(cum)), 0),
+                       coalesce(sum(hits), 0), min(created), max(accessed)
+                  FROM routes
+            """).fetchone()
+        return {
+            'path': self.path,
+            'entries': entries,
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'points': points,
+            'bytes': size,
+            'stored_hits': hits,
+            'oldest_created': oldest,
+            'last_accessed': newest,
+            'session_hits': self.hits,
+            'session_misses': self.misses,
+        }
+
+_route_store = None
+
+def get_route_store():
+    """Shared RouteStore, or None when ROUTE_CACHE_PATH is set empty."""
+    global _route_store
+    if _route_store is None and ROUTE_CACHE_PATH:
+        _route_store = RouteStore()
+    return _route_store
+
+# -----------------------------------------------------------------------------
+# Routes & sampling
+# -----------------------------------------------------------------------------
+def fetch_route(origin, destination, mode='driving'):
+    """
+    Ask the active directions provider (see repeater_tools.directions) for
+    the route polyline as an (n, 2) array of (lat, lon).  Raises
+    `NoRouteError` when there is no route.
+    """
+    with stage('route.fetch'):
+        return get_provider().route(origin, destination, mode)
+
+def get_route(origin, destination, mode='driving'):
+    """
+    Return (pts, cum) for a route: the decoded polyline as an (n, 2) array and
+    the cumulative miles at each vertex.  Served from the route store when
+    possible, which skips both the Directions call and the geometry work.
+    Only providers that call out to a service (Google) use the store.
+    """
+    store = get_route_store() if get_provider().cacheable else None
+    if store is not None:
+        cached = store.get(origin, destination, mode)
+        if cached is not None:
+            count('route.store_hit')
+            return cached
+        count('route.store_miss')
+    pts = fetch_route(origin, destination, mode)
+    with stage('route.cumdist'):
+        cum = cumulative_distances(pts)
+    if store is not None:
+        store.put(origin, destination, mode, pts, cum)
+    return pts, cum
+
+def sample_route(origin, destination, interval):
+    """
+    Fetch driving directions and sample points every `interval` miles.
+    Returns a list of (lat, lon) tuples.
+    """
+    pts, cum = get_route(origin, destination)
+    with stage('route.resample'):
+        return [tuple(p) for p in resample_polyline_array(pts, interval, cum).tolist()]
+
+def sample_route_adaptive(origin, destination, radius, overlap=SAMPLE_OVERLAP,
+                          tolerance=None):
+    """
+    Fetch driving directions and place radius-`radius` query centres with
+    `adaptive_samples`.  Returns (samples, miles): a list of (lat, lon) tuples
+    and each sample's mileage along the route.
+    """
+    pts, cum = get_route(origin, destination)
+    with stage('route.resample'):
+        samples, miles = adaptive_samples(pts, radius, overlap, tolerance, cum)
+    return [tuple(p) for p in samples.tolist()], miles.tolist()
@@ -0,0 +1,103 @@
+# repeater_tools/selection.py
+"""
+Pick the channels worth programming when a route returns more repeaters
+than the radio has memory slots.
+
+Every step is linear or O(n log k) in the number of candidates:
+
+1. score each candidate: distance to the route (as a fraction of the search
+   buffer) plus a penalty for anything not reported on-air;
+2. collapse same-frequency / same-tone duplicates that lie within
+   `dup_window` miles of each other along the route, keeping the best;
+3. reserve part of the budget for coverage: cut the route into equal bins
+   and take the best candidate of each bin, so long gaps get a channel;
+4. fill the rest of the budget with the best remaining scores (heap top-k);
+5. return the picks in route order.
+"""
+import heapq
+import math
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .db import CorridorHit
+from .instrument import count, timed
+
+# added to the distance score; lower scores win
+STATUS_PENALTY = {
+    "On-air":  0.0,
+    "Testing": 0.5,
+    "Off-air": 2.0,
+}
+UNKNOWN_STATUS_PENALTY = 1.0
+
+
+def dedupe_channels(
+    hits: List[CorridorHit],
+    scores: List[float],
+    dup_window: float,
+) -> List[int]:
+    """
+    Indexes of the hits that survive same-frequency/same-tone collapsing.
+    `hits` must be in route order.  Within each channel, a run of hits no
+    longer than `dup_window` miles (measured from the run's first hit) keeps
+    only its best-scoring member.
+    """
+    keep: List[int] = []
+    runs: Dict[Tuple, Tuple[float, int]] = {}   # channel -> (run start mile, best index)
+    for i, hit in enumerate(hits):
+        rpt = hit.repeater
+        key = (rpt.frequency, rpt.tone_mode, rpt.tone)
+        run = runs.get(key)
+        if run is None or hit.route_mile - run[0] > dup_window:
+            if run is not None:
+                keep.append(run[1])
+            runs[key] = (hit.route_mile, i)
+        elif scores[i] < scores[run[1]]:
+            runs[key] = (run[0], i)
+    keep.extend(best for _, best in runs.values())
+    return keep
+
+
+@timed("select.channels")
+def select_channels(
+    hits: Iterable[CorridorHit],
+    budget: int,
+    buffer_miles: float,
+    dup_window: float = 25.0,
+    coverage_share: float = 0.5,
+    route_miles: Optional[float] = None,
+) -> List[CorridorHit]:
+    """
+    Choose at most `budget` hits for a radio's memory, returned in route
+    order.  `coverage_share` of the budget is spent on one channel per
+    equal-length stretch of the route; the rest goes to the best scores.
+    """
+    hits = sorted(hits, key=lambda h: h.route_mile)
+    count("select.input", len(hits))
+    if budget <= 0 or not hits:
+        return []
+    penalty = STATUS_PENALTY.get
+    scores = [
+        h.distance / buffer_miles + penalty(h.repeater.status, UNKNOWN_STATUS_PENALTY)
+        for h in hits
+    ]
+
+    candidates = dedupe_channels(hits, scores, dup_window)
+    if len(candidates) <= budget:
+        return [hits[i] for i in sorted(candidates)]
+
+    # coverage: best candidate per route bin
+    if route_miles is None:
+        route_miles = hits[-1].route_mile
+    n_bins = min(budget, max(1, math.ceil(budget * coverage_share)))
+    bin_len = max(route_miles, 1e-9) / n_bins
+    per_bin: Dict[int, int] = {}
+    for i in candidates:
+        b = min(int(hits[i].route_mile / bin_len), n_bins - 1)
+        if b not in per_bin or scores[i] < scores[per_bin[b]]:
+            per_bin[b] = i
+    chosen = set(per_bin.values())
+
+    # fill: global top-k over the rest
+    rest = (i for i in candidates if i not in chosen)
+    chosen.update(heapq.nsmallest(budget - len(chosen), rest, key=scores.__getitem__))
+    return [hits[i] for i in sorted(chosen)]
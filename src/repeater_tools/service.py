@@ -0,0 +1,407 @@
+# repeater_tools/service.py
+"""
+Long-running HTTP service over the repeater lookups.
+
+One process keeps the expensive state warm: imports, the in-memory spatial
+index (built once, then rebuilt only when the DB file changes) and the route
+store.  Requests are served by a small HTTP/1.1 server on asyncio streams;
+blocking work (SQLite, NumPy, Directions calls) runs on a fixed thread pool.
+
+Identical route requests that arrive while the first is still resolving
+share its result instead of issuing their own Directions call, and outbound
+Directions calls are capped by a semaphore.
+
+Endpoints (GET query string, or POST with a JSON object body):
+
+    /health                                   liveness + index size
+    /stats                                    request / Directions counters
+    /sample    url | origin,destination  [interval | radius, overlap]
+    /radius    lat, lon  [radius]
+    /corridor  url | origin,destination  [radius, channels, dup_window]
+    /export    same as /corridor  [format=chirp|uvk5|ndjson]  -> streamed file
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from . import db
+from .directions import DirectionsError, NoRouteError, get_provider
+from .route_sampler import (
+    SAMPLE_OVERLAP, adaptive_samples, cumulative_distances, fetch_route,
+    get_route_store, parse_maps_url, resample_polyline_array, route_key,
+)
+from .selection import select_channels
+from .writers import PROFILES, get_profile, iter_channels
+
+DEFAULT_INTERVAL = 5.0
+DEFAULT_RADIUS   = 5.0
+MAX_SAMPLES      = 10_000   # per /sample response
+
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found",
+           405: "Method Not Allowed", 500: "Internal Server Error",
+           502: "Bad Gateway"}
+
+
+class HTTPError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _repeater_json(rpt, **extra) -> dict:
+    out = PROFILES["ndjson"].format(0, rpt)
+    out.update(extra)
+    return out
+
+
+class RepeaterService:
+    """
+    Request handlers plus the warm state they share.  `jobs` sizes the
+    worker pool for blocking lookups; `directions_concurrency` caps
+    simultaneous Directions API calls.
+    """
+
+    def __init__(self, jobs: int = 4, directions_concurrency: int = 4):
+        self._pool = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="lookup")
+        self._directions_concurrency = directions_concurrency
+        self._directions: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.counters = {
+            "requests": 0,
+            "errors": 0,
+            "route_requests": 0,
+            "route_coalesced": 0,
+            "directions_calls": 0,
+        }
+
+    def _run(self, fn, *args):
+        return asyncio.get_running_loop().run_in_executor(self._pool, fn, *args)
+
+    async def warm(self) -> None:
+        """Build the spatial index (memory mode) and open the route store."""
+        self._directions = asyncio.Semaphore(self._directions_concurrency)
+        if db.USE_MEMORY_INDEX:
+            from .spatial_index import get_index
+            await self._run(get_index)
+        await self._run(get_route_store)
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=False)
+
+    # ─── routes ───────────────────────────────────────────────────────────────
+    async def _resolve_route(self, origin, destination, mode):
+        store = get_route_store() if get_provider().cacheable else None
+        if store is not None:
+            cached = await self._run(store.get, origin, destination, mode)
+            if cached is not None:
+                return cached
+        async with self._directions:
+            self.counters["directions_calls"] += 1
+            try:
+                pts = await self._run(fetch_route, origin, destination, mode)
+            except NoRouteError as e:
+                raise HTTPError(404, str(e)) from None
+            except DirectionsError as e:
+                raise HTTPError(502, str(e)) from None
+        cum = cumulative_distances(pts)
+        if store is not None:
+            await self._run(store.put, origin, destination, mode, pts, cum)
+        return pts, cum
+
+    async def get_route(self, origin: str, destination: str, mode: str = "driving"):
+        """(pts, cum) for a route; concurrent identical requests share one lookup."""
+        self.counters["route_requests"] += 1
+        key = route_key(origin, destination, mode)
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = asyncio.ensure_future(self._resolve_route(origin, destination, mode))
+            self._inflight[key] = fut
+            fut.add_done_callback(lambda _: self._inflight.pop(key, None))
+        else:
+            self.counters["route_coalesced"] += 1
+        return await asyncio.shield(fut)
+
+    # ─── handlers ─────────────────────────────────────────────────────────────
+    async def health(self, params):
+        out = {"status": "ok", "index": "sqlite"}
+        if db.USE_MEMORY_INDEX:
+            from .spatial_index import get_index
+            out["index"] = "memory"
+            out["repeaters"] = len(await self._run(get_index))
+        elif db.USE_TILE_CACHE:
+            from .tiles import get_tile_cache
+            out["index"] = "tiles"
+            out.update(get_tile_cache().stats())
+        return out
+
+    async def stats(self, params):
+        out = dict(self.counters, inflight_routes=len(self._inflight))
+        store = get_route_store()
+        if store is not None:
+            out["route_store"] = await self._run(store.stats)
+        return out
+
+    async def sample(self, params):
+        origin, destination = _route_params(params)
+        pts, cum = await self.get_route(origin, destination)
+        out = {
+            "origin": origin,
+            "destination": destination,
+            "route_miles": round(float(cum[-1]), 3),
+        }
+        if "radius" in params:
+            # adaptive: centres for radius queries, placed by route geometry
+            radius = _positive(params, "radius")
+            overlap = _float(params, "overlap", SAMPLE_OVERLAP)
+            if not 0 <= overlap < 1:
+                raise HTTPError(400, "parameter overlap must be in [0, 1)")
+            if cum[-1] / radius >= MAX_SAMPLES:
+                raise HTTPError(400, f"radius too small: more than {MAX_SAMPLES} samples")
+            samples, miles = await self._run(adaptive_samples, pts, radius, overlap,
+                                             None, cum)
+            out.update(radius=radius, overlap=overlap, miles=miles.round(3).tolist())
+        else:
+            interval = _positive(params, "interval", DEFAULT_INTERVAL)
+            if cum[-1] / interval >= MAX_SAMPLES:
+                raise HTTPError(400, f"interval too small: more than {MAX_SAMPLES} samples")
+            out["interval"] = interval
+            samples = await self._run(resample_polyline_array, pts, interval, cum)
+        out["points"] = samples.tolist()
+        return out
+
+    async def radius(self, params):
+        center = (_float(params, "lat"), _float(params, "lon"))
+        radius = _positive(params, "radius", DEFAULT_RADIUS)
+
+        def lookup():
+            rowids, dists = db.get_repeater_ids_within_range(center, radius)
+            order = dists.argsort(kind="stable")
+            reps = db.load_repeaters(rowids[order].tolist())
+            return [_repeater_json(r, distance=round(d, 3))
+                    for r, d in zip(reps, dists[order].tolist())]
+
+        reps = await self._run(lookup)
+        return {"center": list(center), "radius": radius,
+                "count": len(reps), "repeaters": reps}
+
+    async def _corridor_hits(self, params):
+        origin, destination = _route_params(params)
+        radius   = _positive(params, "radius", DEFAULT_RADIUS)
+        channels = _int(params, "channels", 0)
+        window   = _float(params, "dup_window", 25.0)
+        pts, cum = await self.get_route(origin, destination)
+        route_miles = float(cum[-1])
+
+        def lookup():
+            hits = db.get_repeaters_along_route(pts, radius)
+            if channels:
+                hits = select_channels(hits, channels, radius, dup_window=window,
+                                       route_miles=route_miles)
+            return hits
+
+        return origin, destination, route_miles, await self._run(lookup)
+
+    async def corridor(self, params):
+        origin, destination, route_miles, hits = await self._corridor_hits(params)
+        reps = [_repeater_json(h.repeater, distance=round(h.distance, 3),
+                               route_mile=round(h.route_mile, 3)) for h in hits]
+        return {"origin": origin, "destination": destination,
+                "route_miles": round(route_miles, 3),
+                "count": len(reps), "repeaters": reps}
+
+    async def export(self, params):
+        try:
+            profile = get_profile(_str(params, "format", "chirp"))
+        except ValueError as e:
+            raise HTTPError(400, str(e)) from None
+        _, _, _, hits = await self._corridor_hits(params)
+        return profile, [h.repeater for h in hits]
+
+    ROUTES = {
+        "/health":   "health",
+        "/stats":    "stats",
+        "/sample":   "sample",
+        "/radius":   "radius",
+        "/corridor": "corridor",
+        "/export":   "export",
+    }
+
+    # ─── HTTP plumbing ────────────────────────────────────────────────────────
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """One client connection; HTTP/1.1 keep-alive is honoured."""
+        try:
+            while True:
+                request = await _read_request(reader)
+                if request is None:
+                    break
+                method, target, headers, body = request
+                keep_alive = headers.get("connection", "").lower() != "close"
+                await self._respond(method, target, body, writer, keep_alive)
+                if not keep_alive:
+                    break
+        except HTTPError as e:   # malformed request: answer, then drop the connection
+            _send(writer, e.status, _json_bytes({"error": str(e)}), "application/json", False)
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            try:
+                await writer.drain()
+                writer.close()
+            except ConnectionError:
+                pass
+
+    async def _respond(self, method, target, body, writer, keep_alive):
+        self.counters["requests"] += 1
+        started = time.perf_counter()
+        url = urlsplit(target)
+        try:
+            name = self.ROUTES.get(url.path.rstrip("/") or "/")
+            if name is None:
+                raise HTTPError(404, f"no such endpoint: {url.path}")
+            if method not in ("GET", "POST"):
+                raise HTTPError(405, f"method not allowed: {method}")
+            params = _params(url.query, body)
+            result = await getattr(self, name)(params)
+        except HTTPError as e:
+            self.counters["errors"] += 1
+            _send(writer, e.status, _json_bytes({"error": str(e)}), "application/json", keep_alive)
+            return
+        except Exception as e:
+            self.counters["errors"] += 1
+            # googlemaps.exceptions.* are upstream failures, anything else is ours
+            upstream = type(e).__module__.startswith("googlemaps")
+            _send(writer, 502 if upstream else 500,
+                  _json_bytes({"error": f"{type(e).__name__}: {e}"}),
+                  "application/json", keep_alive)
+            return
+
+        if name != "export":
+            result["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+            _send(writer, 200, _json_bytes(result), "application/json", keep_alive)
+            return
+
+        # stream the export with chunked transfer encoding
+        profile, repeaters = result
+        writer.write(_head(200, CONTENT_TYPES[profile.kind], keep_alive, extra=(
+            "Transfer-Encoding: chunked",
+            f'Content-Disposition: attachment; filename="repeaters{profile.extension}"',
+        )))
+        for chunk in iter_channels(repeaters, profile):
+            data = chunk.encode("utf-8")
+            writer.write(b"%x\r\n%s\r\n" % (len(data), data))
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+
+# ─── request parsing helpers ───────────────────────────────────────────────────
+async def _read_request(reader: asyncio.StreamReader):
+    """Return (method, target, headers, body), or None at end of stream."""
+    try:
+        line = await reader.readline()
+        if not line:
+            return None
+        parts = line.decode("latin-1").split()
+        if len(parts) != 3:
+            raise HTTPError(400, "malformed request line")
+        method, target, _version = parts
+        headers = {}
+        while True:
+            raw = await reader.readline()
+            if raw in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = raw.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+    except ValueError:   # oversized line or bad Content-Length
+        raise HTTPError(400, "malformed request") from None
+    body = await reader.readexactly(length) if length else b""
+    return method.upper(), target, headers, body
+
+
+def _params(query: str, body: bytes) -> Dict[str, str]:
+    params = {k: v[-1] for k, v in parse_qs(query).items()}
+    if body:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            raise HTTPError(400, "request body is not JSON") from None
+        if not isinstance(data, dict):
+            raise HTTPError(400, "request body must be a JSON object")
+        params.update({k: str(v) for k, v in data.items()})
+    return params
+
+
+def _str(params, name, default=None) -> str:
+    value = params.get(name, default)
+    if value is None:
+        raise HTTPError(400, f"missing parameter: {name}")
+    return value
+
+
+def _float(params, name, default=None) -> float:
+    try:
+        return float(_str(params, name, default))
+    except ValueError:
+        raise HTTPError(400, f"parameter {name} must be a number") from None
+
+
+def _positive(params, name, default=None) -> float:
+    value = _float(params, name, default)
+    if not value > 0:   # also rejects nan
+        raise HTTPError(400, f"parameter {name} must be > 0")
+    return value
+
+
+def _int(params, name, default=None) -> int:
+    try:
+        return int(_str(params, name, default))
+    except ValueError:
+        raise HTTPError(400, f"parameter {name} must be an integer") from None
+
+
+def _route_params(params) -> Tuple[str, str]:
+    if "url" in params:
+        try:
+            return parse_maps_url(params["url"])
+        except ValueError as e:
+            raise HTTPError(400, str(e)) from None
+    return _str(params, "origin"), _str(params, "destination")
+
+
+# ─── response helpers ──────────────────────────────────────────────────────────
+def _json_bytes(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+def _head(status, content_type, keep_alive, length=None, extra=()) -> bytes:
+    lines = [f"HTTP/1.1 {status} {REASONS.get(status, '')}",
+             f"Content-Type: {content_type}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    if length is not None:
+        lines.append(f"Content-Length: {length}")
+    lines.extend(extra)
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1")
+
+
+def _send(writer, status, body: bytes, content_type, keep_alive) -> None:
+    writer.write(_head(status, content_type, keep_alive, len(body)) + body)
+
+
+async def serve(host: str = "127.0.0.1", port: int = 8765, jobs: int = 4,
+                directions_concurrency: int = 4) -> None:
+    """Warm up, then serve until cancelled."""
+    service = RepeaterService(jobs, directions_concurrency)
+    await service.warm()
+    server = await asyncio.start_server(service.handle, host, port)
+    addrs = ", ".join(str(s.getsockname()[:2]) for s in server.sockets)
+    print(f"repeater service listening on {addrs}", flush=True)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
@@ -0,0 +1,248 @@
+# repeater_tools/snapshot.py
+"""
+Memory-mapped columnar snapshot of the `repeaters` table.
+
+insert_repeaters.py writes `<db stem>.snapshot` next to the DB after every
+load.  The file is a small JSON header followed by 8-byte aligned sections:
+
+    fixed-width arrays   rowid, rptr_id (int64), latitude, longitude,
+                         frequency, input_freq, pl, tsq (float64, NaN = NULL),
+                         flags (uint8, FLAG_*), nulls (uint16, one bit per
+                         string column)
+    string heap          per string column, int64 offsets (rows + 1) into
+                         one UTF-8 heap
+
+Rows are sorted by rowid.  `Snapshot` maps the file read-only and wraps each
+section with `np.frombuffer`, so opening it copies nothing: processes
+opening the same snapshot share one page-cached copy, and strings are only
+decoded for the rows actually materialized.
+
+A snapshot records the DB mtime it was taken at; `get_snapshot` ignores
+snapshots the DB has moved on from, so callers fall back to SQLite.
+"""
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from models.repeater import Repeater
+from .db import db_mtime
+
+MAGIC = b"RPTSNAP\x01"
+_PREAMBLE = struct.Struct("<8sQ")   # magic, header length
+
+FLAG_FM_ANALOG = 1   # fm_analog = 'Yes'
+FLAG_COORDS    = 2   # latitude and longitude present
+FLAG_ON_AIR    = 4   # operational_status = 'On-air'
+
+INT_COLUMNS   = ("rowid", "rptr_id")
+FLOAT_COLUMNS = ("latitude", "longitude", "frequency", "input_freq", "pl", "tsq")
+STRING_COLUMNS = ("state_id", "callsign", "nearest_city", "county", "state",
+                  "operational_status", "fm_analog", "notes", "last_update")
+
+
+def snapshot_path(db_path: str) -> str:
+    """Where the snapshot of `db_path` lives: same directory, `.snapshot` suffix."""
+    return os.path.splitext(db_path)[0] + ".snapshot"
+
+
+# rows read from SQLite per fetchmany() while writing
+FETCH_ROWS = 10_000
+
+
+def _align(n: int) -> int:
+    return (n + 7) & ~7
+
+
+# ─── writing ───────────────────────────────────────────────────────────────────
+def write_snapshot(db_path: str, path: Optional[str] = None) -> int:
+    """
+    Write the snapshot of `db_path` (default location: `snapshot_path`),
+    atomically replacing any previous one.  Returns the number of rows.
+    """
+    path = path or snapshot_path(db_path)
+    source_mtime = db_mtime(db_path)
+
+    n_int, n_float = len(INT_COLUMNS), len(FLOAT_COLUMNS)
+    fm = STRING_COLUMNS.index("fm_analog") + n_int + n_float
+    status = STRING_COLUMNS.index("operational_status") + n_int + n_float
+    cols = ", ".join(INT_COLUMNS + FLOAT_COLUMNS + STRING_COLUMNS)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("BEGIN")   # the count and the rows from one read snapshot
+        n = conn.execute("SELECT count(*) FROM repeaters").fetchone()[0]
+        arrays: Dict[str, np.ndarray] = {}
+        for name in INT_COLUMNS:
+            arrays[name] = np.empty(n, dtype="<i8")
+        for name in FLOAT_COLUMNS:
+            arrays[name] = np.empty(n, dtype="<f8")
+        for name in STRING_COLUMNS:
+            arrays[f"{name}.offsets"] = np.zeros(n + 1, dtype="<i8")
+        nulls = arrays["nulls"] = np.zeros(n, dtype="<u2")
+        flags = arrays["flags"] = np.zeros(n, dtype="<u1")
+        heaps = [bytearray() for _ in STRING_COLUMNS]
+
+        cur = conn.execute(f"SELECT {cols} FROM repeaters ORDER BY rowid")
+        start = 0
+        while True:
+            rows = cur.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            stop = start + len(rows)
+            for i, name in enumerate(INT_COLUMNS):
+                arrays[name][start:stop] = [-1 if r[i] is None else r[i] for r in rows]
+            for i, name in enumerate(FLOAT_COLUMNS, n_int):
+                # None -> nan
+                arrays[name][start:stop] = np.array([r[i] for r in rows], dtype="<f8")
+            for k, (name, heap) in enumerate(zip(STRING_COLUMNS, heaps)):
+                i = n_int + n_float + k
+                offsets = arrays[f"{name}.offsets"]
+                for j, r in enumerate(rows, start):
+                    value = r[i]
+                    if value is None:
+                        nulls[j] |= 1 << k
+                    else:
+                        heap += str(value).encode("utf-8")
+                    offsets[j + 1] = len(heap)
+            flags[start:stop] = [(FLAG_FM_ANALOG if r[fm] == "Yes" else 0)
+                                 | (FLAG_ON_AIR if r[status] == "On-air" else 0)
+                                 for r in rows]
+            start = stop
+    finally:
+        conn.close()
+
+    # each column's offsets were kept into its own heap; shift them into the joint one
+    base = 0
+    for name, heap in zip(STRING_COLUMNS, heaps):
+        arrays[f"{name}.offsets"] += base
+        base += len(heap)
+    flags[~(np.isnan(arrays["latitude"]) | np.isnan(arrays["longitude"]))] |= FLAG_COORDS
+    arrays["heap"] = np.frombuffer(b"".join(heaps), dtype="u1")
+
+    sections, offset = {}, 0
+    for name, arr in arrays.items():
+        sections[name] = [offset, arr.dtype.str, len(arr)]
+        offset = _align(offset + arr.nbytes)
+    header = json.dumps({
+        "rows": n, "source_mtime": source_mtime,
+        "strings": STRING_COLUMNS, "sections": sections,
+    }).encode("utf-8")
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(_PREAMBLE.pack(MAGIC, len(header)))
+        f.write(header)
+        base = _align(_PREAMBLE.size + len(header))
+        for name, arr in arrays.items():
+            f.seek(base + sections[name][0])
+            f.write(arr.tobytes())
+        f.truncate(base + offset)
+    # readers holding the old mapping keep the old inode until they reopen
+    os.replace(tmp, path)
+    return n
+
+
+# ─── reading ───────────────────────────────────────────────────────────────────
+class Snapshot:
+    """
+    Read-only view of a snapshot file.  Column arrays (`rowids`, `lats`,
+    `lons`, `flags`, ...) are NumPy views straight onto the mapping.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            self.file_id = os.fstat(f.fileno()).st_ino
+        magic, header_len = _PREAMBLE.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a repeater snapshot")
+        header = json.loads(self._mm[_PREAMBLE.size:_PREAMBLE.size + header_len])
+        self.rows = header["rows"]
+        self.source_mtime = header["source_mtime"]
+        base = _align(_PREAMBLE.size + header_len)
+        self._arrays = {
+            name: np.frombuffer(self._mm, dtype=dtype, count=n, offset=base + off)
+            for name, (off, dtype, n) in header["sections"].items()
+        }
+        self._string_bit = {name: 1 << k for k, name in enumerate(header["strings"])}
+
+        self.rowids = self._arrays["rowid"]
+        self.lats   = self._arrays["latitude"]
+        self.lons   = self._arrays["longitude"]
+        self.flags  = self._arrays["flags"]
+        self._nulls = self._arrays["nulls"]
+        self._heap  = self._arrays["heap"]
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def column(self, name: str) -> np.ndarray:
+        """Fixed-width column `name` (see INT_COLUMNS / FLOAT_COLUMNS)."""
+        return self._arrays[name]
+
+    def string(self, name: str, pos: int) -> Optional[str]:
+        if self._nulls[pos] & self._string_bit[name]:
+            return None
+        offsets = self._arrays[f"{name}.offsets"]
+        return self._heap[offsets[pos]:offsets[pos + 1]].tobytes().decode("utf-8")
+
+    def positions(self, rowids: Sequence[int]) -> np.ndarray:
+        """Positions of `rowids` in the snapshot (KeyError if any is absent)."""
+        rowids = np.asarray(rowids, dtype=np.int64)
+        if not len(rowids):
+            return np.empty(0, dtype=np.int64)
+        pos = np.searchsorted(self.rowids, rowids).clip(0, max(self.rows - 1, 0))
+        if not self.rows or (self.rowids[pos] != rowids).any():
+            raise KeyError("rowid not in snapshot")
+        return pos
+
+    def row(self, pos: int) -> dict:
+        """Row at `pos` as a column -> value mapping, NULLs as None."""
+        out = {}
+        rptr_id = int(self._arrays["rptr_id"][pos])
+        out["rptr_id"] = None if rptr_id == -1 else rptr_id
+        for name in FLOAT_COLUMNS:
+            value = float(self._arrays[name][pos])
+            out[name] = None if value != value else value
+        for name in self._string_bit:
+            out[name] = self.string(name, pos)
+        return out
+
+    def repeaters(self, positions: Sequence[int]) -> List[Repeater]:
+        return [Repeater.from_row(self.row(p)) for p in np.asarray(positions).tolist()]
+
+
+_snapshots: Dict[str, Snapshot] = {}
+_snapshots_lock = threading.Lock()
+
+
+def get_snapshot(db_path: Optional[str] = None) -> Optional[Snapshot]:
+    """
+    Shared snapshot of `db_path` (default: db.DB_PATH), or None when there is
+    none or the DB changed after it was taken.
+    """
+    if db_path is None:
+        from . import db
+        db_path = db.DB_PATH
+    path = snapshot_path(db_path)
+    try:
+        file_id = os.stat(path).st_ino
+        mtime = db_mtime(db_path)
+    except FileNotFoundError:
+        return None
+    key = os.path.abspath(path)
+    with _snapshots_lock:
+        snap = _snapshots.get(key)
+        if snap is None or snap.file_id != file_id:
+            try:
+                snap = _snapshots[key] = Snapshot(path)
+            except (OSError, ValueError):
+                return None
+        return snap if snap.source_mtime == mtime else None
@@ -0,0 +1,229 @@
+# repeater_tools/spatial_index.py
+"""
+In-process spatial index over the FM-analog repeaters.
+
+The table is read once into compact coordinate arrays, bucketed on a fixed
+lat/lon grid (points sorted by cell key so every grid row is one contiguous
+slice found by binary search).  Radius and corridor queries then run purely
+in memory; `Repeater` objects are only built for the rows a query returns,
+and are cached by rowid.
+
+When insert_repeaters.py has left a current columnar snapshot next to the
+DB (repeater_tools.snapshot), the arrays come from its memory mapping and rows
+are materialized from it, with no SQLite reads at all.
+
+The index is rebuilt when the DB file (or its WAL) changes mtime; cached
+`Repeater` objects whose `last_update` is unchanged carry over to the new
+index, so an incremental sync only drops the rows it actually touched.
+"""
+import math
+import os
+import sqlite3
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.repeater import Repeater
+from .db import (
+    CorridorHit, chunk_span, corridor_boxes, db_mtime, fetch_repeaters, route_arrays,
+)
+from .instrument import count, stage
+from .utils import haversine_many, nearest_on_path
+
+# grid cell size in degrees; ~35 mi N-S, comparable to typical query radii
+CELL_DEG = 0.5
+_LON_CELLS = int(math.ceil(360 / CELL_DEG)) + 1
+
+
+_GONE = object()
+
+
+def _cell_keys(lats, lons):
+    row = np.floor((np.asarray(lats) + 90.0) / CELL_DEG).astype(np.int64)
+    col = np.floor((np.asarray(lons) + 180.0) / CELL_DEG).astype(np.int64)
+    return row * _LON_CELLS + col
+
+
+class RepeaterIndex:
+    """
+    Grid index over the repeaters in `db_path`.  Positions returned by the
+    candidate search are indexes into `rowids` / `lats` / `lons`.
+    """
+
+    def __init__(self, db_path: str, use_snapshot: bool = True):
+        self.db_path = db_path
+        self.mtime   = db_mtime(db_path)
+        self._cache: Dict[int, Repeater] = {}
+        self._lock = threading.Lock()
+
+        from .snapshot import FLAG_COORDS, FLAG_FM_ANALOG, get_snapshot
+        self._snapshot = get_snapshot(db_path) if use_snapshot else None
+        if self._snapshot is not None:
+            # columnar snapshot: no per-row Python work, rows decoded on demand
+            snap = self._snapshot
+            wanted = FLAG_FM_ANALOG | FLAG_COORDS
+            self._snap_pos = np.flatnonzero((snap.flags & wanted) == wanted)
+            self.rowids = snap.rowids[self._snap_pos]
+            self.lats   = snap.lats[self._snap_pos]
+            self.lons   = snap.lons[self._snap_pos]
+            self._versions = None
+        else:
+            conn = sqlite3.connect(db_path)
+            rows = conn.execute("""
+                SELECT rowid, latitude, longitude, last_update
+                  FROM repeaters
+                 WHERE fm_analog = 'Yes'
+                   AND latitude IS NOT NULL AND longitude IS NOT NULL
+            """).fetchall()
+            conn.close()
+
+            # rowid -> last_update, to tell which cached rows survive a rebuild
+            self._versions = {row[0]: row[3] for row in rows}
+            data = np.array([row[:3] for row in rows], dtype=float).reshape(-1, 3)
+            self.rowids = data[:, 0].astype(np.int64)
+            self.lats   = data[:, 1].copy()
+            self.lons   = data[:, 2].copy()
+
+        keys = _cell_keys(self.lats, self.lons)
+        self._order = np.argsort(keys, kind="stable")
+        self._keys  = keys[self._order]
+
+    def __len__(self) -> int:
+        return len(self.rowids)
+
+    def _version(self, rid: int):
+        """last_update of `rowid`, or _GONE if it is not in the index."""
+        if self._versions is not None:
+            return self._versions.get(rid, _GONE)
+        try:
+            pos = self._snapshot.positions([rid])[0]
+        except KeyError:
+            return _GONE
+        return self._snapshot.string("last_update", pos)
+
+    def inherit(self, old: "RepeaterIndex") -> None:
+        """Keep `old`'s materialized rows whose last_update did not change."""
+        for rid, rpt in old._cache.items():
+            version = self._version(rid)
+            if version is not _GONE and version == old._version(rid):
+                self._cache[rid] = rpt
+
+    # ─── candidate search ─────────────────────────────────────────────────────
+    def candidates(self, min_lat, max_lat, min_lon, max_lon) -> np.ndarray:
+        """Positions of all points inside the given bounding box."""
+        r0, c0 = (np.floor([(min_lat + 90.0) / CELL_DEG,
+                            (min_lon + 180.0) / CELL_DEG]).astype(np.int64))
+        r1, c1 = (np.floor([(max_lat + 90.0) / CELL_DEG,
+                            (max_lon + 180.0) / CELL_DEG]).astype(np.int64))
+        rows = np.arange(r0, r1 + 1) * _LON_CELLS
+        lo = np.searchsorted(self._keys, rows + c0, side="left")
+        hi = np.searchsorted(self._keys, rows + c1, side="right")
+        if not len(lo) or not (hi - lo).any():
+            return np.empty(0, dtype=np.int64)
+        pos = self._order[np.concatenate([np.arange(a, b) for a, b in zip(lo, hi)])]
+
+        la, lo_ = self.lats[pos], self.lons[pos]
+        keep = (la >= min_lat) & (la <= max_lat) & (lo_ >= min_lon) & (lo_ <= max_lon)
+        return pos[keep]
+
+    # ─── lazy materialization ─────────────────────────────────────────────────
+    def materialize(self, positions: Sequence[int]) -> List[Repeater]:
+        """Return `Repeater` objects for `positions`, loading missing rows."""
+        rowids = self.rowids[np.asarray(positions, dtype=np.int64)].tolist()
+        with self._lock:
+            missing = [r for r in rowids if r not in self._cache]
+            count("index.cache_hits", len(rowids) - len(missing))
+            if missing and self._snapshot is not None:
+                snap = self._snapshot
+                count("lookup.rows_materialized", len(missing))
+                self._cache.update(zip(missing, snap.repeaters(snap.positions(missing))))
+            elif missing:
+                conn = sqlite3.connect(self.db_path)
+                self._cache.update(fetch_repeaters(conn, missing))
+                conn.close()
+            return [self._cache[r] for r in rowids]
+
+    # ─── queries ──────────────────────────────────────────────────────────────
+    def _positions_within_range(self, center, radius_miles):
+        lat, lon = center
+        lat_delta = radius_miles / 69.0
+        lon_delta = radius_miles / (abs(math.cos(math.radians(lat))) * 69.0)
+        count("lookup.queries")
+        with stage("lookup.bbox"):
+            pos = self.candidates(lat - lat_delta, lat + lat_delta,
+                                  lon - lon_delta, lon + lon_delta)
+        count("lookup.candidates", len(pos))
+        with stage("lookup.distance"):
+            dist = haversine_many(center, self.lats[pos], self.lons[pos])
+            keep = dist <= radius_miles
+        count("lookup.survivors", int(keep.sum()))
+        return pos[keep], dist[keep]
+
+    def ids_within_range(
+        self,
+        center: Tuple[float, float],
+        radius_miles: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        pos, dist = self._positions_within_range(center, radius_miles)
+        return self.rowids[pos], dist
+
+    def within_range(
+        self,
+        center: Tuple[float, float],
+        radius_miles: float
+    ) -> List[Repeater]:
+        return self.materialize(self._positions_within_range(center, radius_miles)[0])
+
+    def along_route(
+        self,
+        path: Sequence[Tuple[float, float]],
+        buffer_miles: float
+    ) -> List[CorridorHit]:
+        lats, lons, cum = route_arrays(path)
+
+        best = {}   # position -> (distance, route_mile)
+        count("lookup.queries")
+        bbox, distance = stage("lookup.bbox"), stage("lookup.distance")
+        for chunk, *box in corridor_boxes(lats, lons, buffer_miles):
+            with bbox:
+                pos = self.candidates(*box)
+            count("lookup.candidates", len(pos))
+            if not len(pos):
+                continue
+            with distance:
+                start, stop = chunk_span(chunk, lats)
+                dmin, mile = nearest_on_path(
+                    self.lats[pos], self.lons[pos],
+                    lats[start:stop], lons[start:stop], cum[start:stop])
+                for p, d, m in zip(pos.tolist(), dmin.tolist(), mile.tolist()):
+                    if d <= buffer_miles and (p not in best or d < best[p][0]):
+                        best[p] = (d, m)
+        count("lookup.survivors", len(best))
+
+        order = sorted(best, key=lambda p: (best[p][1], best[p][0], self.rowids[p]))
+        reps = self.materialize(order)
+        return [CorridorHit(rpt, *best[p]) for rpt, p in zip(reps, order)]
+
+
+_indexes: Dict[str, RepeaterIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(db_path: Optional[str] = None) -> RepeaterIndex:
+    """
+    Return the shared index for `db_path` (default: db.DB_PATH), rebuilding it
+    if the DB file changed since it was loaded.
+    """
+    if db_path is None:
+        from . import db
+        db_path = db.DB_PATH
+    key = os.path.abspath(db_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None or index.mtime != db_mtime(db_path):
+            old, index = index, RepeaterIndex(db_path)
+            if old is not None:
+                index.inherit(old)
+            _indexes[key] = index
+        return index
@@ -0,0 +1,400 @@
+# repeater_tools/tiles.py
+"""
+Geographic tile cache of repeater candidate sets.
+
+FM-analog repeaters are pre-bucketed into fixed TILE_DEG x TILE_DEG lat/lon
+tiles in a side table, `repeater_tiles`, clustered on (tile, id) so one tile
+is one contiguous index range holding (id, latitude, longitude).  Triggers on
+`repeaters` keep the buckets current and bump a per-tile counter in
+`repeater_tile_versions`, so the side table is rebuilt incrementally as rows
+change.
+
+`TileCache` keeps an LRU of hot tiles in memory, in blocks of a few
+neighbouring tiles sorted by longitude, together with the `Repeater` objects
+already materialized for them.  A lookup computes the blocks covering its
+bounding box, loads only the missing ones (one index range scan each) and
+slices their contents in NumPy; repeated lookups along a popular corridor
+touch no SQL at all.  When the DB file changes, the version table is re-read
+and only blocks holding a tile whose version moved are dropped.
+"""
+import math
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from models.repeater import Repeater
+from .db import (
+    CorridorHit, chunk_span, corridor_boxes, db_mtime, fetch_repeaters, read_conn,
+    route_arrays,
+)
+from .instrument import count, stage
+from .utils import haversine_many, nearest_on_path
+
+# tile size in degrees; ~17 mi N-S, a handful of tiles per typical query
+TILE_DEG = 0.25
+_TILE_COLS = int(math.ceil(360 / TILE_DEG)) + 1
+
+# hot blocks of tiles (see BLOCK_COLS) kept in memory
+TILE_CACHE_MAX = int(os.getenv("TILE_CACHE_MAX", "1024"))
+
+
+def _tile_sql(lat: str, lon: str) -> str:
+    # (lat + 90) and (lon + 180) are non-negative, so CAST truncation == floor
+    return (f"(CAST(({lat} + 90.0) / {TILE_DEG} AS INTEGER) * {_TILE_COLS}"
+            f" + CAST(({lon} + 180.0) / {TILE_DEG} AS INTEGER))")
+
+
+_QUALIFIES = ("{r}.fm_analog = 'Yes' AND {r}.latitude IS NOT NULL "
+              "AND {r}.longitude IS NOT NULL")
+
+TILE_CACHE_DDL = f"""
+CREATE TABLE IF NOT EXISTS repeater_tiles (
+    tile      INTEGER NOT NULL,
+    id        INTEGER NOT NULL,
+    latitude  REAL,
+    longitude REAL,
+    PRIMARY KEY (tile, id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS repeater_tiles_id ON repeater_tiles (id);
+
+CREATE TABLE IF NOT EXISTS repeater_tile_versions (
+    tile    INTEGER PRIMARY KEY,
+    version INTEGER NOT NULL
+);
+
+CREATE TRIGGER IF NOT EXISTS repeater_tiles_ai
+AFTER INSERT ON repeaters
+WHEN {_QUALIFIES.format(r="new")}
+BEGIN
+    INSERT OR REPLACE INTO repeater_tiles
+    VALUES ({_tile_sql("new.latitude", "new.longitude")}, new.rowid,
+            new.latitude, new.longitude);
+    INSERT INTO repeater_tile_versions
+    VALUES ({_tile_sql("new.latitude", "new.longitude")}, 1)
+    ON CONFLICT (tile) DO UPDATE SET version = version + 1;
+END;
+
+-- any column: TileCache also keeps the tiles' materialized rows
+CREATE TRIGGER IF NOT EXISTS repeater_tiles_au
+AFTER UPDATE ON repeaters
+BEGIN
+    UPDATE repeater_tile_versions SET version = version + 1
+     WHERE tile IN (SELECT tile FROM repeater_tiles WHERE id = old.rowid);
+    DELETE FROM repeater_tiles WHERE id = old.rowid;
+    INSERT INTO repeater_tiles
+    SELECT {_tile_sql("new.latitude", "new.longitude")}, new.rowid,
+           new.latitude, new.longitude
+     WHERE {_QUALIFIES.format(r="new")};
+    INSERT INTO repeater_tile_versions
+    SELECT {_tile_sql("new.latitude", "new.longitude")}, 1
+     WHERE {_QUALIFIES.format(r="new")}
+    ON CONFLICT (tile) DO UPDATE SET version = version + 1;
+END;
+
+CREATE TRIGGER IF NOT EXISTS repeater_tiles_ad
+AFTER DELETE ON repeaters
+BEGIN
+    UPDATE repeater_tile_versions SET version = version + 1
+     WHERE tile IN (SELECT tile FROM repeater_tiles WHERE id = old.rowid);
+    DELETE FROM repeater_tiles WHERE id = old.rowid;
+END;
+"""
+
+
+def ensure_tile_cache(conn: sqlite3.Connection) -> int:
+    """
+    Create the tile tables and triggers if missing and backfill repeaters
+    not yet bucketed (i.e. migrate an existing DB).  Returns rows added.
+    """
+    conn.executescript(TILE_CACHE_DDL)
+    cur = conn.execute(f"""
+        INSERT INTO repeater_tiles
+        SELECT {_tile_sql("r.latitude", "r.longitude")}, r.rowid, r.latitude, r.longitude
+          FROM repeaters AS r
+         WHERE {_QUALIFIES.format(r="r")}
+           AND r.rowid NOT IN (SELECT id FROM repeater_tiles)
+    """)
+    added = cur.rowcount
+    if added:
+        conn.execute("""
+            INSERT INTO repeater_tile_versions
+            SELECT tile, 1 FROM repeater_tiles WHERE true GROUP BY tile
+            ON CONFLICT (tile) DO UPDATE SET version = version + 1
+        """)
+    conn.commit()
+    return added
+
+
+def has_tile_cache(conn: sqlite3.Connection) -> bool:
+    row = conn.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'repeater_tiles'"
+    ).fetchone()
+    return row is not None
+
+
+_EMPTY = (np.empty(0, dtype=np.int64), np.empty(0), np.empty(0))
+_NO_ROWS: Dict[int, Repeater] = {}
+
+# The cache holds blocks of BLOCK_COLS tiles of one tile row (4 degrees of
+# longitude), each sorted by longitude: a lookup slices the few blocks its box
+# touches with a binary search instead of gathering dozens of single tiles.
+BLOCK_COLS = 16
+_ROW_BLOCKS = _TILE_COLS // BLOCK_COLS + 1
+
+# how often (seconds) a lookup may look for DB changes; 0 checks every time
+TILE_CACHE_CHECK_SECONDS = float(os.getenv("TILE_CACHE_CHECK_SECONDS", "1"))
+
+
+def block_of(tile: int) -> int:
+    """Key of the cache block holding `tile`."""
+    row, col = divmod(tile, _TILE_COLS)
+    return row * _ROW_BLOCKS + col // BLOCK_COLS
+
+
+def _block_tiles(block: int) -> Tuple[int, int]:
+    """First and last tile key of `block`."""
+    row, b = divmod(block, _ROW_BLOCKS)
+    first = row * _TILE_COLS + b * BLOCK_COLS
+    return first, min(first + BLOCK_COLS, (row + 1) * _TILE_COLS) - 1
+
+
+def _box_blocks(min_lat, max_lat, min_lon, max_lon) -> List[int]:
+    """Keys of every block overlapping the bounding box."""
+    r0 = int(math.floor((min_lat + 90.0) / TILE_DEG))
+    r1 = int(math.floor((max_lat + 90.0) / TILE_DEG))
+    b0 = int(math.floor((min_lon + 180.0) / TILE_DEG)) // BLOCK_COLS
+    b1 = int(math.floor((max_lon + 180.0) / TILE_DEG)) // BLOCK_COLS
+    return [r * _ROW_BLOCKS + b for r in range(r0, r1 + 1) for b in range(b0, b1 + 1)]
+
+
+class TileCache:
+    """
+    LRU of tile contents for the DB at `db_path`.  Each cached block is a
+    (rowids, lats, lons) triple of arrays sorted by longitude, plus the
+    `Repeater` objects of those rows that lookups have materialized so far.
+
+    The DB is checked for changes at most every TILE_CACHE_CHECK_SECONDS;
+    `refresh()` checks right away.
+    """
+
+    def __init__(self, db_path: str, max_blocks: int = TILE_CACHE_MAX):
+        self.db_path = db_path
+        self.max_blocks = max_blocks
+        self._blocks: "OrderedDict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]" = OrderedDict()
+        self._rows: Dict[int, Dict[int, Repeater]] = {}   # block -> rowid -> row
+        self._loaded_at: Dict[int, int] = {}   # block -> version when cached
+        self._versions: Dict[int, int] = {}    # block -> sum of its tile versions
+        self._mtime: Optional[int] = None
+        self._next_check = 0.0
+        self._lock = threading.Lock()
+
+    def refresh(self) -> None:
+        """Drop cached blocks whose tiles changed since the DB was last seen."""
+        with self._lock:
+            self._refresh(force=True)
+
+    def _refresh(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now < self._next_check:
+            return
+        self._next_check = now + TILE_CACHE_CHECK_SECONDS
+        mtime = db_mtime(self.db_path)
+        if mtime == self._mtime:
+            return
+        conn = read_conn(self.db_path).conn
+        if not has_tile_cache(conn):
+            raise RuntimeError(
+                f"{self.db_path} has no tile cache; run insert_repeaters.py --migrate")
+        # tile versions only ever grow, so a block's sum moves iff one of them did
+        versions: Dict[int, int] = {}
+        for tile, version in conn.execute("SELECT tile, version FROM repeater_tile_versions"):
+            block = block_of(tile)
+            versions[block] = versions.get(block, 0) + version
+        self._versions = versions
+        stale = [b for b, v in self._loaded_at.items() if versions.get(b, 0) != v]
+        for block in stale:
+            self._drop(block)
+        count("tiles.invalidated", len(stale))
+        self._mtime = mtime
+
+    def _drop(self, block: int) -> None:
+        del self._blocks[block], self._rows[block], self._loaded_at[block]
+
+    def _load(self, blocks: List[int]) -> None:
+        cur = read_conn(self.db_path).conn.cursor()
+        cur.row_factory = None
+        for block in blocks:
+            rows = cur.execute(
+                "SELECT id, latitude, longitude FROM repeater_tiles "
+                "WHERE tile BETWEEN ? AND ?", _block_tiles(block)).fetchall()
+            if rows:
+                arr = np.array(rows, dtype=float)
+                arr = arr[arr[:, 2].argsort(kind="stable")]
+                self._blocks[block] = (arr[:, 0].astype(np.int64),
+                                       arr[:, 1].copy(), arr[:, 2].copy())
+            else:
+                self._blocks[block] = _EMPTY
+            self._rows[block] = {}
+            self._loaded_at[block] = self._versions.get(block, 0)
+
+    def acquire(self, blocks: Iterable[int]) -> Dict[int, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Contents of `blocks` keyed by block, loading misses."""
+        blocks = list(dict.fromkeys(blocks))
+        with self._lock:
+            self._refresh()
+            cached = self._blocks
+            missing = [b for b in blocks if b not in cached]
+            count("tiles.hits", len(blocks) - len(missing))
+            count("tiles.misses", len(missing))
+            if missing:
+                with stage("tiles.load"):
+                    self._load(missing)
+            held = {}
+            for block in blocks:
+                cached.move_to_end(block)
+                held[block] = cached[block]
+            # evict only once this lookup holds its blocks, oldest first
+            while len(cached) > self.max_blocks:
+                self._drop(next(iter(cached)))
+        return held
+
+    def candidates(self, min_lat, max_lat, min_lon, max_lon, held=None):
+        """(rowids, lats, lons) inside the box, from `held` blocks if given."""
+        return self._gather(min_lat, max_lat, min_lon, max_lon, held)[:3]
+
+    def _gather(self, min_lat, max_lat, min_lon, max_lon, held=None, blocks=None):
+        """`candidates`, plus the block each one came from."""
+        if blocks is None:
+            blocks = _box_blocks(min_lat, max_lat, min_lon, max_lon)
+        if held is None:
+            held = self.acquire(blocks)
+        parts = []
+        for block in blocks:
+            rowids, lats, lons = held[block]
+            lo = lons.searchsorted(min_lon, side="left")
+            hi = lons.searchsorted(max_lon, side="right")
+            if hi > lo:
+                parts.append((rowids[lo:hi], lats[lo:hi], lons[lo:hi],
+                              np.full(hi - lo, block)))
+        if not parts:
+            return _EMPTY + (_EMPTY[0],)
+        if len(parts) == 1:
+            rowids, lats, lons, where = parts[0]
+        else:
+            rowids, lats, lons, where = (np.concatenate(col) for col in zip(*parts))
+        keep = (lats >= min_lat) & (lats <= max_lat)
+        return rowids[keep], lats[keep], lons[keep], where[keep]
+
+    def materialize(self, rowids: Sequence[int], blocks: Sequence[int]) -> List[Repeater]:
+        """
+        `Repeater` objects for `rowids` (found in `blocks`), reusing those
+        cached with their block and fetching the rest in one go.
+        """
+        with self._lock:
+            found = [self._rows.get(b, _NO_ROWS).get(r) for r, b in zip(rowids, blocks)]
+            missing = [r for r, rpt in zip(rowids, found) if rpt is None]
+            count("tiles.row_hits", len(found) - len(missing))
+            if missing:
+                fetched = fetch_repeaters(read_conn(self.db_path).conn, missing)
+                for i, (rid, block) in enumerate(zip(rowids, blocks)):
+                    if found[i] is None:
+                        found[i] = fetched[rid]
+                        rows = self._rows.get(block)
+                        if rows is not None:      # block still cached
+                            rows[rid] = found[i]
+        return found
+
+    # ─── queries ──────────────────────────────────────────────────────────────
+    def ids_within_range(
+        self,
+        center: Tuple[float, float],
+        radius_miles: float
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        rowids, dist, _ = self._within_range(center, radius_miles)
+        return rowids, dist
+
+    def _within_range(self, center, radius_miles):
+        lat, lon = center
+        lat_delta = radius_miles / 69.0
+        lon_delta = radius_miles / (abs(math.cos(math.radians(lat))) * 69.0)
+        count("lookup.queries")
+        with stage("lookup.bbox"):
+            rowids, lats, lons, where = self._gather(lat - lat_delta, lat + lat_delta,
+                                                     lon - lon_delta, lon + lon_delta)
+        count("lookup.candidates", len(rowids))
+        with stage("lookup.distance"):
+            dist = haversine_many(center, lats, lons)
+            keep = dist <= radius_miles
+        count("lookup.survivors", int(keep.sum()))
+        return rowids[keep], dist[keep], where[keep]
+
+    def within_range(self, center, radius_miles) -> List[Repeater]:
+        rowids, _, where = self._within_range(center, radius_miles)
+        with stage("lookup.materialize"):
+            return self.materialize(rowids.tolist(), where.tolist())
+
+    def along_route(
+        self,
+        path: Sequence[Tuple[float, float]],
+        buffer_miles: float
+    ) -> List[CorridorHit]:
+        lats, lons, cum = route_arrays(path)
+
+        best = {}   # rowid -> (distance, route_mile)
+        count("lookup.queries")
+        bbox, distance = stage("lookup.bbox"), stage("lookup.distance")
+        boxes = [(chunk, box, _box_blocks(*box))
+                 for chunk, *box in corridor_boxes(lats, lons, buffer_miles)]
+        with bbox:
+            held = self.acquire(b for _, _, blocks in boxes for b in blocks)
+        block_of_row = {}
+        for chunk, box, blocks in boxes:
+            with bbox:
+                rids, clats, clons, where = self._gather(*box, held=held, blocks=blocks)
+            count("lookup.candidates", len(rids))
+            if not len(rids):
+                continue
+            with distance:
+                start, stop = chunk_span(chunk, lats)
+                dmin, mile = nearest_on_path(
+                    clats, clons, lats[start:stop], lons[start:stop], cum[start:stop])
+                rids = rids.tolist()
+                for rid, d, m in zip(rids, dmin.tolist(), mile.tolist()):
+                    if d <= buffer_miles and (rid not in best or d < best[rid][0]):
+                        best[rid] = (d, m)
+                block_of_row.update(zip(rids, where.tolist()))
+        count("lookup.survivors", len(best))
+
+        order = sorted(best, key=lambda rid: (best[rid][1], best[rid][0], rid))
+        with stage("lookup.materialize"):
+            reps = self.materialize(order, [block_of_row[rid] for rid in order])
+        return [CorridorHit(rpt, *best[rid]) for rid, rpt in zip(order, reps)]
+
+    def stats(self) -> dict:
+        with self._lock:
+            rows = sum(len(b[0]) for b in self._blocks.values())
+            return {"blocks": len(self._blocks), "max_blocks": self.max_blocks,
+                    "rows": rows}
+
+
+_caches: Dict[str, TileCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_tile_cache(db_path: Optional[str] = None) -> TileCache:
+    """Shared TileCache for `db_path` (default: db.DB_PATH)."""
+    if db_path is None:
+        from . import db
+        db_path = db.DB_PATH
+    key = os.path.abspath(db_path)
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = TileCache(db_path)
+        return cache
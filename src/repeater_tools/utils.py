@@ -2,6 +2,8 @@
 import math
 from typing import Tuple
 
+import numpy as np
+
 def haversine(a: Tuple[float, float], b: Tuple[float, float]) -> float:
     """
     Return distance in miles between two (lat, lon) points.
@@ -20,3 +22,108 @@ def interpolate(p1, p2, frac):
         p1[1] + (p2[1] - p1[1]) * frac,
     )
 
+
+# -----------------------------------------------------------------------------
+# Vectorized kernels (NumPy)
+# -----------------------------------------------------------------------------
+EARTH_RADIUS_MI = 3959.0
+MILES_PER_DEG   = EARTH_RADIUS_MI * math.pi / 180.0
+
+def haversine_many(center: Tuple[float, float], lats, lons):
+    """
+    Return distances in miles from `center=(lat, lon)` to each point of the
+    parallel `lats` / `lons` arrays.  Vectorized `haversine`.
+    """
+    lat1, lon1 = map(math.radians, center)
+    lat2 = np.radians(np.asarray(lats, float))
+    lon2 = np.radians(np.asarray(lons, float))
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    h = np.sin(dlat/2)**2 + math.cos(lat1)*np.cos(lat2)*np.sin(dlon/2)**2
+    return EARTH_RADIUS_MI * 2 * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+def haversine_path(lats, lons):
+    """
+    Return the n-1 great-circle distances in miles between consecutive points
+    of a path given as parallel `lats` / `lons` arrays.
+    """
+    lat = np.radians(np.asarray(lats, float))
+    lon = np.radians(np.asarray(lons, float))
+    dlat = np.diff(lat)
+    dlon = np.diff(lon)
+    h = np.sin(dlat/2)**2 + np.cos(lat[:-1])*np.cos(lat[1:])*np.sin(dlon/2)**2
+    return EARTH_RADIUS_MI * 2 * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+def point_segment_distance(plat, plon, alat, alon, blat, blon):
+    """
+    Distance in miles from points P to segments A→B, plus the fraction [0..1]
+    along each segment of the closest approach.  All arguments broadcast
+    against each other, e.g. points shaped (n, 1) and segments shaped (1, m)
+    give (n, m) results.
+
+    Uses a local equirectangular projection centred on each segment, which is
+    accurate for the short segments of a decoded route polyline.
+    """
+    plat, plon = np.asarray(plat, float), np.asarray(plon, float)
+    alat, alon = np.asarray(alat, float), np.asarray(alon, float)
+    blat, blon = np.asarray(blat, float), np.asarray(blon, float)
+
+    kx = np.cos(np.radians((alat + blat) / 2)) * MILES_PER_DEG
+    ky = MILES_PER_DEG
+    dx, dy = (blon - alon) * kx, (blat - alat) * ky
+    px, py = (plon - alon) * kx, (plat - alat) * ky
+
+    seg_len2 = dx * dx + dy * dy
+    with np.errstate(invalid="ignore", divide="ignore"):
+        frac = np.where(seg_len2 > 0, (px * dx + py * dy) / seg_len2, 0.0)
+    frac = np.clip(frac, 0.0, 1.0)
+    return np.hypot(px - frac * dx, py - frac * dy), frac
+
+def nearest_on_path(plats, plons, lats, lons, cum):
+    """
+    For each point of `plats` / `plons`, return (distance, mile): the miles to
+    the nearest segment of the path `lats` / `lons` and the route mileage of
+    that closest approach, given the cumulative miles `cum` at each vertex.
+    """
+    plat = np.asarray(plats, float)[:, None]
+    plon = np.asarray(plons, float)[:, None]
+    dist, frac = point_segment_distance(
+        plat, plon, lats[:-1], lons[:-1], lats[1:], lons[1:])
+    seg = dist.argmin(axis=1)
+    idx = np.arange(len(seg))
+    mile = cum[seg] + frac[idx, seg] * (cum[seg + 1] - cum[seg])
+    return dist[idx, seg], mile
+
+def simplify_polyline(lats, lons, tolerance: float):
+    """
+    Douglas–Peucker simplification of the path `lats` / `lons`: return the
+    indices of the vertices to keep so that every dropped vertex lies within
+    `tolerance` miles of the simplified path.  The first and last vertex are
+    always kept.
+
+    Iterative (no recursion limit on long routes); the farthest vertex of each
+    span comes from one vectorized `point_segment_distance` pass.  Spans long
+    enough for the local projection to be inexact are far above any sensible
+    tolerance anyway, so they are split regardless.
+    """
+    lats = np.asarray(lats, float)
+    lons = np.asarray(lons, float)
+    n = len(lats)
+    if n < 3:
+        return np.arange(n)
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        dist, _ = point_segment_distance(lats[a + 1:b], lons[a + 1:b],
+                                         lats[a], lons[a], lats[b], lons[b])
+        k = int(dist.argmax())
+        if dist[k] > tolerance:
+            mid = a + 1 + k
+            keep[mid] = True
+            stack.append((a, mid))
+            stack.append((mid, b))
+    return np.flatnonzero(keep)
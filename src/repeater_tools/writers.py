@@ -0,0 +1,243 @@
+# repeater_tools/writers.py
+"""
+Streaming channel writers with pluggable radio profiles.
+
+A profile bundles a header and a row formatter.  Everything that does not
+depend on the individual repeater (column defaults, tone/duplex lookup
+tables, number formats) is resolved once when the profile is built, so the
+per-row work is a couple of dict lookups and string formats.  Rows are
+written as the input iterator yields them, to a path, an open text stream
+(sys.stdout, io.StringIO, an HTTP response body) or as an iterator of text
+chunks.
+
+Profiles:
+    chirp   CHIRP generic CSV (12 columns), as written by CSVWriter
+    uvk5    CHIRP CSV in the 21-column layout of a Quansheng UV-K5 export
+    ndjson  one compact JSON object per line
+"""
+import csv
+import io
+import json
+import sys
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Union
+
+from models.repeater import Repeater
+from .instrument import count, timed
+
+
+class Profile(NamedTuple):
+    name:      str
+    kind:      str                          # 'csv' or 'ndjson'
+    header:    Optional[List[str]]
+    format:    Callable[[int, Repeater], Union[list, dict]]   # (1-based index, rpt)
+    extension: str
+
+
+# ─── CHIRP generic ─────────────────────────────────────────────────────────────
+def _chirp_profile() -> Profile:
+    header = [
+        "Location",    # typically the callsign
+        "Name",        # your description field
+        "Frequency",   # output freq in MHz
+        "Duplex",      # "+", "-", or "OFF"
+        "Offset",      # offset in MHz
+        "Tone",        # "Tone" or "DCS" or blank
+        "rToneFreq",   # CTCSS (Rx) in Hz
+        "cToneFreq",   # DCS (Tx) code
+        "Mode",        # "FM"
+        "TStep",       # channel step, e.g. 0.005
+        "Skip",        # "OFF"
+        "Comment",     # free‐form
+    ]
+    duplex = {"plus": "+", "minus": "-"}
+    # tone_mode -> (Tone, rToneFreq, cToneFreq) builder
+    tones: Dict[Optional[str], Callable[[float], tuple]] = {
+        "CTCSS": lambda t: ("Tone", f"{t:.1f}", ""),
+        "DCS":   lambda t: ("DCS", "", str(int(t))),   # CHIRP expects integer DCS code
+    }
+    no_tone = ("", "", "")
+
+    def fmt(_index: int, rpt: Repeater) -> list:
+        if not rpt.offset:
+            dup, offset = "OFF", ""
+        else:
+            dup, offset = duplex.get(rpt.offset_dir, "-"), f"{rpt.offset:.6f}"
+        tone = tones.get(rpt.tone_mode)
+        tone_cols = tone(rpt.tone) if tone and rpt.tone is not None else no_tone
+        comment = f"{rpt.callsign or ''} {rpt.city or ''}, {rpt.state or ''}".strip()
+        return [
+            rpt.callsign or "",
+            rpt.notes or "",
+            f"{rpt.frequency:.6f}",
+            dup,
+            offset,
+            *tone_cols,
+            "FM",
+            "0.005",
+            "OFF",
+            comment,
+        ]
+
+    return Profile("chirp", "csv", header, fmt, ".csv")
+
+
+# ─── Quansheng UV-K5 (CHIRP export layout) ─────────────────────────────────────
+UVK5_NAME_LEN = 10
+
+def _uvk5_profile() -> Profile:
+    header = [
+        "Location", "Name", "Frequency", "Duplex", "Offset", "Tone",
+        "rToneFreq", "cToneFreq", "DtcsCode", "DtcsPolarity", "RxDtcsCode",
+        "CrossMode", "Mode", "TStep", "Skip", "Power", "Comment",
+        "URCALL", "RPT1CALL", "RPT2CALL", "DVCODE",
+    ]
+    duplex = {"plus": "+", "minus": "-"}
+    default_tone, default_dtcs = "88.5", "023"
+    # tone_mode -> (Tone, rToneFreq, cToneFreq, DtcsCode, RxDtcsCode) builder
+    tones: Dict[Optional[str], Callable[[float], tuple]] = {
+        "CTCSS": lambda t: ("Tone", f"{t:.1f}", default_tone, default_dtcs, default_dtcs),
+        "DCS":   lambda t: ("DTCS", default_tone, default_tone,
+                            f"{int(t):03d}", f"{int(t):03d}"),
+    }
+    no_tone = ("", default_tone, default_tone, default_dtcs, default_dtcs)
+
+    def fmt(index: int, rpt: Repeater) -> list:
+        if not rpt.offset:
+            dup, offset = "", "0.000000"
+        else:
+            dup, offset = duplex.get(rpt.offset_dir, "-"), f"{rpt.offset:.6f}"
+        tone = tones.get(rpt.tone_mode)
+        t_mode, r_tone, c_tone, dtcs, rx_dtcs = (
+            tone(rpt.tone) if tone and rpt.tone is not None else no_tone)
+        comment = f"{rpt.city or ''}, {rpt.state or ''}".strip(", ")
+        return [
+            index,
+            (rpt.callsign or "")[:UVK5_NAME_LEN],
+            f"{rpt.frequency:.6f}",
+            dup,
+            offset,
+            t_mode, r_tone, c_tone,
+            dtcs, "NN", rx_dtcs,
+            "Tone->Tone",
+            "FM",
+            "5.00",
+            "",            # Skip
+            "5.0W",
+            comment,
+            "", "", "", "",   # D-STAR fields
+        ]
+
+    return Profile("uvk5", "csv", header, fmt, ".csv")
+
+
+# ─── NDJSON ────────────────────────────────────────────────────────────────────
+def _ndjson_profile() -> Profile:
+    def fmt(_index: int, rpt: Repeater) -> dict:
+        return {
+            "callsign":  rpt.callsign,
+            "freq":      rpt.frequency,
+            "offset":    None if rpt.offset is None else round(rpt.offset, 6),
+            "dir":       rpt.offset_dir,
+            "tone_mode": rpt.tone_mode,
+            "tone":      rpt.tone,
+            "lat":       rpt.latitude,
+            "lon":       rpt.longitude,
+            "city":      rpt.city,
+            "state":     rpt.state,
+            "status":    rpt.status,
+            "id":        [rpt.state_id, rpt.rptr_id],
+        }
+
+    return Profile("ndjson", "ndjson", None, fmt, ".ndjson")
+
+
+PROFILES: Dict[str, Profile] = {
+    p.name: p for p in (_chirp_profile(), _uvk5_profile(), _ndjson_profile())
+}
+
+
+def get_profile(name: str) -> Profile:
+    try:
+        return PROFILES[name]
+    except KeyError:
+        raise ValueError(
+            f"Unknown radio profile {name!r} (choose from {', '.join(PROFILES)})"
+        ) from None
+
+
+# ─── writing ───────────────────────────────────────────────────────────────────
+def _write_stream(
+    repeaters: Iterable[Repeater],
+    profile: Profile,
+    f: TextIO,
+    start: int = 1,
+    header: bool = True,
+) -> int:
+    fmt = profile.format
+    count = start - 1
+    if profile.kind == "csv":
+        writerow = csv.writer(f).writerow
+        if header:
+            writerow(profile.header)
+        for count, rpt in enumerate(repeaters, start):
+            writerow(fmt(count, rpt))
+    else:
+        dumps = json.JSONEncoder(separators=(",", ":")).encode
+        write = f.write
+        for count, rpt in enumerate(repeaters, start):
+            write(dumps(fmt(count, rpt)))
+            write("\n")
+    return count - start + 1
+
+
+@timed("output.write")
+def write_channels(
+    repeaters: Iterable[Repeater],
+    profile: Union[str, Profile] = "chirp",
+    out: Union[str, TextIO, None] = None,
+) -> int:
+    """
+    Write `repeaters` with `profile` to `out`: a filename, '-' or None for
+    stdout, or any open text stream.  Returns the number of channels written.
+    """
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    if out is None or out == "-":
+        written = _write_stream(repeaters, profile, sys.stdout)
+    elif isinstance(out, str):
+        with open(out, "w", newline="") as f:
+            written = _write_stream(repeaters, profile, f)
+    else:
+        written = _write_stream(repeaters, profile, out)
+    count("output.rows", written)
+    return written
+
+
+def iter_channels(
+    repeaters: Iterable[Repeater],
+    profile: Union[str, Profile] = "chirp",
+    chunk_rows: int = 256,
+) -> Iterator[str]:
+    """
+    Yield the rendered output as text chunks of up to `chunk_rows` rows, for
+    streaming HTTP responses without buffering the whole document.
+    """
+    if isinstance(profile, str):
+        profile = get_profile(profile)
+    it = iter(repeaters)
+    buf = io.StringIO()
+    written, header = 0, True
+    while True:
+        batch = list(islice(it, chunk_rows))
+        if not batch and not header:
+            return
+        written += _write_stream(batch, profile, buf, written + 1, header)
+        header = False
+        chunk = buf.getvalue()
+        if chunk:
+            yield chunk
+        if len(batch) < chunk_rows:
+            return
+        buf.seek(0)
+        buf.truncate()
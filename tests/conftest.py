@@ -0,0 +1,59 @@
+# tests/conftest.py
+import os
+import shutil
+import sqlite3
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# same bootstrap as the entry scripts: src/ packages plus the top-level modules
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "src"))
+
+SHIPPED_DB = os.path.join(ROOT, "repeater_route.sqlite")
+
+# a short drive through the Dallas-Fort Worth area, "lat, lon" per line
+DFW_TRACK = [(32.78, -96.80), (32.80, -96.95), (32.76, -97.10), (32.75, -97.33)]
+
+
+@pytest.fixture
+def plain_db(tmp_path, monkeypatch):
+    """A copy of the shipped (un-migrated: no caps, no R*Tree) DB, made active."""
+    from repeater_tools import db
+    path = str(tmp_path / "plain.sqlite")
+    shutil.copy(SHIPPED_DB, path)
+    monkeypatch.setattr(db, "DB_PATH", path)
+    return path
+
+
+@pytest.fixture
+def migrated_db(tmp_path, monkeypatch):
+    """A copy of the shipped DB with the caps column and R*Tree, made active."""
+    from repeater_tools import db
+    path = str(tmp_path / "migrated.sqlite")
+    shutil.copy(SHIPPED_DB, path)
+    conn = sqlite3.connect(path)
+    db.ensure_spatial_index(conn)
+    conn.close()
+    monkeypatch.setattr(db, "DB_PATH", path)
+    return path
+
+
+@pytest.fixture
+def track_file(tmp_path):
+    """DFW_TRACK as a track file, for FileDirections."""
+    path = tmp_path / "track.txt"
+    path.write_text("".join(f"{lat}, {lon}\n" for lat, lon in DFW_TRACK))
+    return str(path)
+
+
+@pytest.fixture
+def file_directions(track_file):
+    """Route every origin/destination along DFW_TRACK."""
+    from repeater_tools import directions
+    previous = directions._provider
+    directions.set_provider(track_file)
+    yield track_file
+    directions._provider = previous
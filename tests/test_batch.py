@@ -0,0 +1,81 @@
+# tests/test_batch.py
+"""Batch mode: route file parsing, per-route failures and lookup options."""
+import csv
+import os
+
+import pytest
+
+from repeater_tools.batch import RouteSpec, read_routes, run_batch
+
+
+LINES = [
+    "# routes for the weekend\n",
+    "Dallas, TX | Fort Worth, TX\n",
+    "\n",
+    "just some words\n",
+    "https://www.google.com/maps/dir/Austin,+TX/Waco,+TX/\n",
+    "https://www.google.com/maps/@32.7,-97.1,12z\n",
+]
+
+
+def test_read_routes_keeps_bad_lines_as_errors():
+    specs = read_routes(LINES)
+    assert [spec.error is None for spec in specs] == [True, False, True, False]
+    assert specs[0] == RouteSpec("001_Dallas_TX__Fort_Worth_TX", "Dallas, TX", "Fort Worth, TX")
+    assert specs[1].name == "002_line4"
+    assert specs[1].error.startswith("line 4: Cannot parse route line")
+    assert specs[2][:3] == ("003_Austin_TX__Waco_TX", "Austin, TX", "Waco, TX")
+    assert specs[3].error.startswith("line 6: ")
+
+
+def test_run_batch_reports_bad_lines_and_continues(plain_db, file_directions, tmp_path):
+    out = str(tmp_path / "out")
+    rows = run_batch(read_routes(LINES), 5.0, out, jobs=1)
+    assert [bool(row.get("error")) for row in rows] == [False, True, False, True]
+    assert rows[0]["repeaters"] > 0
+    assert os.path.exists(rows[0]["output"])
+
+    with open(os.path.join(out, "summary.csv"), newline="") as f:
+        summary = list(csv.DictReader(f))
+    assert [row["route"] for row in summary] == [row["route"] for row in rows]
+    assert summary[1]["error"].startswith("line 4: ")
+    assert summary[1]["origin"] == "just some words"
+    assert summary[0]["error"] == ""
+
+
+URL = "https://www.google.com/maps/dir/Dallas,+TX/Fort+Worth,+TX/"
+
+
+def lookup_cli(monkeypatch, *argv):
+    import repeater_lookup
+    monkeypatch.setattr("sys.argv", ["repeater_lookup.py", *argv])
+    repeater_lookup.main()
+
+
+@pytest.mark.parametrize("flags", [
+    [],
+    ["-n", "3"],
+    ["-n", "4", "--dup-window", "0"],
+    ["--sampled", "-i", "3"],
+    ["--sampled", "-i", "3", "-n", "2"],
+    ["--adaptive", "--overlap", "0.1"],
+    ["--adaptive", "-n", "2"],
+])
+def test_batch_honours_lookup_flags(plain_db, file_directions, tmp_path, monkeypatch, flags):
+    # the route store (route_cache.sqlite) defaults to the working directory
+    monkeypatch.chdir(tmp_path)
+    # same flags, same route: the batch file must match the single-route output
+    common = ["--directions", file_directions, "-r", "6", *flags]
+    single = tmp_path / "single.csv"
+    lookup_cli(monkeypatch, "-u", URL, "-o", str(single), *common)
+
+    routes = tmp_path / "routes.txt"
+    routes.write_text(URL + "\n")
+    out = tmp_path / "out"
+    lookup_cli(monkeypatch, "--batch", str(routes), "--output-dir", str(out), "-j", "1", *common)
+
+    [row] = csv.DictReader(open(out / "summary.csv", newline=""))
+    assert not row["error"]
+    assert open(row["output"]).read() == single.read_text()
+    if "-n" in flags:
+        assert int(row["repeaters"]) <= int(flags[flags.index("-n") + 1])
@@ -0,0 +1,185 @@
+# tests/test_db.py
+"""SQLite lookups through the R*Tree against the plain table scan, the
+in-memory index and a brute-force scan."""
+import sqlite3
+
+import numpy as np
+import pytest
+
+from conftest import DFW_TRACK
+from repeater_tools import db
+from repeater_tools.spatial_index import RepeaterIndex
+from repeater_tools.utils import haversine, haversine_many
+
+CENTRES = [(32.78, -96.80), (29.76, -95.37), (40.71, -74.01), (47.61, -122.33)]
+
+
+def keys(reps):
+    return sorted((r.callsign, r.frequency, r.latitude, r.longitude) for r in reps)
+
+
+def test_migration_indexes_every_located_repeater(migrated_db):
+    conn = sqlite3.connect(migrated_db)
+    located = conn.execute("SELECT rowid FROM repeaters WHERE latitude IS NOT NULL "
+                           "AND longitude IS NOT NULL ORDER BY rowid").fetchall()
+    assert conn.execute("SELECT id FROM repeaters_rtree ORDER BY id").fetchall() == located
+    assert db.ensure_spatial_index(conn) == 0
+    conn.close()
+
+
+@pytest.mark.parametrize("radius", [2.0, 10.0, 50.0])
+def test_within_range_matches_table_scan(plain_db, radius):
+    scanned = {c: keys(db.get_repeaters_within_range(c, radius)) for c in CENTRES}
+    assert any(scanned.values())
+    conn = sqlite3.connect(plain_db)
+    db.ensure_spatial_index(conn)
+    conn.close()
+    for centre in CENTRES:
+        assert keys(db.get_repeaters_within_range(centre, radius)) == scanned[centre]
+
+
+def test_ids_materialize_to_the_same_repeaters(migrated_db, monkeypatch):
+    ids, dists = db.get_repeater_ids_within_range(CENTRES[0], 50.0)
+    assert ids.dtype == np.int64 and len(ids) > 10
+    reps = db.load_repeaters(ids.tolist())
+    assert keys(reps) == keys(db.get_repeaters_within_range(CENTRES[0], 50.0))
+    np.testing.assert_allclose(
+        dists, [haversine(CENTRES[0], (r.latitude, r.longitude)) for r in reps])
+
+    # order is preserved across materialize batches
+    monkeypatch.setattr(db, "MATERIALIZE_BATCH", 3)
+    order = ids[::-1].tolist()
+    conn = sqlite3.connect(migrated_db)
+    expected = [conn.execute("SELECT callsign, latitude FROM repeaters WHERE rowid = ?",
+                             (rid,)).fetchone() for rid in order]
+    conn.close()
+    assert [(r.callsign, r.latitude) for r in db.load_repeaters(order)] == expected
+    assert [(r.callsign, r.latitude) for r in db.iter_repeaters(iter(order))] == expected
+    assert db.load_repeaters([]) == []
+
+
+def test_repeater_carries_its_primary_key(migrated_db):
+    conn = sqlite3.connect(migrated_db)
+    rowid, state_id, rptr_id = conn.execute(
+        "SELECT rowid, state_id, rptr_id FROM repeaters LIMIT 1").fetchone()
+    conn.close()
+    rpt, = db.load_repeaters([rowid])
+    assert (rpt.state_id, rpt.rptr_id) == (state_id, rptr_id)
+
+
+def test_repeater_has_no_instance_dict(migrated_db):
+    rpt = db.get_repeaters_within_range(CENTRES[0], 10.0)[0]
+    assert not hasattr(rpt, "__dict__")
+
+
+def test_triggers_keep_index_current(migrated_db):
+    conn = sqlite3.connect(migrated_db)
+    conn.execute("INSERT INTO repeaters (state_id, rptr_id, latitude, longitude) "
+                 "VALUES ('99', 1, 10.0, 20.0)")
+    rowid = conn.execute("SELECT rowid FROM repeaters WHERE state_id = '99'").fetchone()[0]
+
+    def entry():
+        return conn.execute("SELECT min_lat, min_lon FROM repeaters_rtree WHERE id = ?",
+                            (rowid,)).fetchone()
+
+    assert entry() == pytest.approx((10.0, 20.0))
+    conn.execute("UPDATE repeaters SET latitude = 11.5 WHERE rowid = ?", (rowid,))
+    assert entry() == pytest.approx((11.5, 20.0))
+    conn.execute("UPDATE repeaters SET latitude = NULL WHERE rowid = ?", (rowid,))
+    assert entry() is None
+    conn.execute("UPDATE repeaters SET latitude = 12.0 WHERE rowid = ?", (rowid,))
+    conn.execute("DELETE FROM repeaters WHERE rowid = ?", (rowid,))
+    assert entry() is None
+    conn.close()
+
+
+def dense_distances(path, step=0.02):
+    """Miles from every FM repeater to `path`, sampled every ~`step` miles."""
+    dense = []
+    for (lat0, lon0), (lat1, lon1) in zip(path, path[1:]):
+        n = int(haversine((lat0, lon0), (lat1, lon1)) / step) + 1
+        t = np.linspace(0.0, 1.0, n + 1)[:, None]
+        dense.append((1 - t) * [lat0, lon0] + t * [lat1, lon1])
+    dense = np.radians(np.vstack(dense))
+    conn = sqlite3.connect(db.DB_PATH)
+    rows = conn.execute("SELECT callsign, frequency, latitude, longitude FROM repeaters "
+                        "WHERE fm_analog = 'Yes' AND latitude IS NOT NULL").fetchall()
+    conn.close()
+    pos = np.radians([(r[2], r[3]) for r in rows])
+    dlat = dense[None, :, 0] - pos[:, None, 0]
+    dlon = dense[None, :, 1] - pos[:, None, 1]
+    h = (np.sin(dlat / 2) ** 2
+         + np.cos(pos[:, None, 0]) * np.cos(dense[None, :, 0]) * np.sin(dlon / 2) ** 2)
+    return dict(zip(rows, (2 * 3959.0 * np.arcsin(np.sqrt(h))).min(axis=1)))
+
+
+@pytest.mark.parametrize("fixture", ["plain_db", "migrated_db"])
+def test_along_route_matches_dense_sweep(request, fixture):
+    request.getfixturevalue(fixture)
+    brute = dense_distances(DFW_TRACK)
+    for buffer in (2.0, 7.5, 20.0):
+        hits = db.get_repeaters_along_route(DFW_TRACK, buffer)
+        found = {(h.repeater.callsign, h.repeater.frequency,
+                  h.repeater.latitude, h.repeater.longitude): h for h in hits}
+        assert len(found) == len(hits) > 0
+        assert [h.route_mile for h in hits] == sorted(h.route_mile for h in hits)
+        for key, d in brute.items():
+            if d <= buffer - 0.05:
+                assert key in found
+            if key in found:
+                assert found[key].distance == pytest.approx(d, abs=0.05)
+                assert d <= buffer + 0.05
+
+
+def fm_rows(path):
+    conn = sqlite3.connect(path)
+    rows = conn.execute("SELECT rowid, latitude, longitude FROM repeaters "
+                        "WHERE fm_analog = 'Yes' AND latitude IS NOT NULL").fetchall()
+    conn.close()
+    return np.array(rows, dtype=float)
+
+
+def variant(request, name):
+    """A DB without the R*Tree, with it, or with it but no FM partial index."""
+    if name != "no_fm_index":
+        return request.getfixturevalue(name)
+    path = request.getfixturevalue("migrated_db")
+    conn = sqlite3.connect(path)
+    conn.execute("DROP INDEX repeaters_fm_analog")
+    conn.close()
+    return path
+
+
+VARIANTS = ["plain_db", "migrated_db", "no_fm_index"]
+
+
+@pytest.mark.parametrize("fixture", VARIANTS)
+def test_ids_within_range_exact_at_boundary_radii(request, fixture):
+    path = variant(request, fixture)
+    index = RepeaterIndex(path, use_snapshot=False)
+    rows = fm_rows(path)
+    rng = np.random.default_rng(23)
+    for k in rng.choice(len(rows), 150, replace=False):
+        center = (rows[k, 1] + rng.normal(0, 0.2), rows[k, 2] + rng.normal(0, 0.2))
+        dist = haversine_many(center, rows[:, 1], rows[:, 2])
+        # radii exactly at (and a hair either side of) a repeater's distance
+        boundary = float(np.sort(dist)[rng.integers(1, 40)])
+        for radius in (boundary, np.nextafter(boundary, 0), np.nextafter(boundary, 99)):
+            ids, dists = db.get_repeater_ids_within_range(center, radius)
+            want_ids, want_dists = index.ids_within_range(center, radius)
+            order, want_order = np.argsort(ids), np.argsort(want_ids)
+            assert ids[order].tolist() == want_ids[want_order].tolist()
+            assert dists[order].tolist() == want_dists[want_order].tolist()
+            assert set(ids.tolist()) == set(rows[dist <= radius, 0].astype(int).tolist())
+
+
+@pytest.mark.parametrize("fixture", VARIANTS)
+def test_along_route_matches_memory_index(request, fixture):
+    path = variant(request, fixture)
+    index = RepeaterIndex(path, use_snapshot=False)
+    for buffer in (2.0, 7.5, 20.0):
+        got = db.get_repeaters_along_route(DFW_TRACK, buffer)
+        want = index.along_route(DFW_TRACK, buffer)
+        assert [(h.repeater.rptr_id, h.distance, h.route_mile) for h in got] == \
+               [(h.repeater.rptr_id, h.distance, h.route_mile) for h in want]
+        assert got
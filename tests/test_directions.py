@@ -0,0 +1,77 @@
+# tests/test_directions.py
+"""Directions providers: track files, the HTTP stub and provider specs."""
+import json
+
+import numpy as np
+import polyline
+import pytest
+
+from conftest import DFW_TRACK
+from repeater_tools.directions import (
+    DirectionsError, FileDirections, HTTPDirections, NoRouteError,
+    StubDirectionsServer, provider_from_spec, read_track,
+)
+
+
+def write(tmp_path, name, text):
+    path = tmp_path / name
+    path.write_text(text)
+    return str(path)
+
+
+GPX = ('<gpx xmlns="http://www.topografix.com/GPX/1/1"><trk><trkseg>'
+       + "".join(f'<trkpt lat="{lat}" lon="{lon}"/>' for lat, lon in DFW_TRACK)
+       + "</trkseg></trk></gpx>")
+GEOJSON = json.dumps({"type": "Feature", "geometry": {
+    "type": "LineString", "coordinates": [[lon, lat] for lat, lon in DFW_TRACK]}})
+
+
+@pytest.mark.parametrize("name, text", [
+    ("t.gpx", GPX),
+    ("t.geojson", GEOJSON),
+    ("t.polyline", polyline.encode(DFW_TRACK) + "\n"),
+    ("t.txt", "# sampled route\n  # indented comment\n"
+              + "".join(f"{lat}, {lon}\n" for lat, lon in DFW_TRACK)),
+    ("t.txt", "\n".join(f"{lat} {lon}" for lat, lon in DFW_TRACK)),
+])
+def test_read_track_formats(tmp_path, name, text):
+    np.testing.assert_allclose(read_track(write(tmp_path, name, text)), DFW_TRACK)
+
+
+@pytest.mark.parametrize("text", [
+    # a saved repeater_route.py report, headers and all
+    "Origin:      Dallas, TX\nDestination: Fort Worth, TX\n\n32.780000, -96.800000\n",
+    "just some words",
+    polyline.encode([(32.0, -97.0), (120.0, -97.0)]),   # latitude beyond 90
+    "_p~iF~ps|U_",                                      # cut off mid-value
+])
+def test_read_track_rejects_text_that_is_no_track(tmp_path, text):
+    with pytest.raises(DirectionsError):
+        read_track(write(tmp_path, "t.txt", text))
+
+
+def test_empty_track_is_no_route(tmp_path):
+    with pytest.raises(NoRouteError):
+        read_track(write(tmp_path, "t.txt", "# nothing here\n\n"))
+
+
+def test_directory_of_tracks(tmp_path):
+    write(tmp_path, "dallas_tx__fort_worth_tx.geojson", GEOJSON)
+    provider = provider_from_spec(f"file:{tmp_path}")
+    assert isinstance(provider, FileDirections)
+    np.testing.assert_allclose(provider.route("Dallas, TX", "Fort Worth, TX"), DFW_TRACK)
+    with pytest.raises(NoRouteError):
+        provider.route("Austin, TX", "Waco, TX")
+
+
+def test_http_provider_against_the_stub(track_file):
+    with StubDirectionsServer(FileDirections(track_file)) as stub:
+        provider = provider_from_spec(stub.url)
+        assert isinstance(provider, HTTPDirections)
+        np.testing.assert_allclose(provider.route("a", "b"), DFW_TRACK, atol=1e-5)
+        assert stub.requests == 1
+
+
+def test_unknown_spec():
+    with pytest.raises(DirectionsError):
+        provider_from_spec("/no/such/track.gpx")
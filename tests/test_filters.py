@@ -0,0 +1,80 @@
+# tests/test_filters.py
+"""Mode/band/status/access filters on migrated and un-migrated DBs."""
+import shutil
+import sqlite3
+
+import pytest
+
+from conftest import DFW_TRACK, SHIPPED_DB
+from repeater_tools import db
+from repeater_tools.filters import CAPS_COLUMNS, capabilities, parse_filter
+from repeater_tools.utils import haversine_many
+
+FILTERS = [
+    parse_filter("dmr"),
+    parse_filter("fm", "2m,70cm", "on-air", "open"),
+    parse_filter("any", "70cm"),
+    parse_filter("dstar,fusion", None, "off-air"),
+    parse_filter("any", None, None, "closed,private", "440-"),
+    parse_filter("fm", None, None, None, "-146"),
+]
+
+
+def expected(path, filt, center, radius):
+    """Brute force: every row's capabilities, tested in Python."""
+    conn = sqlite3.connect(path)
+    rows = conn.execute(f"SELECT rowid, latitude, longitude, {', '.join(CAPS_COLUMNS)} "
+                        "FROM repeaters WHERE latitude IS NOT NULL").fetchall()
+    conn.close()
+    keep = set()
+    for rowid, lat, lon, *values in rows:
+        caps = capabilities(*values)
+        freq = values[0]
+        if all(caps & mask for mask in (filt.modes, filt.bands, filt.status, filt.access)
+               if mask) \
+                and (filt.min_mhz is None or (freq is not None and freq >= filt.min_mhz)) \
+                and (filt.max_mhz is None or (freq is not None and freq <= filt.max_mhz)) \
+                and haversine_many(center, [lat], [lon])[0] <= radius:
+            keep.add(rowid)
+    return keep
+
+
+@pytest.mark.parametrize("fixture", ["plain_db", "migrated_db"])
+@pytest.mark.parametrize("filt", FILTERS)
+def test_filtered_radius_lookup(request, fixture, filt):
+    path = request.getfixturevalue(fixture)
+    for center, radius in [((32.78, -96.80), 40.0), ((34.05, -118.25), 60.0),
+                           ((40.71, -74.01), 30.0)]:
+        want = expected(path, filt, center, radius)
+        ids, _ = db.get_repeater_ids_within_range(center, radius, filt)
+        assert set(ids.tolist()) == want
+        reps = db.get_repeaters_within_range(center, radius, filt)
+        assert len(reps) == len(want)
+
+
+@pytest.mark.parametrize("filt", FILTERS)
+def test_unmigrated_matches_migrated(tmp_path, monkeypatch, filt):
+    plain, migrated = str(tmp_path / "plain.sqlite"), str(tmp_path / "migrated.sqlite")
+    shutil.copy(SHIPPED_DB, plain)
+    shutil.copy(SHIPPED_DB, migrated)
+    conn = sqlite3.connect(migrated)
+    db.ensure_spatial_index(conn)
+    conn.close()
+
+    def corridor(path):
+        monkeypatch.setattr(db, "DB_PATH", path)
+        return [(h.repeater.rptr_id, h.distance, h.route_mile)
+                for h in db.get_repeaters_along_route(DFW_TRACK, 25.0, filt)]
+
+    assert corridor(plain) == corridor(migrated)
+
+
+def test_lookup_cli_filters_unmigrated_db(plain_db, file_directions, tmp_path, monkeypatch):
+    import repeater_lookup
+    out = tmp_path / "70cm.csv"
+    monkeypatch.setattr("sys.argv", [
+        "repeater_lookup.py", "--directions", file_directions, "-r", "25",
+        "-u", "https://www.google.com/maps/dir/Dallas,+TX/Fort+Worth,+TX/",
+        "--mode", "any", "--band", "70cm", "--status", "on-air", "-o", str(out)])
+    repeater_lookup.main()
+    assert len(out.read_text().splitlines()) > 1
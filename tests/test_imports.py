@@ -0,0 +1,33 @@
+# tests/test_imports.py
+"""Importing an entry point loads no network clients or deferred modules."""
+import os
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+# must only be imported on first use, never by importing an entry point
+DEFERRED = (
+    "googlemaps", "requests", "requests_cache", "multiprocessing",
+    "http.server", "urllib.request", "xml.etree.ElementTree",
+)
+
+PROBE = """
+import sys
+sys.path[:0] = [{root!r}, {src!r}]
+import {module}
+print(" ".join(m for m in {deferred!r} if m in sys.modules))
+"""
+
+
+@pytest.mark.parametrize("module", [
+    "repeater_lookup", "repeater_route", "repeater_service",
+    "repeater_tools.db", "repeater_tools.route_sampler", "repeater_tools.directions",
+])
+def test_import_is_lazy(module):
+    code = PROBE.format(root=ROOT, src=os.path.join(ROOT, "src"), module=module, deferred=DEFERRED)
+    out = subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                         capture_output=True, text=True, check=True)
+    assert out.stdout.split() == []
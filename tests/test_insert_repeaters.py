@@ -0,0 +1,114 @@
+# tests/test_insert_repeaters.py
+"""Streaming JSON reader and the incremental --sync mode."""
+import json
+import os
+import sqlite3
+
+import pytest
+
+import insert_repeaters
+
+
+def records(tmp_path, monkeypatch, text, chunk):
+    monkeypatch.setattr(insert_repeaters, "READ_CHUNK", chunk)
+    path = tmp_path / "export.json"
+    path.write_text(text)
+    return list(insert_repeaters.iter_records(str(path)))
+
+
+NUMBERS = [1.5, -2.25, 3e5, -4.5e-3, 12345.678, 0, -7, 1e-10, 6.02e23, True, None]
+
+
+@pytest.mark.parametrize("chunk", [1, 2, 3, 5, 7, 1 << 20])
+def test_bare_list_of_numbers(tmp_path, monkeypatch, chunk):
+    for sep in (",", ", ", " ,\n"):
+        text = "[" + sep.join(json.dumps(v) for v in NUMBERS) + "]"
+        assert records(tmp_path, monkeypatch, text, chunk) == NUMBERS
+
+
+@pytest.mark.parametrize("chunk", [1, 3, 64, 1 << 20])
+def test_results_object(tmp_path, monkeypatch, chunk):
+    results = [{"State ID": "06", "Rptr ID": i, "Frequency": 146.52 + i / 1000,
+                "Lat": 34.05, "Long": -118.25} for i in range(20)]
+    text = json.dumps({"count": 20, "meta": {"v": [1.25, "x"]}, "results": results})
+    assert records(tmp_path, monkeypatch, text, chunk) == results
+
+
+def test_empty_and_truncated(tmp_path, monkeypatch):
+    assert records(tmp_path, monkeypatch, "[ ]", 1) == []
+    assert records(tmp_path, monkeypatch, '{"count": 0}', 1) == []
+    with pytest.raises(ValueError):
+        records(tmp_path, monkeypatch, "[1.5, 2.", 1)
+
+
+# ─── --sync ───────────────────────────────────────────────────────────────────
+def record(rptr_id, freq=146.52, updated="2024-01-01"):
+    return {"State ID": "48", "Rptr ID": rptr_id, "Frequency": freq,
+            "Lat": 32.78 + rptr_id / 100, "Long": -96.80, "Callsign": f"W{rptr_id}",
+            "FM Analog": "Yes", "Last Update": updated}
+
+
+@pytest.fixture
+def empty_db(tmp_path):
+    path = str(tmp_path / "sync.sqlite")
+    conn = sqlite3.connect(path, isolation_level=None)
+    conn.execute(insert_repeaters.DDL)
+    insert_repeaters.ensure_spatial_index(conn)
+    yield path, conn
+    conn.close()
+
+
+def test_sync_writes_only_new_and_changed(empty_db):
+    path, conn = empty_db
+    insert_repeaters.bulk_load(conn, [record(i) for i in range(5)])
+
+    export = [record(0), record(1, 147.00, "2024-06-01"), record(2), record(3), record(7)]
+    counts = insert_repeaters.sync(conn, export)
+    assert counts == dict(inserted=1, updated=1, deleted=0, unchanged=3)
+    assert conn.execute(
+        "SELECT frequency FROM repeaters WHERE rptr_id = 1").fetchone() == (147.00,)
+    assert conn.execute("SELECT count(*) FROM repeaters").fetchone() == (6,)
+    assert conn.execute("SELECT count(*) FROM repeaters_rtree").fetchone() == (6,)
+
+    counts = insert_repeaters.sync(conn, export, prune=True)
+    assert counts == dict(inserted=0, updated=0, deleted=1, unchanged=5)
+    assert conn.execute(
+        "SELECT count(*) FROM repeaters WHERE rptr_id = 4").fetchone() == (0,)
+    assert conn.execute("SELECT count(*) FROM repeaters_rtree").fetchone() == (5,)
+
+
+def test_sync_without_changes_leaves_the_file_alone(empty_db):
+    path, conn = empty_db
+    insert_repeaters.bulk_load(conn, [record(i) for i in range(3)])
+    conn.execute("PRAGMA journal_mode = DELETE")
+    os.utime(path, (1_000_000, 1_000_000))
+
+    counts = insert_repeaters.sync(conn, [record(i) for i in range(3)])
+    assert counts["unchanged"] == 3
+    assert os.stat(path).st_mtime == 1_000_000
+
+
+def test_prune_refuses_an_empty_export(empty_db):
+    path, conn = empty_db
+    insert_repeaters.bulk_load(conn, [record(1)])
+    with pytest.raises(ValueError):
+        insert_repeaters.sync(conn, [], prune=True)
+    assert conn.execute("SELECT count(*) FROM repeaters").fetchone() == (1,)
+
+
+def test_index_rebuild_keeps_unchanged_repeaters(empty_db):
+    from repeater_tools import spatial_index
+
+    path, conn = empty_db
+    insert_repeaters.bulk_load(conn, [record(i) for i in range(3)])
+    os.utime(path, (1_000_000, 1_000_000))
+    old = spatial_index.get_index(path)
+    before = {r.callsign: r for r in old.within_range((32.8, -96.8), 20)}
+
+    insert_repeaters.sync(conn, [record(0), record(1, 147.00, "2024-06-01"), record(2)])
+    os.utime(path, (2_000_000, 2_000_000))
+    new = spatial_index.get_index(path)
+    assert new is not old
+    after = {r.callsign: r for r in new.within_range((32.8, -96.8), 20)}
+    assert after["W0"] is before["W0"] and after["W2"] is before["W2"]
+    assert after["W1"] is not before["W1"] and after["W1"].frequency == 147.00
@@ -0,0 +1,46 @@
+# tests/test_instrument.py
+"""Per-stage timings and counters."""
+import json
+
+import pytest
+
+from conftest import DFW_TRACK
+from repeater_tools import db, instrument
+
+
+@pytest.fixture
+def recording():
+    instrument.enable()
+    yield instrument
+    instrument.disable()
+    instrument.reset()
+
+
+def test_disabled_records_nothing():
+    instrument.reset()
+    with instrument.stage("x"):
+        instrument.count("y", 5)
+    assert instrument.snapshot()["stages"] == {}
+    assert instrument.snapshot()["counters"] == {}
+
+
+def test_corridor_lookup_is_accounted(migrated_db, recording):
+    hits = db.get_repeaters_along_route(DFW_TRACK, 5.0)
+    snap = recording.snapshot()
+    assert {"lookup.bbox", "lookup.distance", "lookup.materialize"} <= set(snap["stages"])
+    counters = snap["counters"]
+    assert counters["lookup.queries"] == 1
+    assert counters["lookup.survivors"] == counters["lookup.rows_materialized"] == len(hits)
+    assert counters["lookup.candidates"] >= len(hits)
+
+
+def test_merge_and_reports(recording):
+    with recording.stage("a"):
+        recording.count("n", 2)
+    other = recording.snapshot()
+    recording.merge(other)
+    snap = recording.snapshot()
+    assert snap["stages"]["a"]["calls"] == 2 and snap["counters"]["n"] == 4
+    assert json.loads(recording.report_json())["counters"] == {"n": 4}
+    text = recording.report_text()
+    assert "wall time" in text and "a " in text and "n " in text
@@ -0,0 +1,164 @@
+# tests/test_route_sampler.py
+"""Fixed-interval resampling (against the old linear scan), adaptive sampling
+and the route store."""
+import numpy as np
+import pytest
+
+from repeater_tools import route_sampler
+from repeater_tools.route_sampler import (
+    RouteStore, adaptive_samples, cumulative_distances, resample_polyline,
+    resample_polyline_array,
+)
+from repeater_tools.utils import haversine, haversine_many, interpolate
+
+
+def linear_scan(pts, interval):
+    """The resampling loop sample_route used to run."""
+    cum = [0.0]
+    for a, b in zip(pts, pts[1:]):
+        cum.append(cum[-1] + haversine(a, b))
+    samples, d = [], 0.0
+    while d <= cum[-1]:
+        for i in range(len(cum) - 1):
+            if cum[i] <= d <= cum[i + 1]:
+                frac = (d - cum[i]) / (cum[i + 1] - cum[i])
+                samples.append(interpolate(pts[i], pts[i + 1], frac))
+                break
+        d += interval
+    return samples
+
+
+def random_route(n, seed=3):
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, 0.01, (n, 2)) + [0.004, 0.006]
+    return [tuple(p) for p in (np.cumsum(steps, axis=0) + [35.0, -100.0]).tolist()]
+
+
+@pytest.mark.parametrize("interval", [0.5, 1.0, 5.0])
+def test_matches_linear_scan(interval):
+    pts = random_route(800)
+    got = resample_polyline(pts, interval)
+    want = linear_scan(pts, interval)
+    # the old loop accumulated `d += interval`, drifting by a few ulps
+    assert len(got) == len(want)
+    np.testing.assert_allclose(got, want, rtol=0, atol=1e-9)
+
+
+def test_samples_sit_at_multiples_of_interval():
+    pts = np.asarray(random_route(300))
+    samples = resample_polyline_array(pts, 2.0)
+    total = cumulative_distances(pts)[-1]
+    assert len(samples) == int(total // 2.0) + 1
+    assert tuple(samples[0]) == tuple(pts[0])
+    # each sample is interpolated on the route: spacing never exceeds the interval
+    gaps = cumulative_distances(samples)
+    assert np.all(np.diff(gaps) <= 2.0 + 1e-9)
+
+
+def test_degenerate_routes():
+    assert resample_polyline_array([], 1.0).shape == (0, 2)
+    assert resample_polyline([(1.0, 2.0)], 1.0) == [(1.0, 2.0)]
+    assert resample_polyline([(1.0, 2.0), (1.0, 2.0)], 1.0) == [(1.0, 2.0)]
+    short = [(35.0, -100.0), (35.0, -99.99)]
+    assert resample_polyline(short, 50.0) == [short[0]]
+
+
+# ─── route store ──────────────────────────────────────────────────────────────
+ROUTE = np.array([(32.78, -96.80), (32.80, -96.95), (32.76, -97.10)])
+
+
+def test_store_round_trip_and_key_normalization(tmp_path):
+    store = RouteStore(str(tmp_path / "routes.sqlite"))
+    assert store.get("Dallas, TX", "Fort Worth, TX") is None
+    store.put("Dallas, TX", "Fort Worth, TX", "driving", ROUTE, cumulative_distances(ROUTE))
+
+    pts, cum = store.get("  dallas,+TX ", "FORT WORTH,  tx")
+    np.testing.assert_array_equal(pts, ROUTE)
+    np.testing.assert_array_equal(cum, cumulative_distances(ROUTE))
+    assert store.get("Dallas, TX", "Fort Worth, TX", "walking") is None
+    stats = store.stats()
+    assert (stats["entries"], stats["session_hits"], stats["session_misses"]) == (1, 1, 2)
+
+
+def test_store_expiry_and_lru_eviction(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(route_sampler.time, "time", lambda: now[0])
+    store = RouteStore(str(tmp_path / "routes.sqlite"), ttl=60, max_entries=2)
+    cum = cumulative_distances(ROUTE)
+    for dest in ("a", "b"):
+        store.put("o", dest, "driving", ROUTE, cum)
+        now[0] += 1
+    assert store.get("o", "a") is not None      # "b" is now least recently used
+    store.put("o", "c", "driving", ROUTE, cum)
+    assert store.get("o", "b") is None
+    assert store.get("o", "a") is not None
+
+    now[0] += 61
+    assert store.get("o", "c") is None
+    assert store.stats()["entries"] == 1        # the expired row was dropped on read
+
+
+def test_get_route_calls_the_api_once(tmp_path, monkeypatch):
+    calls = []
+
+    def fetch(origin, destination, mode="driving"):
+        calls.append((origin, destination, mode))
+        return ROUTE.copy()
+
+    monkeypatch.setattr(route_sampler, "fetch_route", fetch)
+    monkeypatch.setattr(route_sampler, "_route_store", RouteStore(str(tmp_path / "r.sqlite")))
+    first = route_sampler.sample_route("Dallas", "Fort Worth", 5)
+    assert route_sampler.sample_route("dallas", "fort worth", 5) == first
+    assert len(calls) == 1
+
+
+def wiggly_route(rng):
+    """A random winding road: a few hundred vertices with a drifting heading."""
+    n = int(rng.integers(50, 400))
+    lat0, lon0 = rng.uniform(25, 48), rng.uniform(-120, -70)
+    heading = np.cumsum(rng.normal(0, rng.uniform(0.05, 0.8), n))
+    step = rng.uniform(0.05, 1.0, n) / 69.0
+    lat = lat0 + np.cumsum(step * np.cos(heading))
+    lon = lon0 + np.cumsum(step * np.sin(heading) / np.cos(np.radians(lat0)))
+    return np.column_stack([lat, lon])
+
+
+def worst_coverage(pts, samples, radius):
+    """Largest distance from a route point to its nearest sample, in radii."""
+    dense = np.vstack([resample_polyline_array(pts, radius / 100), pts])
+    nearest = np.min([haversine_many(tuple(c), dense[:, 0], dense[:, 1])
+                      for c in samples], axis=0)
+    return nearest.max() / radius
+
+
+@pytest.mark.parametrize("overlap", [0.0, 0.1, 0.25, 0.5, 0.9])
+def test_adaptive_samples_cover_the_route(overlap):
+    rng = np.random.default_rng(21)
+    for _ in range(60):
+        pts = wiggly_route(rng)
+        radius = rng.uniform(1, 15)
+        samples, miles = adaptive_samples(pts, radius, overlap)
+        assert worst_coverage(pts, samples, radius) <= 1.0
+        assert np.all(np.diff(miles) > 0)
+        assert samples[0].tolist() == pts[0].tolist()
+
+
+def test_adaptive_samples_explicit_tolerance():
+    rng = np.random.default_rng(5)
+    pts = wiggly_route(rng)
+    samples, _ = adaptive_samples(pts, 5.0, 0.0, tolerance=1.0)
+    assert worst_coverage(pts, samples, 5.0) <= 1.0
+    with pytest.raises(ValueError):
+        adaptive_samples(pts, 5.0, 0.0, tolerance=5.0)
+
+
+def test_adaptive_samples_straight_road_keeps_full_spacing():
+    # a straight 200-mile road north: centres (2 - overlap) * radius apart,
+    # give or take one candidate step
+    pts = np.column_stack([np.linspace(35.0, 35.0 + 200 / 69.0, 50), np.full(50, -100.0)])
+    for overlap in (0.25, 0.5):
+        spacing = (2 - overlap) * 10.0
+        _, miles = adaptive_samples(pts, 10.0, overlap)
+        gaps = np.diff(miles)[:-1]
+        assert gaps.max() <= spacing + 1e-6
+        assert gaps.min() >= spacing * (1 - 1 / 16) - 1e-6
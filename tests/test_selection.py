@@ -0,0 +1,44 @@
+# tests/test_selection.py
+"""Channel-budget selection over corridor hits."""
+from types import SimpleNamespace
+
+from repeater_tools.db import CorridorHit
+from repeater_tools.selection import select_channels
+
+
+def hit(mile, distance, freq, tone=100.0, status="On-air"):
+    rpt = SimpleNamespace(frequency=freq, tone_mode="CTCSS", tone=tone, status=status)
+    return CorridorHit(rpt, distance, mile)
+
+
+def test_keeps_everything_under_budget_in_route_order():
+    hits = [hit(30, 1, 147.0), hit(10, 2, 146.0), hit(20, 3, 145.0)]
+    assert [h.route_mile for h in select_channels(hits, 5, 5.0)] == [10, 20, 30]
+    assert select_channels(hits, 0, 5.0) == []
+    assert select_channels([], 5, 5.0) == []
+
+
+def test_duplicates_collapse_within_the_window():
+    hits = [hit(0, 3, 147.0), hit(10, 1, 147.0), hit(40, 2, 147.0),
+            hit(5, 4, 147.0, tone=88.5)]
+    picked = select_channels(hits, 10, 5.0, dup_window=25)
+    assert [(h.route_mile, h.repeater.tone) for h in picked] == \
+           [(5, 88.5), (10, 100.0), (40, 100.0)]
+    assert len(select_channels(hits, 10, 5.0, dup_window=0)) == 4
+
+
+def test_budget_spreads_channels_along_the_route():
+    # a cluster of close repeaters at the start and one weak one far away
+    hits = [hit(i * 0.1, 0.1, 146.0 + i / 100) for i in range(20)]
+    hits.append(hit(200, 4.5, 145.0, status="Testing"))
+    picked = select_channels(hits, 4, 5.0, route_miles=200)
+    assert len(picked) == 4
+    assert picked[-1].route_mile == 200
+    assert [h.route_mile for h in picked] == sorted(h.route_mile for h in picked)
+
+
+def test_off_air_repeaters_lose_to_on_air_ones():
+    hits = [hit(0, 0.1, 146.0, status="Off-air"), hit(1, 3.0, 147.0),
+            hit(2, 0.2, 145.0, status="Off-air"), hit(3, 4.0, 148.0)]
+    picked = select_channels(hits, 2, 5.0, coverage_share=0.0)
+    assert {h.repeater.frequency for h in picked} == {147.0, 148.0}
@@ -0,0 +1,85 @@
+# tests/test_service.py
+"""Service handlers, called directly (no HTTP server)."""
+import asyncio
+
+import pytest
+
+from repeater_tools import route_sampler, service
+from repeater_tools.route_sampler import resample_polyline_array
+from repeater_tools.service import HTTPError, RepeaterService
+
+
+@pytest.fixture
+def call(plain_db, file_directions, monkeypatch):
+    monkeypatch.setattr(route_sampler, "ROUTE_CACHE_PATH", "")
+
+    def call(handler, **params):
+        async def go():
+            service = RepeaterService(jobs=1)
+            try:
+                await service.warm()
+                return await getattr(service, handler)(params)
+            finally:
+                service.close()
+        return asyncio.run(go())
+    return call
+
+
+def test_sample_interval(call):
+    out = call("sample", origin="a", destination="b", interval="2.5")
+    assert out["interval"] == 2.5
+    assert len(out["points"]) == int(out["route_miles"] // 2.5) + 1
+
+
+@pytest.mark.parametrize("interval", ["0", "-3", "nan"])
+def test_sample_rejects_bad_interval(call, interval):
+    with pytest.raises(HTTPError) as err:
+        call("sample", origin="a", destination="b", interval=interval)
+    assert err.value.status == 400
+
+
+def test_sample_caps_the_point_count(call, monkeypatch):
+    monkeypatch.setattr(service, "MAX_SAMPLES", 10)
+    assert len(call("sample", origin="a", destination="b", interval="5")["points"]) < 10
+    with pytest.raises(HTTPError) as err:
+        call("sample", origin="a", destination="b", interval="0.1")
+    assert err.value.status == 400
+
+
+def test_sample_adaptive(call):
+    out = call("sample", origin="a", destination="b", radius="4", overlap="0.5")
+    assert (out["radius"], out["overlap"]) == (4.0, 0.5)
+    assert len(out["points"]) == len(out["miles"]) > 1
+    assert out["miles"] == sorted(out["miles"]) and out["miles"][-1] <= out["route_miles"]
+    for params in ({"radius": "0"}, {"radius": "nan"}, {"radius": "4", "overlap": "1"}):
+        with pytest.raises(HTTPError) as err:
+            call("sample", origin="a", destination="b", **params)
+        assert err.value.status == 400
+
+
+@pytest.mark.parametrize("radius", ["0", "-2", "nan"])
+@pytest.mark.parametrize("handler, params", [
+    ("radius", {"lat": "32.78", "lon": "-96.80"}),
+    ("corridor", {"origin": "a", "destination": "b", "channels": "3"}),
+    ("export", {"origin": "a", "destination": "b", "channels": "3"}),
+])
+def test_rejects_non_positive_radius(call, handler, params, radius):
+    with pytest.raises(HTTPError) as err:
+        call(handler, radius=radius, **params)
+    assert err.value.status == 400
+
+
+def test_corridor_and_radius(call):
+    out = call("corridor", origin="a", destination="b", radius="6", channels="4")
+    assert 0 < out["count"] <= 4
+    miles = [r["route_mile"] for r in out["repeaters"]]
+    assert miles == sorted(miles)
+    out = call("radius", lat="32.78", lon="-96.80", radius="10")
+    dists = [r["distance"] for r in out["repeaters"]]
+    assert out["count"] > 0 and dists == sorted(dists) and dists[-1] <= 10
+
+
+@pytest.mark.parametrize("interval", [0, -1.0, float("nan")])
+def test_resample_rejects_bad_interval(interval):
+    with pytest.raises(ValueError):
+        resample_polyline_array([(32.0, -97.0), (33.0, -97.0)], interval)
@@ -0,0 +1,111 @@
+# tests/test_snapshot.py
+"""The columnar snapshot against the table it was taken from."""
+import json
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+import insert_repeaters
+from conftest import DFW_TRACK
+from repeater_tools import snapshot
+from repeater_tools.snapshot import (
+    FLAG_COORDS, FLAG_FM_ANALOG, FLAG_ON_AIR, FLOAT_COLUMNS, STRING_COLUMNS,
+    Snapshot, get_snapshot, write_snapshot,
+)
+from repeater_tools.spatial_index import RepeaterIndex
+
+
+def table(path):
+    conn = sqlite3.connect(path)
+    conn.row_factory = sqlite3.Row
+    cols = ", ".join(("rowid", "rptr_id") + FLOAT_COLUMNS + STRING_COLUMNS)
+    rows = [dict(r) for r in conn.execute(f"SELECT {cols} FROM repeaters ORDER BY rowid")]
+    conn.close()
+    return rows
+
+
+def test_round_trip(plain_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot, "FETCH_ROWS", 7)   # many partial batches
+    path = str(tmp_path / "t.snapshot")
+    rows = table(plain_db)
+    assert write_snapshot(plain_db, path) == len(rows)
+
+    snap = Snapshot(path)
+    assert snap.rowids.tolist() == [r["rowid"] for r in rows]
+    for pos, want in enumerate(rows):
+        want = dict(want)
+        del want["rowid"]
+        want = {k: str(v) if k in STRING_COLUMNS and v is not None else v
+                for k, v in want.items()}
+        assert snap.row(pos) == want
+        flags = int(snap.flags[pos])
+        assert bool(flags & FLAG_FM_ANALOG) == (want["fm_analog"] == "Yes")
+        assert bool(flags & FLAG_ON_AIR) == (want["operational_status"] == "On-air")
+        assert bool(flags & FLAG_COORDS) == \
+               (want["latitude"] is not None and want["longitude"] is not None)
+
+
+def test_empty_table(plain_db, tmp_path):
+    conn = sqlite3.connect(plain_db)
+    conn.execute("DELETE FROM repeaters")
+    conn.commit()
+    conn.close()
+    path = str(tmp_path / "t.snapshot")
+    assert write_snapshot(plain_db, path) == 0
+    assert len(Snapshot(path)) == 0
+
+
+def test_stale_snapshot_is_ignored(migrated_db):
+    write_snapshot(migrated_db)
+    assert get_snapshot(migrated_db) is not None
+    index = RepeaterIndex(migrated_db)
+    assert index._snapshot is not None
+    want = RepeaterIndex(migrated_db, use_snapshot=False).along_route(DFW_TRACK, 7.5)
+    assert [(h.repeater.rptr_id, h.distance) for h in index.along_route(DFW_TRACK, 7.5)] \
+        == [(h.repeater.rptr_id, h.distance) for h in want]
+
+    conn = sqlite3.connect(migrated_db)
+    conn.execute("UPDATE repeaters SET callsign = 'T3ST' WHERE rowid = 1")
+    conn.commit()
+    conn.close()
+    # in case the edit lands within the same mtime tick as the snapshot
+    os.utime(migrated_db, ns=(0, os.stat(migrated_db).st_mtime_ns + 10**9))
+    assert get_snapshot(migrated_db) is None
+
+
+def run_main(monkeypatch, db_path, json_path, *args):
+    monkeypatch.setattr(insert_repeaters, "DB_PATH", db_path)
+    monkeypatch.setattr(insert_repeaters, "JSON_PATH", json_path)
+    monkeypatch.setattr(sys, "argv", ["insert_repeaters.py", *args])
+    insert_repeaters.main()
+
+
+def test_sync_without_changes_keeps_the_snapshot(tmp_path, monkeypatch):
+    db_path, json_path = str(tmp_path / "r.sqlite"), tmp_path / "r.json"
+    export = [{"State ID": "48", "Rptr ID": i, "Frequency": 146.52,
+               "Lat": 32.78, "Long": -96.80 - i / 100, "Callsign": f"W{i}",
+               "FM Analog": "Yes", "Last Update": "2024-01-01"} for i in range(5)]
+    json_path.write_text(json.dumps(export))
+    run_main(monkeypatch, db_path, str(json_path))
+    snap_path = snapshot.snapshot_path(db_path)
+    written = os.stat(snap_path).st_mtime_ns
+
+    run_main(monkeypatch, db_path, str(json_path), "--sync")
+    assert os.stat(snap_path).st_mtime_ns == written
+    assert get_snapshot(db_path) is not None
+
+    export[0]["Callsign"], export[0]["Last Update"] = "T3ST", "2024-06-01"
+    json_path.write_text(json.dumps(export))
+    run_main(monkeypatch, db_path, str(json_path), "--sync")
+    snap = get_snapshot(db_path)
+    assert snap is not None
+    assert snap.string("callsign", int(np.flatnonzero(snap.column("rptr_id") == 0)[0])) \
+        == "T3ST"
+
+
+@pytest.fixture(autouse=True)
+def _fresh_snapshots(monkeypatch):
+    monkeypatch.setattr(snapshot, "_snapshots", {})
@@ -0,0 +1,55 @@
+# tests/test_spatial_index.py
+"""The in-memory grid index against the SQLite lookups."""
+import os
+import sqlite3
+
+import pytest
+
+from conftest import DFW_TRACK
+from repeater_tools import db
+from repeater_tools.spatial_index import RepeaterIndex, get_index
+
+CENTRES = [(32.78, -96.80), (29.76, -95.37), (40.71, -74.01), (61.22, -149.90)]
+
+
+def keys(reps):
+    return sorted((r.callsign, r.frequency, r.latitude, r.longitude) for r in reps)
+
+
+@pytest.mark.parametrize("radius", [2.0, 10.0, 50.0])
+def test_within_range_matches_sqlite(migrated_db, radius):
+    index = RepeaterIndex(migrated_db)
+    for centre in CENTRES:
+        assert keys(index.within_range(centre, radius)) == \
+               keys(db.get_repeaters_within_range(centre, radius))
+
+
+def test_along_route_matches_sqlite(migrated_db):
+    index = RepeaterIndex(migrated_db)
+    for buffer in (2.0, 7.5, 20.0):
+        got = index.along_route(DFW_TRACK, buffer)
+        want = db.get_repeaters_along_route(DFW_TRACK, buffer)
+        # ties on route mile break on distance then rowid, in both backends
+        assert [(h.route_mile, h.distance, h.repeater.state_id, h.repeater.rptr_id)
+                for h in got] == \
+               [(h.route_mile, h.distance, h.repeater.state_id, h.repeater.rptr_id)
+                for h in want]
+
+
+def test_memory_mode_is_rebuilt_when_the_db_changes(migrated_db, monkeypatch):
+    monkeypatch.setattr(db, "USE_MEMORY_INDEX", True)
+    centre = CENTRES[0]
+    before = db.get_repeaters_within_range(centre, 10.0)
+    assert get_index(migrated_db) is get_index(migrated_db)
+
+    conn = sqlite3.connect(migrated_db)
+    conn.execute("UPDATE repeaters SET fm_analog = 'No' WHERE callsign = ?",
+                 (before[0].callsign,))
+    conn.commit()
+    conn.close()
+    stat = os.stat(migrated_db)
+    os.utime(migrated_db, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+
+    after = db.get_repeaters_within_range(centre, 10.0)
+    assert before[0].callsign not in {r.callsign for r in after}
+    assert keys(after) == keys(r for r in before if r.callsign != before[0].callsign)
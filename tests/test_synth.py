@@ -0,0 +1,48 @@
+# tests/test_synth.py
+"""The benchmark suite's synthetic data: deterministic and loadable."""
+import os
+import sqlite3
+import sys
+
+import numpy as np
+import pytest
+
+from conftest import ROOT
+from repeater_tools.route_sampler import cumulative_distances
+
+# benchmarks/ is a directory of scripts, not a package
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+import synth
+
+
+@pytest.fixture
+def data_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(synth, "DATA_DIR", str(tmp_path))
+    return tmp_path
+
+
+def test_records_depend_only_on_size_and_seed():
+    first = list(synth.iter_records(200, seed=3))
+    assert first == list(synth.iter_records(200, seed=3))
+    assert first != list(synth.iter_records(200, seed=4))
+    assert len({(r["State ID"], r["Rptr ID"]) for r in first}) == 200
+
+
+def test_db_is_built_once_with_the_real_loader(data_dir):
+    path = synth.db_path(500, seed=1)
+    conn = sqlite3.connect(path)
+    assert conn.execute("SELECT count(*) FROM repeaters").fetchone() == (500,)
+    assert conn.execute("SELECT count(*) FROM repeaters_rtree").fetchone() == (500,)
+    conn.close()
+    mtime = os.stat(path).st_mtime_ns
+    assert synth.db_path(500, seed=1) == path
+    assert os.stat(path).st_mtime_ns == mtime
+
+
+@pytest.mark.parametrize("name, low, high", [("short", 25, 60), ("cross_country", 2500, 4500)])
+def test_routes(data_dir, name, low, high):
+    from repeater_tools.directions import read_track
+
+    pts = synth.ROUTES[name](seed=2)
+    assert low < cumulative_distances(pts)[-1] < high
+    np.testing.assert_allclose(read_track(synth.track_path(name, seed=2)), pts, atol=1e-6)
@@ -0,0 +1,88 @@
+# tests/test_tiles.py
+"""The tile cache against the SQLite lookups, before and after DB edits."""
+import sqlite3
+
+import numpy as np
+import pytest
+
+from conftest import DFW_TRACK
+from repeater_tools import db, tiles
+from repeater_tools.tiles import TileCache, ensure_tile_cache
+
+CENTRES = [(32.78, -96.80), (32.75, -97.33), (29.76, -95.37), (40.71, -74.01)]
+
+
+@pytest.fixture
+def tiled_db(migrated_db):
+    conn = sqlite3.connect(migrated_db)
+    ensure_tile_cache(conn)
+    conn.commit()
+    conn.close()
+    return migrated_db
+
+
+def ids_of(reps):
+    return sorted(r.rptr_id for r in reps)
+
+
+@pytest.mark.parametrize("radius", [5.0, 25.0, 60.0])
+def test_within_range_matches_sqlite(tiled_db, radius):
+    cache = TileCache(tiled_db, max_blocks=4)   # small, so lookups evict
+    for _ in range(2):                          # cold, then cached rows
+        for centre in CENTRES:
+            ids, dists = cache.ids_within_range(centre, radius)
+            want_ids, want_dists = db.get_repeater_ids_within_range(centre, radius)
+            order, want_order = np.argsort(ids), np.argsort(want_ids)
+            assert ids[order].tolist() == want_ids[want_order].tolist()
+            assert dists[order].tolist() == want_dists[want_order].tolist()
+            assert ids_of(cache.within_range(centre, radius)) == \
+                   ids_of(db.get_repeaters_within_range(centre, radius))
+
+
+def test_along_route_matches_sqlite(tiled_db):
+    cache = TileCache(tiled_db)
+    for buffer in (2.0, 7.5, 20.0, 7.5):
+        got = cache.along_route(DFW_TRACK, buffer)
+        want = db.get_repeaters_along_route(DFW_TRACK, buffer)
+        assert [(h.repeater.rptr_id, h.distance, h.route_mile) for h in got] == \
+               [(h.repeater.rptr_id, h.distance, h.route_mile) for h in want]
+
+
+def test_edits_invalidate_cached_blocks_and_rows(tiled_db, monkeypatch):
+    monkeypatch.setattr(tiles, "TILE_CACHE_CHECK_SECONDS", 0.0)
+    cache = TileCache(tiled_db)
+    centre = CENTRES[0]
+    before = cache.within_range(centre, 10.0)
+    moved, renamed = before[0], before[1]
+
+    conn = sqlite3.connect(tiled_db)
+    # move one repeater out of range and edit a non-positional column of another
+    conn.execute("UPDATE repeaters SET latitude = latitude + 5 "
+                 "WHERE state_id = ? AND rptr_id = ?", (moved.state_id, moved.rptr_id))
+    conn.execute("UPDATE repeaters SET callsign = 'T3ST' "
+                 "WHERE state_id = ? AND rptr_id = ?", (renamed.state_id, renamed.rptr_id))
+    conn.commit()
+    conn.close()
+
+    after = cache.within_range(centre, 10.0)
+    assert ids_of(after) == ids_of(db.get_repeaters_within_range(centre, 10.0))
+    assert moved.rptr_id not in ids_of(after)
+    assert [r.callsign for r in after if r.rptr_id == renamed.rptr_id] == ["T3ST"]
+
+
+def test_refresh_is_throttled(tiled_db, monkeypatch):
+    monkeypatch.setattr(tiles, "TILE_CACHE_CHECK_SECONDS", 3600.0)
+    cache = TileCache(tiled_db)
+    centre = CENTRES[0]
+    first = cache.within_range(centre, 10.0)[0]
+
+    conn = sqlite3.connect(tiled_db)
+    conn.execute("UPDATE repeaters SET callsign = 'T3ST' "
+                 "WHERE state_id = ? AND rptr_id = ?", (first.state_id, first.rptr_id))
+    conn.commit()
+    conn.close()
+
+    # within the check interval the cached row is served; refresh() sees the edit
+    assert cache.within_range(centre, 10.0)[0].callsign == first.callsign
+    cache.refresh()
+    assert "T3ST" in [r.callsign for r in cache.within_range(centre, 10.0)]
@@ -0,0 +1,105 @@
+# tests/test_utils.py
+"""Vectorized kernels in repeater_tools.utils against the scalar `haversine`."""
+import math
+
+import numpy as np
+import pytest
+
+from repeater_tools.utils import (
+    EARTH_RADIUS_MI, haversine, haversine_many, haversine_path,
+    point_segment_distance,
+)
+
+
+@pytest.fixture
+def rng():
+    return np.random.default_rng(4)
+
+
+def random_points(rng, n):
+    return rng.uniform(-89.0, 89.0, n), rng.uniform(-180.0, 180.0, n)
+
+
+def test_haversine_many_matches_scalar(rng):
+    lats, lons = random_points(rng, 500)
+    for center in [(0.0, 0.0), (40.7, -74.0), (-33.9, 151.2), (89.0, 10.0)]:
+        got = haversine_many(center, lats, lons)
+        want = [haversine(center, (la, lo)) for la, lo in zip(lats, lons)]
+        np.testing.assert_allclose(got, want, rtol=1e-12, atol=1e-9)
+
+
+def test_haversine_many_antipodal_and_identical():
+    lats = np.array([10.0, -45.0, 0.0, 30.0])
+    lons = np.array([20.0, 100.0, 180.0, -60.0])
+    center_lats, center_lons = -lats, lons + 180.0
+    half_circumference = math.pi * EARTH_RADIUS_MI
+    for la, lo, cla, clo in zip(lats, lons, center_lats, center_lons):
+        # asin is ill-conditioned at the antipode: ~1e-8 relative is all there is
+        d = haversine_many((cla, clo), [la], [lo])[0]
+        assert d == pytest.approx(half_circumference, rel=1e-7)
+        assert d == pytest.approx(haversine((cla, clo), (la, lo)), rel=1e-7)
+        # the same point is at distance zero
+        assert haversine_many((la, lo), [la], [lo])[0] == pytest.approx(0.0, abs=1e-9)
+    assert not np.isnan(haversine_many((0.0, 0.0), [0.0], [180.0])).any()
+
+
+def test_haversine_path_matches_scalar(rng):
+    lats, lons = random_points(rng, 300)
+    # include a zero-length step and an antipodal hop
+    lats = np.concatenate([lats, [lats[-1], -lats[-1]]])
+    lons = np.concatenate([lons, [lons[-1], lons[-1] + 180.0]])
+    got = haversine_path(lats, lons)
+    want = [haversine((lats[i], lons[i]), (lats[i + 1], lons[i + 1]))
+            for i in range(len(lats) - 1)]
+    assert len(got) == len(lats) - 1
+    np.testing.assert_allclose(got, want, rtol=1e-12, atol=1e-9)
+    assert got[-2] == 0.0
+    assert got[-1] == pytest.approx(math.pi * EARTH_RADIUS_MI, rel=1e-7)
+
+
+def test_point_segment_distance_zero_length_segment(rng):
+    # a degenerate segment is a point: distance ~ haversine, fraction 0
+    alat, alon = 39.0, -98.0
+    plat = alat + rng.uniform(-0.5, 0.5, 200)
+    plon = alon + rng.uniform(-0.5, 0.5, 200)
+    dist, frac = point_segment_distance(plat, plon, alat, alon, alat, alon)
+    want = haversine_many((alat, alon), plat, plon)
+    np.testing.assert_allclose(dist, want, rtol=2e-3)
+    assert (frac == 0.0).all()
+    d0, f0 = point_segment_distance(alat, alon, alat, alon, alat, alon)
+    assert d0 == 0.0 and f0 == 0.0
+
+
+def test_point_segment_distance_matches_haversine_at_endpoints_and_interior(rng):
+    # short segments, as in a decoded route: the local projection is accurate
+    alat, alon = rng.uniform(-60, 60, 100), rng.uniform(-170, 170, 100)
+    blat, blon = alat + rng.uniform(-0.1, 0.1, 100), alon + rng.uniform(-0.1, 0.1, 100)
+
+    # points on the segment are at distance ~0
+    t = rng.uniform(0, 1, 100)
+    dist, frac = point_segment_distance(alat + t * (blat - alat), alon + t * (blon - alon),
+                                        alat, alon, blat, blon)
+    np.testing.assert_allclose(dist, 0.0, atol=1e-9)
+    np.testing.assert_allclose(frac, t, atol=1e-9)
+
+    # points beyond an end clamp to that end, and match the scalar haversine
+    plat, plon = blat + (blat - alat), blon + (blon - alon)
+    dist, frac = point_segment_distance(plat, plon, alat, alon, blat, blon)
+    assert (frac == 1.0).all()
+    want = [haversine((pa, po), (ba, bo)) for pa, po, ba, bo in zip(plat, plon, blat, blon)]
+    np.testing.assert_allclose(dist, want, rtol=2e-3)
+
+
+def test_point_segment_distance_broadcasts():
+    plat = np.array([40.0, 41.0, 42.0])[:, None]
+    plon = np.array([-100.0, -100.5, -101.0])[:, None]
+    alat, alon = np.array([40.0, 41.0]), np.array([-100.0, -101.0])
+    blat, blon = np.array([40.5, 41.5]), np.array([-100.5, -101.5])
+    dist, frac = point_segment_distance(plat, plon, alat, alon, blat, blon)
+    assert dist.shape == frac.shape == (3, 2)
+    for i in range(3):
+        for j in range(2):
+            d, f = point_segment_distance(plat[i, 0], plon[i, 0],
+                                          alat[j], alon[j], blat[j], blon[j])
+            assert dist[i, j] == pytest.approx(float(d))
+            assert frac[i, j] == pytest.approx(float(f))
@@ -0,0 +1,73 @@
+# tests/test_writers.py
+"""Radio-profile channel writers."""
+import csv
+import io
+import json
+
+import pytest
+
+from models.repeater import Repeater
+from repeater_tools.csv_writer import CSVWriter
+from repeater_tools.writers import get_profile, iter_channels, write_channels
+
+
+def rpt(callsign, freq, offset=None, offset_dir=None, tone_mode=None, tone=None):
+    return Repeater(
+        callsign=callsign, notes="note", frequency=freq, offset=offset,
+        offset_dir=offset_dir, tone_mode=tone_mode, tone=tone,
+        latitude=32.78, longitude=-96.80, city="Dallas", county="Dallas",
+        state="Texas", fm_analog="Yes", status="On-air", state_id="48", rptr_id=1,
+    )
+
+
+REPEATERS = [
+    rpt("W5FC", 146.88, 0.6, "minus", "CTCSS", 110.9),
+    rpt("K5LONGCALLSIGN", 444.5, 5.0, "plus", "DCS", 23),
+    rpt(None, 147.0),
+]
+
+
+def test_chirp_rows():
+    buf = io.StringIO()
+    assert write_channels(REPEATERS, "chirp", buf) == 3
+    rows = list(csv.reader(io.StringIO(buf.getvalue())))
+    assert rows[0] == get_profile("chirp").header
+    assert rows[1] == ["W5FC", "note", "146.880000", "-", "0.600000", "Tone", "110.9", "",
+                       "FM", "0.005", "OFF", "W5FC Dallas, Texas"]
+    assert rows[2][3:8] == ["+", "5.000000", "DCS", "", "23"]
+    assert rows[3][:8] == ["", "note", "147.000000", "OFF", "", "", "", ""]
+
+
+def test_uvk5_numbers_rows_and_truncates_names():
+    buf = io.StringIO()
+    write_channels(REPEATERS, "uvk5", buf)
+    rows = list(csv.reader(io.StringIO(buf.getvalue())))[1:]
+    assert [row[0] for row in rows] == ["1", "2", "3"]
+    assert rows[1][1] == "K5LONGCALL"
+    assert rows[1][5:11] == ["DTCS", "88.5", "88.5", "023", "NN", "023"]
+    assert rows[2][3:5] == ["", "0.000000"]
+
+
+def test_ndjson_lines():
+    buf = io.StringIO()
+    write_channels(REPEATERS, "ndjson", buf)
+    lines = [json.loads(line) for line in buf.getvalue().splitlines()]
+    assert [line["callsign"] for line in lines] == ["W5FC", "K5LONGCALLSIGN", None]
+    assert lines[0]["id"] == ["48", 1]
+
+
+@pytest.mark.parametrize("profile", ["chirp", "uvk5", "ndjson"])
+@pytest.mark.parametrize("n", [0, 1, 2, 5])
+def test_chunks_join_to_the_written_file(profile, n, tmp_path):
+    reps = (REPEATERS * 2)[:n]
+    path = tmp_path / "out"
+    assert CSVWriter(str(path), profile).write(iter(reps)) == n
+    with open(path, newline="") as f:
+        assert "".join(iter_channels(iter(reps), profile, chunk_rows=2)) == f.read()
+
+
+def test_stdout_and_unknown_profile(capsys):
+    assert write_channels(REPEATERS[:1], "ndjson", "-") == 1
+    assert json.loads(capsys.readouterr().out)["freq"] == 146.88
+    with pytest.raises(ValueError):
+        get_profile("ft-991")